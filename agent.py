@@ -1,3 +1,5 @@
+import logging
+
 from dotenv import load_dotenv
 
 from livekit import agents
@@ -6,16 +8,22 @@ from livekit.plugins import (
     noise_cancellation,
 )
 from livekit.plugins import google
-from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
+from prompt_builder import configured_budget, prompt_builder
+from knowledge_base import knowledge
+from latency_metrics import instrumentation
+from tool_profiler import tool_profiler
 from dental_tools import (
     schedule_appointment,
     check_availability,
+    find_next_available,
+    reserve_slot,
     get_clinic_info,
     get_services_info,
     collect_patient_info,
     cancel_appointment,
     reschedule_appointment,
     answer_faq,
+    search_knowledge,
     get_insurance_info,
     get_payment_info
 )
@@ -23,9 +31,9 @@ load_dotenv()
 
 
 class DentalReceptionist(Agent):
-    def __init__(self) -> None:
+    def __init__(self, instructions: str) -> None:
         super().__init__(
-            instructions=AGENT_INSTRUCTION,
+            instructions=instructions,
             llm=google.beta.realtime.RealtimeModel(
                 voice="Puck",  # More suitable voice for Italian
                 language="it-IT",  # Italian language
@@ -34,12 +42,15 @@ class DentalReceptionist(Agent):
             tools=[
                 schedule_appointment,
                 check_availability,
+                find_next_available,
+                reserve_slot,
                 get_clinic_info,
                 get_services_info,
                 collect_patient_info,
                 cancel_appointment,
                 reschedule_appointment,
                 answer_faq,
+                search_knowledge,
                 get_insurance_info,
                 get_payment_info
             ],
@@ -48,13 +59,26 @@ class DentalReceptionist(Agent):
 
 
 async def entrypoint(ctx: agents.JobContext):
+    # Pick up edits to clinic_knowledge.json without restarting the worker
+    knowledge.start_watching()
+
+    # Compact, knowledge-based instructions (DENTAL_PROMPT_BUDGET=full for the whole prompt)
+    prompt = prompt_builder.build(configured_budget())
+    logging.info(prompt.report())
+
     session = AgentSession(
         
     )
 
+    # Per-turn latency spans (DENTAL_METRICS_PORT / DENTAL_LATENCY_TRACE; off by default)
+    instrumentation.configure_from_env()
+    instrumentation.trace_session(session, ctx.room.name)
+    # kill -USR1 <pid>: sample the loop and write a tool flamegraph profile
+    tool_profiler.start_signal_dump()
+
     await session.start(
         room=ctx.room,
-        agent=DentalReceptionist(),
+        agent=DentalReceptionist(prompt.agent_instruction),
         room_input_options=RoomInputOptions(
             # LiveKit Cloud enhanced noise cancellation
             # - If self-hosting, omit this parameter
@@ -67,7 +91,7 @@ async def entrypoint(ctx: agents.JobContext):
     await ctx.connect()
 
     await session.generate_reply(
-        instructions=SESSION_INSTRUCTION,
+        instructions=prompt.session_instruction,
     )
 
 
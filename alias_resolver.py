@@ -0,0 +1,148 @@
+# Free Italian text -> canonical service / appointment-type keys
+# Aliases are seeded from the knowledge base itself (keys, names, description
+# words), from ITALIAN_DENTAL_TERMINOLOGY and from the emergency keywords in
+# SCENARIO_TRAINING_DATA, then compiled into a token trie. Resolution walks the
+# trie from each token of the input, so the cost per token is bounded by the
+# longest alias, not by the number of aliases.
+
+from typing import Dict, Mapping, Optional, Tuple
+
+from faq_index import analyze
+from italian_training_data import ITALIAN_DENTAL_TERMINOLOGY, SCENARIO_TRAINING_DATA
+from knowledge_base import KnowledgeBase, KnowledgeSnapshot, knowledge
+
+SERVICE = "service"
+APPOINTMENT_TYPE = "appointment_type"
+
+# Terms the knowledge texts do not mention, applied when the target key exists
+EXTRA_ALIASES = {
+    SERVICE: {
+        "detartrasi": "igiene_dentale",
+        "igiene": "igiene_dentale",
+        "otturazione": "odontoiatria_generale",
+        "carie": "odontoiatria_generale",
+        "dente del giudizio": "chirurgia_orale",
+        "apparecchio": "ortodonzia",
+        "sbiancamento": "estetica_dentale",
+        "faccette": "estetica_dentale",
+    },
+    APPOINTMENT_TYPE: {
+        "detartrasi": "igiene_dentale",
+        "igiene": "igiene_dentale",
+        "prima visita": "visita_controllo",
+        "apparecchio": "ortodonzia",
+        "impianto": "implantologia",
+        "estetica dentale": "estetica",
+        "faccette": "estetica",
+    },
+}
+
+# Scenario keywords that point to one appointment type
+SCENARIO_TARGETS = {"emergency": (APPOINTMENT_TYPE, "visita_urgente")}
+
+_END = ""
+
+
+def _entries(snapshot: KnowledgeSnapshot) -> Dict[str, Mapping]:
+    return {SERVICE: snapshot.services, APPOINTMENT_TYPE: snapshot.appointment_types}
+
+
+def seed_aliases(snapshot: KnowledgeSnapshot) -> Dict[str, Dict[str, str]]:
+    """alias text -> key, per namespace"""
+    aliases: Dict[str, Dict[str, str]] = {}
+    for namespace, entries in _entries(snapshot).items():
+        table: Dict[str, str] = {}
+        corpus = {key: set(analyze(f"{key} {entry['name']} {entry.get('description', '')}"))
+                  for key, entry in entries.items()}
+        # Terminology (Italian term and English gloss) that only one entry mentions
+        for term, gloss in ITALIAN_DENTAL_TERMINOLOGY.items():
+            stems = analyze(term)
+            targets = [key for key, terms in corpus.items() if stems and all(s in terms for s in stems)]
+            if len(targets) == 1:
+                table[term] = targets[0]
+                table[gloss] = targets[0]
+        for scenario, (target_namespace, key) in SCENARIO_TARGETS.items():
+            if target_namespace == namespace and key in entries:
+                for keyword in SCENARIO_TRAINING_DATA.get(scenario, {}).get("keywords", []):
+                    table[keyword] = key
+        for alias, key in EXTRA_ALIASES.get(namespace, {}).items():
+            if key in entries:
+                table[alias] = key
+        # Keys and display names always win
+        for key, entry in entries.items():
+            table[key.replace("_", " ")] = key
+            table[entry["name"]] = key
+        aliases[namespace] = table
+    return aliases
+
+
+class AliasTrie:
+    """Trie over analyzed tokens; values sit on the node of an alias's last token"""
+
+    def __init__(self):
+        self.root: Dict = {}
+        self.max_depth = 0
+
+    def add(self, text: str, value: str):
+        tokens = analyze(text)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_END] = value
+        self.max_depth = max(self.max_depth, len(tokens))
+
+    def find(self, text: str) -> Optional[str]:
+        """Value of the longest alias in the text (earliest on ties)"""
+        tokens = analyze(text)
+        best: Tuple[int, Optional[str]] = (0, None)
+        for start in range(len(tokens)):
+            node = self.root
+            for end in range(start, min(len(tokens), start + self.max_depth)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if _END in node and end - start + 1 > best[0]:
+                    best = (end - start + 1, node[_END])
+        return best[1]
+
+
+class AliasResolver:
+    """Compiled alias tries for the current knowledge snapshot, rebuilt on reload"""
+
+    def __init__(self, knowledge_base: KnowledgeBase = knowledge):
+        self.knowledge_base = knowledge_base
+        self._tries: Optional[Dict[str, AliasTrie]] = None
+        knowledge_base.on_reload(lambda snapshot: self.invalidate())
+
+    def invalidate(self):
+        self._tries = None
+
+    def _compile(self) -> Dict[str, AliasTrie]:
+        tries = {}
+        for namespace, table in seed_aliases(self.knowledge_base.snapshot).items():
+            trie = AliasTrie()
+            for alias, key in table.items():
+                trie.add(alias, key)
+            tries[namespace] = trie
+        return tries
+
+    def resolve(self, namespace: str, text: str) -> Optional[str]:
+        """Canonical key for free text, or None if nothing matches"""
+        entries = _entries(self.knowledge_base.snapshot)[namespace]
+        if text in entries:
+            return text
+        if self._tries is None:
+            self._tries = self._compile()
+        return self._tries[namespace].find(text)
+
+    def service(self, text: str) -> Optional[str]:
+        return self.resolve(SERVICE, text)
+
+    def appointment_type(self, text: str) -> Optional[str]:
+        return self.resolve(APPOINTMENT_TYPE, text)
+
+
+# Shared instance used by the function tools
+aliases = AliasResolver()
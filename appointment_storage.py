@@ -0,0 +1,255 @@
+# Storage backends for AppointmentDatabase (PatientDatabase uses the append log too)
+# JsonFileStorage rewrites the whole file on every save (original behaviour),
+# AppendLogStorage appends one record per mutation and compacts in background.
+# Disk writes happen on background writer threads; put() only queues them and
+# durable() returns the acknowledgement for everything queued so far.
+
+import glob
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from async_persistence import GroupCommitWriter, RecordFileWriter, completed_future, fsync_directory
+
+
+class JsonFileStorage:
+    """Whole-file JSON storage: every save rewrites all records"""
+
+    def __init__(self, db_file: str = "appointments.json"):
+        self.db_file = db_file
+        self.records: Dict = {}
+        self._writer = RecordFileWriter(db_file, self.records, "appuntamenti")
+
+    def load(self) -> Dict:
+        """Load all records from the JSON file"""
+        if os.path.exists(self.db_file):
+            try:
+                with open(self.db_file, 'r', encoding='utf-8') as f:
+                    self.records = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                self.records = {}
+        # The writer thread keeps its own copy of the records
+        self._writer.close()
+        self._writer = RecordFileWriter(self.db_file, self.records, "appuntamenti")
+        return self.records
+
+    def put(self, record_id: str, record: Dict) -> bool:
+        """Store a record and queue it; the writer thread rewrites the file"""
+        self.records[record_id] = record
+        self._writer.save_record(record_id, record)
+        return True
+
+    def durable(self) -> Future:
+        return self._writer.durable()
+
+    def close(self) -> None:
+        """Wait for pending rewrites"""
+        self._writer.close()
+
+
+class MemoryStorage:
+    """Non-persistent storage for tests and benchmarks"""
+
+    def __init__(self, records: Optional[Dict] = None):
+        self.records: Dict = records if records is not None else {}
+
+    def load(self) -> Dict:
+        """Return the in-memory records"""
+        return self.records
+
+    def put(self, record_id: str, record: Dict) -> bool:
+        """Store a record in memory only"""
+        self.records[record_id] = record
+        return True
+
+    def durable(self) -> Future:
+        return completed_future()
+
+    def close(self) -> None:
+        """Nothing to release for in-memory storage"""
+        pass
+
+
+class AppendLogStorage:
+    """
+    Append-only log storage.
+
+    The snapshot lives in `db_file` (same format as JsonFileStorage, so an
+    existing appointments.json is picked up as-is). Every put appends one JSON
+    line to the active log segment `<db_file>.log.<n>` through a group-commit
+    writer thread: lines queued while a batch is being written go out together
+    with a single flush and fsync (unless disabled, e.g. for benchmarks), so
+    an acknowledged put survives a crash. After `compact_every`
+    appends the active segment is rotated and a background thread writes a new
+    snapshot and deletes the segments it covers. Startup replays the snapshot
+    plus every remaining segment in order; records are full copies, so replay
+    is idempotent if a crash happens between snapshot and segment cleanup.
+    """
+
+    def __init__(self, db_file: str = "appointments.json",
+                 compact_every: int = 1000, fsync: bool = True, error_label: str = "appuntamenti"):
+        self.db_file = db_file
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.error_label = error_label
+        self.records: Dict = {}
+        self._lock = threading.Lock()
+        self._segment = 0
+        self._appended = 0
+        self._compacting = False
+        self._compactor: Optional[threading.Thread] = None
+        # Owned by the writer thread
+        self._log = None
+        self._log_segment = -1
+        self._writer = GroupCommitWriter(self._write_batch, name=f"append-log:{db_file}")
+        self._last: Future = completed_future()
+
+    def _segment_path(self, segment: int) -> str:
+        return f"{self.db_file}.log.{segment}"
+
+    def _segments(self) -> List[int]:
+        """Existing log segment numbers, oldest first"""
+        segments = []
+        for path in glob.glob(glob.escape(self.db_file) + ".log.*"):
+            suffix = path.rsplit('.', 1)[-1]
+            if suffix.isdigit():
+                segments.append(int(suffix))
+        return sorted(segments)
+
+    def load(self) -> Dict:
+        """Load the snapshot and replay every log segment on top of it"""
+        records: Dict = {}
+        if os.path.exists(self.db_file):
+            try:
+                with open(self.db_file, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                records = {}
+
+        segments = self._segments()
+        for segment in segments:
+            with open(self._segment_path(segment), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write at the tail of a segment after a crash
+                        continue
+                    records[entry['id']] = entry['data']
+                    self._appended += 1
+
+        self.records = records
+        self._segment = segments[-1] if segments else 0
+        return self.records
+
+    def put(self, record_id: str, record: Dict) -> bool:
+        """Queue a single record for the active log segment"""
+        line = json.dumps({'id': record_id, 'data': record},
+                          ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self.records[record_id] = record
+            self._last = self._writer.submit(('line', self._segment, line))
+            self._appended += 1
+            if self._appended >= self.compact_every and not self._compacting:
+                self._rotate()
+        return True
+
+    def durable(self) -> Future:
+        """Acknowledgement for every record queued so far"""
+        return self._last
+
+    def _rotate(self) -> None:
+        """Start a new segment and queue a snapshot of the current state (lock held)"""
+        covered = self._segment
+        self._segment += 1
+        self._appended = 0
+        self._compacting = True
+        snapshot = {key: dict(value) for key, value in self.records.items()}
+        self._last = self._writer.submit(('rotate', covered, snapshot))
+
+    def _write_batch(self, items: List) -> None:
+        """Writer thread: append lines in order, one flush per batch"""
+        try:
+            for kind, segment, payload in items:
+                if kind == 'line':
+                    if self._log_segment != segment:
+                        self._close_log()
+                        path = self._segment_path(segment)
+                        created = not os.path.exists(path)
+                        self._log = open(path, 'a', encoding='utf-8')
+                        self._log_segment = segment
+                        if created and self.fsync:
+                            fsync_directory(path)
+                    self._log.write(payload + '\n')
+                else:
+                    # Every line of the covered segments is on disk now
+                    self._close_log()
+                    self._compactor = threading.Thread(
+                        target=self._write_snapshot, args=(payload, segment), daemon=True
+                    )
+                    self._compactor.start()
+            if self._log is not None:
+                self._log.flush()
+                if self.fsync:
+                    os.fsync(self._log.fileno())
+        except Exception as e:
+            print(f"Errore nel salvataggio {self.error_label}: {e}")
+            raise
+
+    def _close_log(self) -> None:
+        if self._log is not None:
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._log.close()
+            self._log = None
+            self._log_segment = -1
+
+    def _write_snapshot(self, snapshot: Dict, covered: int) -> None:
+        """Write the snapshot atomically, then drop the segments it covers"""
+        tmp_file = f"{self.db_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.db_file)
+            # The new snapshot must be durable before the segments it replaces go
+            fsync_directory(self.db_file)
+            for segment in self._segments():
+                if segment <= covered:
+                    os.remove(self._segment_path(segment))
+        except Exception as e:
+            print(f"Errore nella compattazione {self.error_label}: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self) -> None:
+        """Force a compaction and wait for it to finish"""
+        with self._lock:
+            if not self._compacting:
+                self._rotate()
+            last = self._last
+        last.result()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self) -> None:
+        """Drain the writer, close the active segment and wait for a running compaction"""
+        self._writer.close()
+        self._close_log()
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+
+def create_appointment_storage(db_file: str = "appointments.json"):
+    """Build the storage backend selected by APPOINTMENT_STORAGE ('log' or 'json')"""
+    backend = os.getenv("APPOINTMENT_STORAGE", "log").lower()
+    if backend == "json":
+        return JsonFileStorage(db_file)
+    return AppendLogStorage(db_file)
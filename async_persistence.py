@@ -0,0 +1,171 @@
+# Background persistence for the databases
+# Writes are queued to a dedicated thread and applied in batches (group
+# commit): one flush/fsync covers every write that arrived while the previous
+# batch was on disk. Callers get a concurrent.futures.Future as durability
+# acknowledgement, which async code awaits with `wait_durable`; it resolves
+# once the data (and the directory entry of a new file) has been fsynced.
+
+import asyncio
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_STOP = object()
+
+
+def fsync_directory(path: str):
+    """Make a file creation, rename or removal in `path`'s directory durable"""
+    if os.name == "nt":
+        # Windows cannot open directories; NTFS journals the metadata itself
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def completed_future(result: Any = True) -> Future:
+    """An already-resolved acknowledgement (for synchronous backends)"""
+    future: Future = Future()
+    future.set_result(result)
+    return future
+
+
+async def wait_durable(future: Optional[Future]) -> bool:
+    """Await a durability acknowledgement without blocking the event loop"""
+    if future is None:
+        return True
+    return await asyncio.wrap_future(future)
+
+
+class GroupCommitWriter:
+    """Single background thread applying queued items with `write_batch`"""
+
+    def __init__(self, write_batch: Callable[[List[Any]], None], max_batch: int = 512,
+                 name: str = "group-commit-writer"):
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.name = name
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item; the future resolves once its batch has been written"""
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put((item, future))
+        return future
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            try:
+                self.write_batch([item for item, _ in batch])
+                for _, future in batch:
+                    future.set_result(True)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            if stop:
+                return
+
+    def close(self):
+        """Drain pending writes and stop the thread (it restarts on the next submit)"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+
+class SnapshotFileWriter:
+    """
+    Whole-file JSON writer for databases that save complete snapshots.
+    Snapshots queued while a write is in progress are coalesced: only the
+    newest one is written, atomically via a fsynced temporary file and os.replace.
+    """
+
+    def __init__(self, db_file: str, error_label: str = "database"):
+        self.db_file = db_file
+        self.error_label = error_label
+        self._writer = GroupCommitWriter(self._write_batch, name=f"snapshot-writer:{db_file}")
+        self._last: Future = completed_future()
+
+    def _write_batch(self, snapshots: List[Dict]):
+        self._dump(snapshots[-1])
+
+    def _dump(self, snapshot: Dict):
+        tmp_file = f"{self.db_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.db_file)
+            fsync_directory(self.db_file)
+        except Exception as e:
+            print(f"Errore nel salvataggio {self.error_label}: {e}")
+            raise
+
+    def save(self, snapshot: Dict) -> Future:
+        """Queue a snapshot; it must not be mutated afterwards"""
+        self._last = self._writer.submit(snapshot)
+        return self._last
+
+    def durable(self) -> Future:
+        """Acknowledgement for the most recently queued snapshot"""
+        return self._last
+
+    def close(self):
+        self._writer.close()
+
+
+class RecordFileWriter(SnapshotFileWriter):
+    """
+    Whole-file JSON writer fed with single changed records instead of snapshots.
+    The writer thread keeps its own copy of the records, applies the changes of
+    a batch to it and rewrites the file once, so callers never copy the database.
+    """
+
+    def __init__(self, db_file: str, records: Dict[str, Dict], error_label: str = "database"):
+        super().__init__(db_file, error_label)
+        # Copied once here; afterwards only the writer thread touches it
+        self._records = {key: dict(record) for key, record in records.items()}
+
+    def _write_batch(self, changes: List[Tuple[str, Optional[Dict]]]):
+        for key, record in changes:
+            if record is None:
+                self._records.pop(key, None)
+            else:
+                self._records[key] = record
+        self._dump(self._records)
+
+    def save_record(self, key: str, record: Optional[Dict]) -> Future:
+        """Queue the new content of one record (None deletes it)"""
+        self._last = self._writer.submit((key, None if record is None else dict(record)))
+        return self._last
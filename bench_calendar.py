@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark for AppointmentDatabase lookups.
+Shows per-query latency as the calendar grows from 1k to 1M appointments.
+
+Also times the first free 60-minute slot over a fully booked 90-day horizon.
+"overlap" lists the bookings overlapping a 60-minute window (interval lists).
+Patient lookups time caller-ID matches, partial-number searches and fuzzy name
+searches (trigram index) against a linear name scan, from 1k to 1M patients
+drawing surnames from a fixed vocabulary.
+
+Usage: python bench_calendar.py [max_size] [memory|sqlite]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from appointment_storage import MemoryStorage
+from slot_bitmap import DEFAULT_RESOURCE, SlotOccupancy, span_mask
+from patient_database import AppointmentDatabase, PatientDatabase
+from sqlite_database import SQLiteAppointmentDatabase
+
+SLOTS = ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30",
+         "14:00", "14:30", "15:00", "15:30", "16:00", "16:30", "17:00", "17:30"]
+
+
+def build_records(size: int):
+    """Generate `size` confirmed appointments spread over consecutive days"""
+    start = date(2030, 1, 1)
+    records = {}
+    for i in range(size):
+        day = (start + timedelta(days=i // len(SLOTS))).isoformat()
+        app_id = f"APP_{i:08d}"
+        records[app_id] = {
+            "id": app_id,
+            "patient_name": f"Paziente {i}",
+            "phone": f"+39 333 {i % 50000:07d}",
+            "date": day,
+            "time": SLOTS[i % len(SLOTS)],
+            "type": "visita_controllo",
+            "status": "confermato"
+        }
+    return records
+
+
+def time_per_call(fn, args_list) -> float:
+    """Average microseconds per call over the argument list"""
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def open_database(backend: str, records, tmp_dir: str):
+    """Load the generated records into the selected backend"""
+    if backend == "sqlite":
+        db = SQLiteAppointmentDatabase(os.path.join(tmp_dir, f"bench_{len(records)}.db"))
+        db.import_appointments(records)
+        return db
+    return AppointmentDatabase(storage=MemoryStorage(records))
+
+
+def run(max_size: int = 1_000_000, backend: str = "memory", queries: int = 2000):
+    tmp_dir = tempfile.mkdtemp()
+    print(f"backend: {backend}")
+    print(f"{'size':>10} {'by_date':>10} {'by_patient':>11} {'check':>10} {'slots':>10} {'overlap':>10}  (µs/query)")
+    size = 1000
+    while size <= max_size:
+        records = build_records(size)
+        db = open_database(backend, records, tmp_dir)
+        days = sorted({app["date"] for app in records.values()})
+        phones = [f"+39 333 {i % min(size, 50000):07d}" for i in range(queries)]
+        rng = random.Random(size)
+        picked_days = [(rng.choice(days),) for _ in range(queries)]
+        picked_slots = [(rng.choice(days), rng.choice(SLOTS)) for _ in range(queries)]
+
+        results = (
+            time_per_call(db.get_appointments_by_date, picked_days),
+            time_per_call(db.get_appointments_by_patient, [(p,) for p in phones]),
+            time_per_call(db.check_availability, picked_slots),
+            time_per_call(db.get_available_slots, picked_days),
+            time_per_call(db.find_overlapping, [(day, slot, 60) for day, slot in picked_slots]),
+        )
+        print(f"{size:>10} " + " ".join(f"{r:>10.2f}" for r in results))
+        size *= 10
+
+
+def run_horizon_search(days: int = 90, repeats: int = 1000):
+    """First free 60-minute slot when only the last open day has room"""
+    start = date(2030, 1, 7)  # a Monday, so the last day of the horizon is open
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+    occupancy = SlotOccupancy()
+    for day in dates[:-1]:
+        occupancy.set_day(day, {DEFAULT_RESOURCE: span_mask(0, 24 * 60)})
+    begin = time.perf_counter()
+    for _ in range(repeats):
+        found = occupancy.first_free(dates, 60)
+    elapsed = (time.perf_counter() - begin) / repeats * 1e6
+    print(f"first free 60-min slot over {days} days: {found} in {elapsed:.1f} µs")
+
+
+FIRST_NAMES = ["Giulia", "Marco", "Niccolò", "Francesca", "Luca", "Chiara", "Matteo", "Sara",
+               "Alessandro", "Martina", "Lorenzo", "Giorgia", "Andrea", "Elena", "Davide", "Anna"]
+SYLLABLES = ["ro", "bi", "an", "chi", "ver", "di", "co", "lom", "ric", "ci", "mar", "ti", "gal",
+             "lo", "fer", "ra", "san", "to", "gre", "de", "ne", "ri", "bru", "ca", "mo", "zi",
+             "bel", "li", "ghe", "rar", "pu", "gno", "vit", "ta", "mun", "du", "cas", "sel",
+             "ba", "ldi", "fa", "bia", "tor", "te", "za", "gio", "nu", "pel", "val", "le"]
+
+
+def surname_pool(size: int = 20_000):
+    """Fixed vocabulary of three-syllable surnames, some with D' (like a province)"""
+    rng = random.Random(0)
+    pool = set()
+    while len(pool) < size:
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+        pool.add("D'" + surname if rng.random() < 0.1 else surname)
+    return sorted(pool)
+
+
+def patient_name(rng: random.Random, surnames) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(surnames)}"
+
+
+def run_patient_lookup(max_size: int = 1_000_000, queries: int = 1000):
+    """Caller-ID lookups, partial-number and fuzzy name searches as patients grow"""
+    print(f"{'patients':>10} {'caller_id':>10} {'partial':>10} {'name':>10} {'name_scan':>10}  (µs/query)")
+    surnames = surname_pool()
+    size = 1000
+    while size <= max_size:
+        rng = random.Random(size)
+        names = [patient_name(rng, surnames) for _ in range(size)]
+        path = os.path.join(tempfile.mkdtemp(), "patients.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({f"+39 3{i:09d}": {"name": names[i], "phone": f"+39 3{i:09d}"}
+                       for i in range(size)}, f)
+        patients = PatientDatabase(path)
+        picked = [rng.randrange(size) for _ in range(queries)]
+        # Surnames typed with a space for the apostrophe and the last letter wrong
+        typed = [(names[i].split()[-1].replace("'", " ")[:-1] + "x",) for i in picked]
+
+        def scan(term: str):
+            term = term.lower()
+            return [p for p in patients.patients.values() if term in p.get('name', '').lower()]
+
+        results = (
+            time_per_call(patients.get_patient, [(f"00393{i:09d}",) for i in picked]),
+            time_per_call(patients.search_patients, [(f"{i:09d}"[-7:],) for i in picked]),
+            time_per_call(patients.search_patients, typed),
+            time_per_call(scan, typed[:100]),
+        )
+        print(f"{size:>10} " + " ".join(f"{r:>10.1f}" for r in results))
+        size *= 10
+
+
+if __name__ == "__main__":
+    run_horizon_search()
+    run_patient_lookup()
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        sys.argv[2] if len(sys.argv) > 2 else "memory")
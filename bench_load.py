@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Offline load test of the receptionist tool layer.
+Concurrent sessions replay the Italian conversations in CONVERSATION_EXAMPLES:
+a stub realtime model "thinks", routes each patient line to the function tools
+the way the real model is instructed to, then starts "speaking". Bookings go
+to an in-memory calendar, so sessions compete for the same first free slots;
+conflicts and the final calendar's integrity are reported.
+
+Usage: python bench_load.py [sessions] [think_ms] [ramp_s]
+"""
+
+import asyncio
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from alias_resolver import aliases
+from appointment_storage import MemoryStorage
+from calendar_service import calendar
+from dental_tools import (
+    answer_faq, find_next_available, get_insurance_info, get_services_info,
+    reserve_slot, schedule_appointment
+)
+from italian_training_data import CONVERSATION_EXAMPLES
+from patient_database import AppointmentDatabase, PatientDatabase
+from slot_bitmap import DEFAULT_RESOURCE, appointment_duration, resource_keys, to_minutes
+from tool_profiler import percentile, tool_profiler
+
+# Patient line -> intent; the first matching rule wins
+INTENTS = [
+    ("confirm", ("va bene", "perfetto", "ci sarò", "confermo")),
+    ("urgent", ("emergenza", "urgente", "mal di denti", "dolore")),
+    ("book", ("appuntamento", "prenotare", "visita")),
+    ("when", ("settimana", "domani", "oggi")),
+    ("price", ("costa", "prezzo", "quanto")),
+    ("insurance", ("assicurazion", "convenzion")),
+]
+
+SLOT_RE = re.compile(r"(\d{4}-\d{2}-\d{2}) alle (\d{2}:\d{2})")
+HOLD_RE = re.compile(r"Codice blocco: (\S+)")
+# Slots offered, tried and re-offered before a session gives up
+MAX_BOOKING_ATTEMPTS = 6
+
+
+class RunContext:
+    """Stands in for the LiveKit RunContext (the tools do not use it)"""
+
+
+class StubRealtimeModel:
+    """Think time before acting, plus intent routing in place of the LLM"""
+
+    def __init__(self, think_ms: float, rng: random.Random, jitter: float = 0.5):
+        self.think_seconds = think_ms / 1000
+        self.jitter = jitter
+        self.rng = rng
+
+    async def think(self):
+        await asyncio.sleep(self.think_seconds * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+    @staticmethod
+    def intent(text: str) -> str:
+        lowered = text.lower()
+        for intent, keywords in INTENTS:
+            if any(keyword in lowered for keyword in keywords):
+                return intent
+        return "faq"
+
+
+@dataclass
+class LoadStats:
+    turn_latencies: List[float] = field(default_factory=list)
+    booking_sessions: int = 0
+    booked: int = 0
+    conflicts: int = 0
+    no_slot: int = 0
+    gave_up: int = 0
+    errors: Counter = field(default_factory=Counter)
+
+
+class ScriptedSession:
+    """One caller replaying a conversation script against the tools"""
+
+    def __init__(self, number: int, model: StubRealtimeModel, stats: LoadStats, rng: random.Random):
+        self.number = number
+        self.model = model
+        self.stats = stats
+        self.rng = rng
+        self.context = RunContext()
+        self.appointment_type = "visita_controllo"
+        self.from_date = ""
+        self.offered: List[Tuple[str, str]] = []
+        self.wants_booking = False
+
+    async def run(self, lines: List[str]):
+        for line in lines:
+            begin = time.perf_counter()
+            await self.model.think()
+            try:
+                await self.handle(line)
+            except Exception as e:
+                self.stats.errors[type(e).__name__] += 1
+            # First audio out: the model speaks as soon as the tools return
+            self.stats.turn_latencies.append(time.perf_counter() - begin)
+
+    async def offer(self):
+        result = await find_next_available(self.context, self.appointment_type, self.from_date, max_results=3)
+        self.offered = SLOT_RE.findall(result)
+
+    async def handle(self, line: str):
+        intent = self.model.intent(line)
+        if intent in ("book", "urgent"):
+            self.wants_booking = True
+            resolved = aliases.appointment_type(line)
+            self.appointment_type = "visita_urgente" if intent == "urgent" else resolved or "visita_controllo"
+            await self.offer()
+        elif intent == "when":
+            today = date.today()
+            self.from_date = (today + timedelta(days=7 - today.weekday())).isoformat()
+            await self.offer()
+        elif intent == "confirm" and self.wants_booking:
+            await self.book()
+        elif intent == "price":
+            await get_services_info(self.context, line)
+        elif intent == "insurance":
+            await get_insurance_info(self.context)
+        else:
+            await answer_faq(self.context, line)
+
+    async def book(self):
+        """Hold and book one of the offered slots; re-offer after a conflict"""
+        self.stats.booking_sessions += 1
+        for _ in range(MAX_BOOKING_ATTEMPTS):
+            if not self.offered:
+                await self.offer()
+                if not self.offered:
+                    self.stats.no_slot += 1
+                    return
+            slot_date, slot_time = self.offered.pop(self.rng.randrange(len(self.offered)))
+            held = HOLD_RE.search(await reserve_slot(self.context, slot_date, slot_time, self.appointment_type))
+            if held is None:
+                self.stats.conflicts += 1
+                continue
+            result = await schedule_appointment(
+                self.context, f"Paziente {self.number}", f"+39 3{self.number:09d}",
+                slot_date, slot_time, self.appointment_type, hold_code=held.group(1))
+            if "confermato" in result:
+                self.stats.booked += 1
+                return
+            self.stats.conflicts += 1
+        self.stats.gave_up += 1
+
+
+def isolate_calendar():
+    """Point the shared calendar at in-memory storage and temporary files"""
+    calendar.appointment_db = AppointmentDatabase(storage=MemoryStorage())
+    calendar.patient_db = PatientDatabase(os.path.join(tempfile.mkdtemp(), "patients.json"))
+
+
+def overlapping_bookings() -> int:
+    """Confirmed appointments that overlap another one on the same resource"""
+    by_resource: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+    for appointment in calendar.appointment_db.get_appointments_by_status("confermato"):
+        start = to_minutes(appointment["time"])
+        for resource in resource_keys(appointment):
+            by_resource.setdefault((appointment["date"], resource), []).append(
+                (start, start + appointment_duration(appointment)))
+    # Whole-clinic bookings overlap every resource of their day
+    for (day, resource), intervals in list(by_resource.items()):
+        if resource == DEFAULT_RESOURCE:
+            for (other_day, other), other_intervals in by_resource.items():
+                if other_day == day and other != DEFAULT_RESOURCE:
+                    other_intervals.extend(intervals)
+    overlaps = 0
+    for intervals in by_resource.values():
+        latest_end = -1
+        for start, end in sorted(intervals):
+            if start < latest_end:
+                overlaps += 1
+            latest_end = max(latest_end, end)
+    return overlaps
+
+
+async def run_load(sessions: int, think_ms: float = 300.0, ramp_seconds: float = 2.0,
+                   seed: int = 7) -> Dict:
+    """Run `sessions` concurrent scripted sessions and return the summary"""
+    rng = random.Random(seed)
+    model = StubRealtimeModel(think_ms, rng)
+    stats = LoadStats()
+    scripts = [[turn["text"] for turn in example["conversation"] if turn["speaker"] == "paziente"]
+               for example in CONVERSATION_EXAMPLES]
+
+    async def caller(number: int):
+        # Spread arrivals over the ramp instead of one thundering herd
+        await asyncio.sleep(rng.uniform(0, ramp_seconds))
+        await ScriptedSession(number, model, stats, rng).run(scripts[number % len(scripts)])
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(caller(number) for number in range(sessions)))
+    elapsed = time.perf_counter() - begin
+
+    latencies = sorted(stats.turn_latencies)
+    tool_calls = sum(s["calls"] for s in tool_profiler.stats().values())
+    return {
+        "sessions": sessions,
+        "elapsed": elapsed,
+        "turns": len(latencies),
+        "turns_per_second": len(latencies) / elapsed,
+        "tool_calls_per_second": tool_calls / elapsed,
+        **{f"turn_p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+        "turn_max": latencies[-1] if latencies else 0.0,
+        "booking_sessions": stats.booking_sessions,
+        "booked": stats.booked,
+        "conflicts": stats.conflicts,
+        "conflict_rate": stats.conflicts / max(1, stats.booked + stats.conflicts),
+        "no_slot": stats.no_slot,
+        "gave_up": stats.gave_up,
+        "overlapping_bookings": overlapping_bookings(),
+        "errors": dict(stats.errors),
+    }
+
+
+def run(sessions: int = 1000, think_ms: float = 300.0, ramp_seconds: float = 2.0):
+    isolate_calendar()
+    summary = asyncio.run(run_load(sessions, think_ms, ramp_seconds))
+    print(f"{summary['sessions']} sessions, {think_ms:.0f} ms think time, {ramp_seconds:.1f} s ramp: "
+          f"{summary['elapsed']:.2f} s")
+    print(f"  throughput:  {summary['turns_per_second']:.0f} turns/s, "
+          f"{summary['tool_calls_per_second']:.0f} tool calls/s")
+    print(f"  first audio: p50 {summary['turn_p50'] * 1000:.0f} ms, p95 {summary['turn_p95'] * 1000:.0f} ms, "
+          f"p99 {summary['turn_p99'] * 1000:.0f} ms, max {summary['turn_max'] * 1000:.0f} ms")
+    print(f"  bookings:    {summary['booked']}/{summary['booking_sessions']} confirmed, "
+          f"{summary['conflicts']} conflicts ({summary['conflict_rate']:.1%} of attempts), "
+          f"{summary['gave_up']} gave up, {summary['no_slot']} without a slot, "
+          f"{summary['overlapping_bookings']} overlapping")
+    if summary["errors"]:
+        print(f"  errors:      {summary['errors']}")
+    print()
+    print(tool_profiler.report())
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 300.0,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 2.0)
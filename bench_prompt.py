@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of prompt size vs. first-audio latency.
+A stub realtime model charges a fixed connection cost plus a prefill cost per
+instruction token before it emits the first audio frame, so the numbers show
+how much of the greeting delay each prompt variant is responsible for.
+
+Usage: python bench_prompt.py [sessions] [prefill_us_per_token]
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from prompt_builder import COMPACT_BUDGET, PromptBuilder, count_tokens
+from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
+
+
+class StubRealtimeModel:
+    """Sleeps like a realtime model before the first audio frame"""
+
+    def __init__(self, connect_ms: float = 120.0, prefill_us_per_token: float = 150.0,
+                 jitter_ms: float = 10.0, seed: int = 7):
+        self.connect = connect_ms / 1000
+        self.prefill = prefill_us_per_token / 1e6
+        self.jitter = jitter_ms / 1000
+        self.rng = random.Random(seed)
+
+    async def first_audio(self, instructions: str, session_instruction: str) -> float:
+        """Seconds until the first audio frame of the greeting"""
+        begin = time.perf_counter()
+        tokens = count_tokens(instructions) + count_tokens(session_instruction)
+        await asyncio.sleep(self.connect + tokens * self.prefill + self.rng.uniform(0, self.jitter))
+        return time.perf_counter() - begin
+
+
+async def measure(model: StubRealtimeModel, agent: str, session: str, sessions: int):
+    latencies = [await model.first_audio(agent, session) for _ in range(sessions)]
+    return statistics.median(latencies) * 1000, max(latencies) * 1000
+
+
+def run(sessions: int = 20, prefill_us_per_token: float = 150.0):
+    builder = PromptBuilder()
+    model = StubRealtimeModel(prefill_us_per_token=prefill_us_per_token)
+
+    begin = time.perf_counter()
+    builder.build(COMPACT_BUDGET)
+    build_ms = (time.perf_counter() - begin) * 1000
+
+    variants = [("static prompts.py", AGENT_INSTRUCTION, SESSION_INSTRUCTION)]
+    for budget in (None, 800, COMPACT_BUDGET, 400):
+        built = builder.build(budget)
+        variants.append((f"budget {budget or 'full'}", built.agent_instruction, built.session_instruction))
+
+    print(f"{sessions} sessions per variant, {prefill_us_per_token:.0f} µs prefill per token, "
+          f"prompt build {build_ms:.2f} ms (cached afterwards)")
+    print(f"{'variant':>18} {'tokens':>7} {'chars':>6} {'p50 ms':>8} {'max ms':>8}")
+    for name, agent, session in variants:
+        p50, worst = asyncio.run(measure(model, agent, session, sessions))
+        tokens = count_tokens(agent) + count_tokens(session)
+        print(f"{name:>18} {tokens:>7} {len(agent) + len(session):>6} {p50:>8.1f} {worst:>8.1f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 150.0)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the static knowledge tools.
+Compares rendering the answer on every call (previous behaviour) with the
+precomputed lookups in knowledge_responses.
+
+Usage: python bench_responses.py [calls]
+"""
+
+import sys
+import time
+
+import clinic_knowledge as k
+from knowledge_responses import (
+    KnowledgeResponses, render_clinic_info, render_insurance_info,
+    render_payment_info, render_service_info
+)
+
+
+def time_per_call(fn, args_list, repeats: int) -> float:
+    """Average microseconds per call"""
+    begin = time.perf_counter()
+    for _ in range(repeats):
+        for args in args_list:
+            fn(*args)
+    return (time.perf_counter() - begin) / (repeats * len(args_list)) * 1e6
+
+
+def run(calls: int = 100_000):
+    responses = KnowledgeResponses()
+    cases = [
+        ("clinic hours", render_clinic_info, ("hours", k.CLINIC_INFO),
+         responses.clinic_info, ("hours",)),
+        ("clinic general", render_clinic_info, ("general", k.CLINIC_INFO),
+         responses.clinic_info, ("general",)),
+        ("services all", render_service_info, ("all", k.SERVICES),
+         responses.service_info, ("all",)),
+        ("service one", render_service_info, ("ortodonzia", k.SERVICES),
+         responses.service_info, ("ortodonzia",)),
+        ("insurance", render_insurance_info, ("", k.INSURANCE_INFO),
+         responses.insurance_info, ("",)),
+        ("insurance unknown", render_insurance_info, ("Altra", k.INSURANCE_INFO),
+         responses.insurance_info, ("Altra",)),
+        ("payment", render_payment_info, (k.PAYMENT_OPTIONS,),
+         responses.payment_info, ()),
+    ]
+    print(f"{'tool answer':>18} {'render':>10} {'cached':>10} {'speedup':>8}  (µs/call)")
+    for name, render, render_args, cached, cached_args in cases:
+        rendered = time_per_call(render, [render_args], calls)
+        lookup = time_per_call(cached, [cached_args], calls)
+        print(f"{name:>18} {rendered:>10.3f} {lookup:>10.3f} {rendered / lookup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for search_web, against a fake search provider.
+Compares the old pattern (blocking backend called on the event loop) with
+WebSearchService under concurrent sessions asking overlapping questions.
+
+Usage: python bench_search.py [sessions] [latency_ms]
+"""
+
+import asyncio
+import random
+import sys
+import threading
+import time
+
+from web_search import WebSearchService
+
+QUERIES = [
+    "orari farmacia di turno Roma",
+    "sbiancamento dentale rischi",
+    "bonus dentista 2024",
+    "cosa mangiare dopo estrazione dente",
+    "apparecchio invisibile costo",
+    "parcheggio via Roma Milano",
+]
+
+
+class FakeSearchBackend:
+    """Sleeps like a network search and counts calls"""
+
+    def __init__(self, latency: float = 0.2):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return f"Risultati per '{query}'"
+
+
+async def run_blocking(backend: FakeSearchBackend, queries):
+    """Baseline: each tool call blocks the loop for the whole search"""
+    async def tool(query):
+        return backend.search(query)
+    await asyncio.gather(*(tool(q) for q in queries))
+
+
+async def run_service(service: WebSearchService, queries):
+    await asyncio.gather(*(service.search(q) for q in queries))
+
+
+def run(sessions: int = 60, latency_ms: int = 200):
+    rng = random.Random(7)
+    queries = [rng.choice(QUERIES) for _ in range(sessions)]
+    print(f"{sessions} sessions, {len(set(queries))} distinct queries, {latency_ms} ms per search")
+
+    backend = FakeSearchBackend(latency_ms / 1000)
+    begin = time.perf_counter()
+    asyncio.run(run_blocking(backend, queries))
+    print(f"blocking on event loop: {time.perf_counter() - begin:7.2f} s, {backend.calls} backend calls")
+
+    backend = FakeSearchBackend(latency_ms / 1000)
+    service = WebSearchService(backend, max_workers=4)
+    begin = time.perf_counter()
+    asyncio.run(run_service(service, queries))
+    print(f"thread pool + dedupe:   {time.perf_counter() - begin:7.2f} s, {backend.calls} backend calls")
+
+    begin = time.perf_counter()
+    asyncio.run(run_service(service, queries))
+    print(f"warm cache:             {time.perf_counter() - begin:7.4f} s, {backend.calls} backend calls")
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 60,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200)
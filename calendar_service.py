@@ -0,0 +1,179 @@
+# Shared calendar service for the dental tools
+# Single source of truth for bookings: every tool reads and writes through the
+# persistent databases in patient_database.py. Slot lists are cached per date
+# and invalidated whenever a booking touches that date. Availability is asked
+# for a Requirement (see slot_bitmap.py): the resources an appointment needs.
+# Async callers go through `run_db`: with backends that query and commit
+# synchronously (SQLite) reads and writes run on one database thread, so the
+# event loop never waits on disk.
+
+import asyncio
+import time as _time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from async_persistence import wait_durable
+from knowledge_base import KnowledgeBase, knowledge
+from phone_numbers import phone_key
+from slot_bitmap import DEFAULT_DURATION, DEFAULT_REQUIREMENT, Requirement, requirement_for
+from slot_reservation import ReservationManager
+
+T = TypeVar("T")
+
+
+class CalendarService:
+    def __init__(self, appointment_db=None, patient_db=None, cache_ttl: float = 5.0,
+                 knowledge_base: KnowledgeBase = knowledge):
+        if appointment_db is None or patient_db is None:
+            import patient_database
+            appointment_db = appointment_db or patient_database.appointment_db
+            patient_db = patient_db or patient_database.patient_db
+        self.appointment_db = appointment_db
+        self.patient_db = patient_db
+        # Bounds staleness when another worker writes to a shared backend (SQLite)
+        self.cache_ttl = cache_ttl
+        # date -> (duration, requirement) -> (cached_at, free start times)
+        self._slot_cache: Dict[str, Dict[Tuple[int, Requirement], Tuple[float, List[str]]]] = {}
+        # New hours or closures change every cached slot list
+        knowledge_base.on_reload(lambda snapshot: self._slot_cache.clear())
+        # One thread, so writes keep their order and reads never see a half-done
+        # transaction; JSON backends serve reads from memory and queue their saves
+        blocking = any(getattr(db, "blocking_writes", False) for db in (appointment_db, patient_db))
+        self._db_executor = (ThreadPoolExecutor(max_workers=1, thread_name_prefix="calendar-db")
+                             if blocking else None)
+
+    def _invalidate(self, *dates: str):
+        """Drop cached slot lists for the given dates"""
+        for date in dates:
+            self._slot_cache.pop(date, None)
+
+    def available_slots(self, date: str, duration: int = DEFAULT_DURATION,
+                        requirement: Requirement = DEFAULT_REQUIREMENT) -> List[str]:
+        """Free start times for a date, served from the read cache when fresh"""
+        by_request = self._slot_cache.setdefault(date, {})
+        cached = by_request.get((duration, requirement))
+        now = _time.monotonic()
+        if cached is not None and now - cached[0] < self.cache_ttl:
+            return cached[1]
+        slots = self.appointment_db.get_available_slots(date, duration, requirement)
+        by_request[(duration, requirement)] = (now, slots)
+        return slots
+
+    def is_available(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                     requirement: Requirement = DEFAULT_REQUIREMENT, exclude: str = "") -> bool:
+        """Authoritative check against the database (not cached); `exclude` is a booking being moved"""
+        return self.appointment_db.check_availability(date, time, duration, requirement, exclude)
+
+    def assign(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+               requirement: Requirement = DEFAULT_REQUIREMENT,
+               unavailable: Tuple[str, ...] = (), exclude: str = "") -> Optional[Tuple[str, ...]]:
+        """Free resources meeting the requirement at that time (None if there are none)"""
+        return self.appointment_db.assign_resources(date, time, duration, requirement, unavailable, exclude)
+
+    def find_next_slots(self, from_date: str, duration: int = DEFAULT_DURATION, limit: int = 3,
+                        horizon_days: int = 90, practitioner: str = "",
+                        time_of_day: str = "", appointment_type: str = "") -> List[Tuple[str, str]]:
+        """
+        First free (date, time) starts from from_date, in one pass over the slot index.
+        Starts earlier than the current time are skipped.
+        """
+        now = datetime.now()
+        today = now.date().isoformat()
+        from_date = max(from_date, today)
+        return self.appointment_db.find_next_slots(
+            from_date, horizon_days, duration, limit,
+            requirement_for(appointment_type, practitioner), time_of_day,
+            not_before=(today, now.strftime("%H:%M"))
+        )
+
+    def find_appointment(self, phone: str, date: str, time: str = "") -> List[Dict]:
+        """
+        The patient's confirmed appointments on a date, narrowed by time when given
+        (other patients may hold the same time on other chairs)
+        """
+        number = phone_key(phone)
+        return [app for app in self.appointment_db.get_appointments_by_date(date)
+                if app.get('status') == 'confermato' and phone_key(app.get('phone', '')) == number
+                and (not time or app.get('time') == time)]
+
+    def book(self, patient_name: str, phone: str, date: str, time: str,
+             appointment_type: str, notes: str = "", resources: Tuple[str, ...] = ()) -> str:
+        """
+        Persist a booking and link it to the patient record.
+        `resources` are the ones held for it; without them the database assigns
+        free ones. Returns the id, or "" if the slot was taken in the meantime.
+        """
+        appointment_data = {
+            "patient_name": patient_name,
+            "phone": phone,
+            "date": date,
+            "time": time,
+            "type": appointment_type,
+            "notes": notes
+        }
+        if resources:
+            appointment_data["resources"] = list(resources)
+        appointment_id = self.appointment_db.add_appointment_if_free(appointment_data)
+        self._invalidate(date)
+        if appointment_id:
+            self._remember_patient(patient_name, phone, appointment_id)
+        return appointment_id
+
+    def cancel(self, appointment: Dict) -> bool:
+        """Cancel a booking found via find_appointment"""
+        cancelled = self.appointment_db.cancel_appointment(appointment['id'])
+        self._invalidate(appointment.get('date', ''))
+        return cancelled
+
+    def reschedule(self, appointment: Dict, new_date: str, new_time: str,
+                   resources: Tuple[str, ...] = ()) -> bool:
+        """
+        Move a booking to a new date and time (and to the resources held there).
+        False if the new slot was taken in the meantime.
+        """
+        old_date = appointment.get('date', '')
+        changes = {"date": new_date, "time": new_time}
+        if resources:
+            changes["resources"] = list(resources)
+        moved = self.appointment_db.update_appointment_if_free(appointment['id'], changes)
+        self._invalidate(old_date, new_date)
+        return moved
+
+    def save_patient(self, patient_data: Dict) -> str:
+        """Create or update a patient record"""
+        phone = patient_data.get('phone', '')
+        if self.patient_db.get_patient(phone) is not None:
+            return self.patient_db.update_patient(phone, patient_data)
+        return self.patient_db.add_patient(patient_data)
+
+    async def run_db(self, action: Callable[[], T]) -> T:
+        """Run calendar reads or writes (find_appointment, book, ...) without blocking the event loop"""
+        if self._db_executor is None:
+            return action()
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, action)
+
+    async def persisted(self) -> bool:
+        """
+        Wait, without blocking the event loop, until every write queued so far
+        is on disk. False if a background save failed.
+        """
+        try:
+            await wait_durable(self.appointment_db.durable())
+            await wait_durable(self.patient_db.durable())
+            return True
+        except Exception:
+            return False
+
+    def _remember_patient(self, patient_name: str, phone: str, appointment_id: str):
+        self.save_patient({
+            "name": patient_name,
+            "phone": phone,
+            "last_appointment": appointment_id,
+            "last_booking_at": datetime.now().isoformat()
+        })
+
+
+# Shared instances used by the function tools
+calendar = CalendarService()
+reservations = ReservationManager(calendar)
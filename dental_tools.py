@@ -1,18 +1,19 @@
 import logging
 from livekit.agents import function_tool, RunContext
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, List
 import json
-from clinic_knowledge import (
-    CLINIC_INFO, SERVICES, FAQ, APPOINTMENT_TYPES, 
-    INSURANCE_INFO, PAYMENT_OPTIONS, STAFF
-)
-
-# Simple in-memory storage for appointments (in production, use a proper database)
-appointments_db = {}
-patient_db = {}
+from knowledge_base import knowledge
+from calendar_service import calendar, reservations
+from knowledge_responses import responses
+from faq_index import faq_search
+from semantic_index import semantic_index
+from alias_resolver import aliases
+from tool_profiler import profiled_tool
+from slot_bitmap import bookable, clinic_hours, requirement_for
 
 @function_tool()
+@profiled_tool
 async def get_clinic_info(
     context: RunContext,
     info_type: str = "general"
@@ -22,44 +23,14 @@ async def get_clinic_info(
     info_type può essere: 'general', 'hours', 'contact', 'location', 'parking'
     """
     try:
-        if info_type == "general":
-            return f"""
-Studio Dentistico Dottoressa Emanuela
-Indirizzo: {CLINIC_INFO['address']}
-Telefono: {CLINIC_INFO['phone']}
-Email: {CLINIC_INFO['email']}
-Orari: Lunedì-Venerdì 9:00-18:00, Sabato 9:00-13:00
-{CLINIC_INFO['emergency_hours']}
-{CLINIC_INFO['parking']}
-"""
-        elif info_type == "hours":
-            hours_text = "Orari di apertura:\n"
-            for day, hours in CLINIC_INFO['hours'].items():
-                hours_text += f"{day.capitalize()}: {hours}\n"
-            hours_text += f"\n{CLINIC_INFO['emergency_hours']}"
-            return hours_text
-        
-        elif info_type == "contact":
-            return f"""
-Contatti Studio Dentistico Dottoressa Emanuela:
-Telefono: {CLINIC_INFO['phone']}
-Email: {CLINIC_INFO['email']}
-Sito web: {CLINIC_INFO['website']}
-"""
-        elif info_type == "location":
-            return f"""
-Indirizzo: {CLINIC_INFO['address']}
-{CLINIC_INFO['parking']}
-{CLINIC_INFO['accessibility']}
-"""
-        else:
-            return "Tipo di informazione non riconosciuto. Posso fornire informazioni generali, orari, contatti o posizione."
+        return responses.clinic_info(info_type)
             
     except Exception as e:
         logging.error(f"Errore nel recupero informazioni clinica: {e}")
         return "Mi dispiace, si è verificato un errore nel recupero delle informazioni."
 
 @function_tool()
+@profiled_tool
 async def get_services_info(
     context: RunContext,
     service_type: str = "all"
@@ -69,54 +40,71 @@ async def get_services_info(
     service_type può essere: 'all', 'odontoiatria_generale', 'igiene_dentale', 'ortodonzia', 'implantologia', 'estetica_dentale', 'endodonzia', 'chirurgia_orale', 'protesi'
     """
     try:
-        if service_type == "all":
-            services_text = "Servizi offerti dal nostro studio:\n\n"
-            for key, service in SERVICES.items():
-                services_text += f"• {service['name']}: {service['description']}\n"
-                services_text += f"  Durata: {service['duration']}, Costo: {service['price_range']}\n\n"
-            return services_text
-        
-        elif service_type in SERVICES:
-            service = SERVICES[service_type]
-            return f"""
-{service['name']}
-Descrizione: {service['description']}
-Durata della seduta: {service['duration']}
-Costo indicativo: {service['price_range']}
-"""
-        else:
-            return "Servizio non trovato. I nostri servizi principali sono: odontoiatria generale, igiene dentale, ortodonzia, implantologia, estetica dentale, endodonzia, chirurgia orale e protesi."
+        # Accetta anche nomi liberi ("pulizia", "sbiancamento")
+        if service_type != "all":
+            service_type = aliases.service(service_type) or service_type
+        return responses.service_info(service_type)
             
     except Exception as e:
         logging.error(f"Errore nel recupero informazioni servizi: {e}")
         return "Mi dispiace, si è verificato un errore nel recupero delle informazioni sui servizi."
 
 @function_tool()
+@profiled_tool
 async def answer_faq(
     context: RunContext,
-    question_topic: str
+    question_topic: str,
+    max_results: int = 1
 ) -> str:
     """
     Risponde alle domande frequenti sui servizi dentistici.
-    question_topic può essere: 'costi', 'assicurazioni', 'emergenze', 'prima_visita', 'pagamenti', 'bambini', 'anestesia', 'igiene_frequenza'
+    question_topic può essere un argomento ('costi', 'assicurazioni', 'emergenze', 'prima_visita', 'pagamenti', 'bambini', 'anestesia', 'igiene_frequenza') o la domanda del paziente.
+    max_results: numero massimo di risposte (1-3)
     """
     try:
-        # Cerca la domanda più pertinente
-        for key, faq_item in FAQ.items():
-            if question_topic.lower() in key.lower() or question_topic.lower() in faq_item['question'].lower():
-                return f"Domanda: {faq_item['question']}\nRisposta: {faq_item['answer']}"
+        # Cerca le domande più pertinenti nell'indice delle FAQ
+        hits = faq_search.search(question_topic, limit=max(1, min(max_results, 3)))
+        if hits:
+            return "\n\n".join(
+                f"Domanda: {hit.question}\nRisposta: {hit.answer}\nPertinenza: {hit.confidence:.0%}"
+                for hit in hits
+            )
         
-        # Se non trova una corrispondenza esatta, restituisce tutte le FAQ
-        faq_text = "Ecco le nostre domande frequenti:\n\n"
-        for faq_item in FAQ.values():
-            faq_text += f"Q: {faq_item['question']}\nR: {faq_item['answer']}\n\n"
-        return faq_text
+        # Nessuna corrispondenza: risposta breve con alcuni argomenti disponibili
+        topics = "; ".join(faq_search.topics(limit=4))
+        return f"Non ho una risposta specifica a questa domanda. Posso rispondere ad esempio a: {topics}"
         
     except Exception as e:
         logging.error(f"Errore nel recupero FAQ: {e}")
         return "Mi dispiace, si è verificato un errore nel recupero delle informazioni."
 
 @function_tool()
+@profiled_tool
+async def search_knowledge(
+    context: RunContext,
+    query: str,
+    max_results: int = 3
+) -> str:
+    """
+    Cerca nella knowledge base dello studio (FAQ, servizi e prezzi, tipi di visita, orari, contatti, assicurazioni, pagamenti).
+    query: la domanda del paziente con parole sue, ad esempio "quanto pago per l'apparecchio?"
+    max_results: numero massimo di risultati (1-5)
+    """
+    try:
+        hits = semantic_index.search(query, limit=max(1, min(max_results, 5)))
+        if not hits:
+            return "Non ho trovato informazioni su questo argomento. Posso verificare con lo studio e farle sapere?"
+        
+        return "Informazioni pertinenti:\n" + "\n".join(
+            f"• {hit.title}: {hit.text}" for hit in hits
+        )
+        
+    except Exception as e:
+        logging.error(f"Errore nella ricerca nella knowledge base: {e}")
+        return "Mi dispiace, si è verificato un errore nella ricerca delle informazioni."
+
+@function_tool()
+@profiled_tool
 async def check_availability(
     context: RunContext,
     date: str,
@@ -128,34 +116,34 @@ async def check_availability(
     appointment_type: tipo di appuntamento richiesto
     """
     try:
-        # Simulazione controllo disponibilità (in produzione, integrare con sistema di calendario reale)
+        appointment_types = knowledge.snapshot.appointment_types
+        appointment_type = aliases.appointment_type(appointment_type) or appointment_type
         target_date = datetime.strptime(date, "%Y-%m-%d")
         
         # Controlla se la data è nel passato
         if target_date.date() < datetime.now().date():
             return "Mi dispiace, non posso prenotare appuntamenti per date passate."
         
-        # Controlla se è domenica (clinica chiusa)
-        if target_date.weekday() == 6:  # Domenica
-            return "Mi dispiace, la clinica è chiusa la domenica. Posso proporle un altro giorno?"
-        
-        # Controlla se è sabato (orario ridotto)
-        if target_date.weekday() == 5:  # Sabato
-            available_times = ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30", "12:00", "12:30"]
-        else:
-            available_times = ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30", 
-                             "14:00", "14:30", "15:00", "15:30", "16:00", "16:30", "17:00", "17:30"]
+        # Controlla i giorni di chiusura (domenica, festività, chiusure dello studio)
+        closed = clinic_hours.closed_reason(date)
+        if closed:
+            return f"Mi dispiace, il {date} la clinica è chiusa ({closed}). Posso proporle un altro giorno?"
         
-        # Simula alcuni slot già occupati
-        occupied_slots = appointments_db.get(date, [])
-        available_times = [time for time in available_times if time not in occupied_slots]
+        # Slot liberi dal calendario condiviso, tenendo conto della durata della visita
+        duration = appointment_types.get(appointment_type, {}).get('duration', 30)
+        available_times = await calendar.run_db(
+            lambda: calendar.available_slots(date, duration, requirement_for(appointment_type)))
         
         if available_times:
             return f"Disponibilità per {date}:\nOrari disponibili: {', '.join(available_times[:6])}"
         else:
-            # Proponi date alternative
-            next_date = target_date + timedelta(days=1)
-            return f"Mi dispiace, non ci sono slot disponibili per {date}. Posso proporle {next_date.strftime('%Y-%m-%d')}?"
+            # Proponi il primo slot realmente libero nei giorni successivi
+            next_slots = await calendar.run_db(
+                lambda: calendar.find_next_slots(date, duration, limit=1, appointment_type=appointment_type))
+            if next_slots:
+                next_date, next_time = next_slots[0]
+                return f"Mi dispiace, non ci sono slot disponibili per {date}. Il primo orario libero è {next_date} alle {next_time}. Va bene?"
+            return f"Mi dispiace, non ci sono slot disponibili per {date} né nei prossimi mesi. Posso segnarla in lista d'attesa?"
             
     except ValueError:
         return "Formato data non valido. Utilizzare il formato YYYY-MM-DD (es. 2024-01-15)."
@@ -164,6 +152,104 @@ async def check_availability(
         return "Mi dispiace, si è verificato un errore nel controllo della disponibilità."
 
 @function_tool()
+@profiled_tool
+async def find_next_available(
+    context: RunContext,
+    appointment_type: str = "visita_controllo",
+    from_date: str = "",
+    time_of_day: str = "",
+    practitioner: str = "",
+    max_results: int = 3
+) -> str:
+    """
+    Trova i primi orari liberi per un tipo di appuntamento, a partire da una data, in un'unica chiamata.
+    from_date formato: YYYY-MM-DD (vuoto = oggi)
+    time_of_day può essere: '', 'mattina', 'pomeriggio'
+    practitioner può essere: '', 'dott_emanuela', 'igienista'
+    """
+    try:
+        appointment_types = knowledge.snapshot.appointment_types
+        appointment_type = aliases.appointment_type(appointment_type) or appointment_type
+        staff = knowledge.snapshot.staff
+        if appointment_type not in appointment_types:
+            return f"Tipo di appuntamento non riconosciuto. Tipi disponibili: {', '.join(appointment_types.keys())}"
+        if practitioner and practitioner not in staff:
+            return f"Professionista non riconosciuto. Disponibili: {', '.join(staff.keys())}"
+        
+        start = from_date or datetime.now().strftime("%Y-%m-%d")
+        datetime.strptime(start, "%Y-%m-%d")
+        
+        appointment_info = appointment_types[appointment_type]
+        slots = await calendar.run_db(lambda: calendar.find_next_slots(
+            start, appointment_info['duration'], limit=max(1, min(max_results, 10)),
+            practitioner=practitioner, time_of_day=time_of_day, appointment_type=appointment_type
+        ))
+        
+        if not slots:
+            return f"Mi dispiace, non ci sono orari liberi per {appointment_info['name']} nei prossimi mesi."
+        
+        options = ', '.join(f"{slot_date} alle {slot_time}" for slot_date, slot_time in slots)
+        return f"Primi orari liberi per {appointment_info['name']}: {options}"
+        
+    except ValueError:
+        return "Formato data non valido. Utilizzare il formato YYYY-MM-DD (es. 2024-01-15)."
+    except Exception as e:
+        logging.error(f"Errore nella ricerca del primo orario libero: {e}")
+        return "Mi dispiace, si è verificato un errore nella ricerca degli orari disponibili."
+
+def _outside_hours(date: str, time: str, duration: int) -> str:
+    """Risposta per un orario fuori dagli orari di apertura ('' se è prenotabile)"""
+    closed = clinic_hours.closed_reason(date)
+    if closed:
+        return f"Mi dispiace, il {date} la clinica è chiusa ({closed}). Posso proporle un altro giorno?"
+    if not bookable(date, time, duration):
+        return (f"Mi dispiace, alle {time} non è possibile fissare un appuntamento di {duration} minuti "
+                f"negli orari di apertura. Posso proporle altri orari?")
+    return ""
+
+@function_tool()
+@profiled_tool
+async def reserve_slot(
+    context: RunContext,
+    date: str,
+    time: str,
+    appointment_type: str = "visita_controllo"
+) -> str:
+    """
+    Blocca temporaneamente uno slot mentre il paziente conferma, così nessun altro può prenotarlo.
+    Restituisce un codice di blocco da passare a schedule_appointment.
+    Parametri: data (YYYY-MM-DD), ora (HH:MM), tipo appuntamento
+    """
+    try:
+        appointment_types = knowledge.snapshot.appointment_types
+        appointment_type = aliases.appointment_type(appointment_type) or appointment_type
+        appointment_datetime = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+        if appointment_datetime < datetime.now():
+            return "Non posso bloccare slot per date e orari passati."
+        
+        if appointment_type not in appointment_types:
+            return f"Tipo di appuntamento non riconosciuto. Tipi disponibili: {', '.join(appointment_types.keys())}"
+        
+        outside = _outside_hours(date, time, appointment_types[appointment_type]['duration'])
+        if outside:
+            return outside
+        
+        hold = await reservations.hold(date, time, appointment_types[appointment_type]['duration'],
+                                       requirement_for(appointment_type))
+        if hold is None:
+            return f"Mi dispiace, lo slot {date} alle {time} non è più disponibile. Posso proporle altri orari?"
+        
+        minutes = int(reservations.hold_seconds // 60)
+        return f"Slot {date} alle {time} bloccato per {minutes} minuti. Codice blocco: {hold.token}"
+        
+    except ValueError:
+        return "Formato data o ora non valido. Utilizzare YYYY-MM-DD per la data e HH:MM per l'ora."
+    except Exception as e:
+        logging.error(f"Errore nel blocco dello slot: {e}")
+        return "Mi dispiace, si è verificato un errore nel blocco dello slot."
+
+@function_tool()
+@profiled_tool
 async def schedule_appointment(
     context: RunContext,
     patient_name: str,
@@ -171,13 +257,17 @@ async def schedule_appointment(
     date: str,
     time: str,
     appointment_type: str = "visita_controllo",
-    notes: str = ""
+    notes: str = "",
+    hold_code: str = ""
 ) -> str:
     """
     Prenota un nuovo appuntamento.
-    Parametri: nome paziente, telefono, data (YYYY-MM-DD), ora (HH:MM), tipo appuntamento, note aggiuntive
+    Parametri: nome paziente, telefono, data (YYYY-MM-DD), ora (HH:MM), tipo appuntamento, note aggiuntive,
+    codice blocco restituito da reserve_slot (opzionale)
     """
     try:
+        appointment_types = knowledge.snapshot.appointment_types
+        appointment_type = aliases.appointment_type(appointment_type) or appointment_type
         # Validazione data e ora
         appointment_datetime = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
         
@@ -185,37 +275,35 @@ async def schedule_appointment(
             return "Non posso prenotare appuntamenti per date e orari passati."
         
         # Controlla se il tipo di appuntamento esiste
-        if appointment_type not in APPOINTMENT_TYPES:
-            return f"Tipo di appuntamento non riconosciuto. Tipi disponibili: {', '.join(APPOINTMENT_TYPES.keys())}"
-        
-        # Simula la prenotazione (in produzione, salvare in database)
-        appointment_id = f"APP_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        if appointment_type not in appointment_types:
+            return f"Tipo di appuntamento non riconosciuto. Tipi disponibili: {', '.join(appointment_types.keys())}"
         
-        appointment_data = {
-            "id": appointment_id,
-            "patient_name": patient_name,
-            "phone": phone,
-            "date": date,
-            "time": time,
-            "type": appointment_type,
-            "notes": notes,
-            "status": "confermato",
-            "created_at": datetime.now().isoformat()
-        }
-        
-        # Salva l'appuntamento
-        if date not in appointments_db:
-            appointments_db[date] = []
-        appointments_db[date].append(time)
+        # Usa il blocco esistente oppure blocca lo slot per tutta la durata
+        appointment_info = appointment_types[appointment_type]
+        outside = _outside_hours(date, time, appointment_info['duration'])
+        if outside:
+            return outside
+        if hold_code:
+            hold = reservations.get(hold_code)
+            if (hold is None or hold.date != date or hold.time != time or hold.exclude
+                    or hold.duration != appointment_info['duration']
+                    or hold.requirement != requirement_for(appointment_type)):
+                return "Il blocco dello slot è scaduto o non corrisponde. Verifico di nuovo la disponibilità?"
+        else:
+            hold = await reservations.hold(date, time, appointment_info['duration'], requirement_for(appointment_type))
+            if hold is None:
+                return f"Mi dispiace, lo slot {date} alle {time} è già occupato. Posso proporle altri orari?"
         
-        # Salva i dati del paziente
-        patient_db[phone] = {
-            "name": patient_name,
-            "phone": phone,
-            "last_appointment": appointment_id
-        }
+        # Salva l'appuntamento (compare-and-set sullo slot) e collega il paziente
+        appointment_id = await reservations.commit(
+            hold, lambda: calendar.book(patient_name, phone, date, time, appointment_type, notes, hold.resources)
+        )
+        if not appointment_id:
+            return f"Mi dispiace, lo slot {date} alle {time} è stato appena occupato. Posso proporle altri orari?"
         
-        appointment_info = APPOINTMENT_TYPES[appointment_type]
+        # Attende la scrittura su disco senza bloccare le altre sessioni
+        if not await calendar.persisted():
+            return "Mi dispiace, si è verificato un errore nel salvataggio della prenotazione. La prego di riprovare."
         
         return f"""
 Appuntamento confermato!
@@ -239,6 +327,7 @@ Ricordi di portare un documento d'identità e la tessera sanitaria.
         return "Mi dispiace, si è verificato un errore durante la prenotazione. La prego di riprovare."
 
 @function_tool()
+@profiled_tool
 async def collect_patient_info(
     context: RunContext,
     name: str,
@@ -267,7 +356,9 @@ async def collect_patient_info(
         }
         
         # Salva i dati del paziente
-        patient_db[phone] = patient_data
+        await calendar.run_db(lambda: calendar.save_patient(patient_data))
+        if not await calendar.persisted():
+            return "Mi dispiace, si è verificato un errore nel salvataggio delle informazioni."
         
         return f"""
 Informazioni paziente registrate:
@@ -285,6 +376,7 @@ Ricordi di portare un documento d'identità, tessera sanitaria ed eventuali radi
         return "Mi dispiace, si è verificato un errore nel salvataggio delle informazioni."
 
 @function_tool()
+@profiled_tool
 async def cancel_appointment(
     context: RunContext,
     patient_name: str,
@@ -298,9 +390,11 @@ async def cancel_appointment(
     """
     try:
         # Cerca l'appuntamento
-        if date in appointments_db:
-            if time and time in appointments_db[date]:
-                appointments_db[date].remove(time)
+        matches = await calendar.run_db(lambda: calendar.find_appointment(phone, date, time))
+        if matches:
+            if time:
+                if not (await calendar.run_db(lambda: calendar.cancel(matches[0])) and await calendar.persisted()):
+                    return "Mi dispiace, si è verificato un errore durante la cancellazione."
                 return f"""
 Appuntamento cancellato con successo.
 
@@ -311,9 +405,10 @@ Dettagli cancellazione:
 
 La cancellazione è stata registrata. Se desidera riprogrammare, sarò felice di aiutarla a trovare una nuova data.
 """
-            elif not time:
+            else:
                 # Se non è specificata l'ora, mostra gli appuntamenti per quella data
-                return f"Ho trovato appuntamenti per {date}. Può specificare l'orario da cancellare?"
+                times = ', '.join(app.get('time', '') for app in matches)
+                return f"Ho trovato appuntamenti per {date} alle {times}. Può specificare l'orario da cancellare?"
 
         return f"Non ho trovato appuntamenti per {patient_name} in data {date}. Può verificare i dati?"
 
@@ -322,6 +417,7 @@ La cancellazione è stata registrata. Se desidera riprogrammare, sarò felice di
         return "Mi dispiace, si è verificato un errore durante la cancellazione."
 
 @function_tool()
+@profiled_tool
 async def reschedule_appointment(
     context: RunContext,
     patient_name: str,
@@ -336,8 +432,10 @@ async def reschedule_appointment(
     Parametri: nome, telefono, vecchia data, vecchia ora, nuova data, nuova ora
     """
     try:
+        appointment_types = knowledge.snapshot.appointment_types
         # Verifica che il vecchio appuntamento esista
-        if old_date not in appointments_db or old_time not in appointments_db[old_date]:
+        matches = await calendar.run_db(lambda: calendar.find_appointment(phone, old_date, old_time))
+        if not matches:
             return f"Non ho trovato l'appuntamento originale per {patient_name} il {old_date} alle {old_time}."
 
         # Verifica disponibilità della nuova data/ora
@@ -345,18 +443,23 @@ async def reschedule_appointment(
         if new_datetime < datetime.now():
             return "Non posso riprogrammare per date e orari passati."
 
-        # Controlla se il nuovo slot è disponibile
-        if new_date in appointments_db and new_time in appointments_db[new_date]:
+        # Blocca il nuovo slot per la durata dell'appuntamento
+        appointment = matches[0]
+        duration = appointment_types.get(appointment.get('type', ''), {}).get('duration', 30)
+        outside = _outside_hours(new_date, new_time, duration)
+        if outside:
+            return outside
+        hold = await reservations.hold(new_date, new_time, duration, requirement_for(
+            appointment.get('type', ''), appointment.get('practitioner', '')), exclude=appointment['id'])
+        if hold is None:
             return f"Mi dispiace, lo slot {new_date} alle {new_time} è già occupato. Posso proporle altri orari?"
 
-        # Esegui la riprogrammazione
-        # Rimuovi il vecchio appuntamento
-        appointments_db[old_date].remove(old_time)
-
-        # Aggiungi il nuovo appuntamento
-        if new_date not in appointments_db:
-            appointments_db[new_date] = []
-        appointments_db[new_date].append(new_time)
+        # Esegui la riprogrammazione (compare-and-set sul nuovo slot)
+        if not await reservations.commit(
+                hold, lambda: calendar.reschedule(appointment, new_date, new_time, hold.resources)):
+            return f"Mi dispiace, lo slot {new_date} alle {new_time} è stato appena occupato. Posso proporle altri orari?"
+        if not await calendar.persisted():
+            return "Mi dispiace, si è verificato un errore durante la riprogrammazione."
 
         return f"""
 Appuntamento riprogrammato con successo!
@@ -380,6 +483,7 @@ La contatteremo il giorno prima per confermare il nuovo appuntamento.
         return "Mi dispiace, si è verificato un errore durante la riprogrammazione."
 
 @function_tool()
+@profiled_tool
 async def get_insurance_info(
     context: RunContext,
     insurance_name: str = ""
@@ -388,39 +492,14 @@ async def get_insurance_info(
     Fornisce informazioni sulle assicurazioni accettate e coperture.
     """
     try:
-        if insurance_name:
-            if insurance_name in INSURANCE_INFO["accepted_insurances"]:
-                return f"""
-Sì, accettiamo {insurance_name}.
-
-{INSURANCE_INFO["coverage_info"]}
-{INSURANCE_INFO["direct_billing"]}
-
-Le consiglio di contattare la sua assicurazione per verificare la copertura specifica del trattamento di cui necessita.
-"""
-            else:
-                return f"""
-{insurance_name} non è nell'elenco delle nostre assicurazioni convenzionate.
-
-Assicurazioni accettate:
-{', '.join(INSURANCE_INFO["accepted_insurances"])}
-
-Tuttavia, può sempre verificare con la sua assicurazione se offre rimborsi per le nostre prestazioni.
-"""
-        else:
-            return f"""
-Assicurazioni sanitarie accettate:
-{', '.join(INSURANCE_INFO["accepted_insurances"])}
-
-{INSURANCE_INFO["coverage_info"]}
-{INSURANCE_INFO["direct_billing"]}
-"""
+        return responses.insurance_info(insurance_name)
 
     except Exception as e:
         logging.error(f"Errore info assicurazioni: {e}")
         return "Mi dispiace, si è verificato un errore nel recupero delle informazioni assicurative."
 
 @function_tool()
+@profiled_tool
 async def get_payment_info(
     context: RunContext
 ) -> str:
@@ -428,16 +507,7 @@ async def get_payment_info(
     Fornisce informazioni sui metodi di pagamento accettati.
     """
     try:
-        return f"""
-Metodi di pagamento accettati:
-{', '.join(PAYMENT_OPTIONS["methods"])}
-
-{PAYMENT_OPTIONS["installments"]}
-
-{PAYMENT_OPTIONS["receipts"]}
-
-Per trattamenti costosi, possiamo discutere piani di pagamento personalizzati durante la visita.
-"""
+        return responses.payment_info()
 
     except Exception as e:
         logging.error(f"Errore info pagamenti: {e}")
@@ -0,0 +1,162 @@
+# FAQ retrieval for answer_faq
+# Questions, answers and topic keys are normalized (lowercase, accents
+# folded, Italian stop words removed, light suffix stemming) into an inverted
+# index scored with BM25. The index is rebuilt when the knowledge base reloads.
+
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Tuple
+
+from knowledge_base import KnowledgeBase, knowledge
+
+STOP_WORDS = {
+    "a", "ad", "al", "alla", "alle", "agli", "ai", "anche", "che", "chi", "ci", "come", "con",
+    "cosa", "da", "dal", "dalla", "dei", "del", "della", "delle", "di", "e", "ed", "gli", "ha",
+    "ho", "i", "il", "in", "la", "le", "lo", "ma", "mi", "ne", "nel", "nella", "o", "per", "piu",
+    "quale", "quali", "quando", "se", "si", "sono", "su", "sul", "sulla", "ti", "tra", "un", "una",
+    "uno", "vi", "voi", "vostra", "vostro", "io", "lei", "noi", "non", "mio", "mia", "suo", "sua",
+    "fare", "fa", "posso", "potete", "volevo", "vorrei", "sapere",
+    # Conversational verbs and fillers of spoken questions
+    "avete", "fate", "siete", "puo", "puoi", "possono", "potrei", "possibile", "devo", "deve",
+    "dovrei", "bisogna", "serve", "venire", "vengo", "prendete", "volta", "tipo", "ancora",
+    "grazie", "buongiorno", "salve", "scusi", "allora", "quindi", "ok", "va", "bene", "tutto",
+}
+
+# Longest first; a suffix is only removed if at least 3 characters remain
+SUFFIXES = sorted([
+    "azioni", "azione", "amenti", "amento", "imenti", "imento", "mente", "ita", "ista", "iste",
+    "isti", "ismo", "ando", "endo", "ale", "ali", "are", "ere", "ire", "ata", "ato", "ate", "ati",
+    "ito", "ite", "iti", "uta", "uto", "ute", "uti", "ia", "ie", "io", "a", "e", "i", "o",
+], key=len, reverse=True)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Field weights: how many times a field's terms count towards term frequency
+KEY_WEIGHT = 3
+QUESTION_WEIGHT = 2
+ANSWER_WEIGHT = 1
+
+# Below this share of the query's weight the best hit counts as a miss
+MIN_CONFIDENCE = 0.55
+
+
+def fold_accents(text: str) -> str:
+    """'perché è già' -> 'perche e gia'"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(word: str) -> str:
+    """Light Italian stemmer: strips one inflectional/derivational suffix"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def analyze(text: str) -> List[str]:
+    """Text -> stemmed index terms"""
+    words = TOKEN_RE.findall(fold_accents(text.lower()).replace("_", " "))
+    # Single letters are elided articles and prepositions (l', d', un')
+    return [stem(word) for word in words if len(word) > 1 and word not in STOP_WORDS]
+
+
+@dataclass(frozen=True)
+class FaqHit:
+    key: str
+    question: str
+    answer: str
+    score: float
+    # Share of the query's BM25 weight matched by this entry (0-1)
+    confidence: float
+
+
+class FaqIndex:
+    """BM25 inverted index over FAQ entries"""
+
+    def __init__(self, faq: Mapping, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.entries: List[Tuple[str, str, str]] = []
+        # term -> [(entry, weighted term frequency)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths: List[int] = []
+        for key, item in faq.items():
+            terms = (analyze(key) * KEY_WEIGHT + analyze(item["question"]) * QUESTION_WEIGHT
+                     + analyze(item["answer"]) * ANSWER_WEIGHT)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            entry = len(self.entries)
+            for term, count in counts.items():
+                self.postings.setdefault(term, []).append((entry, count))
+            self.entries.append((key, item["question"], item["answer"]))
+            lengths.append(len(terms))
+
+        total = len(self.entries)
+        average = sum(lengths) / total if total else 1.0
+        self.idf = {term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for term, posting in self.postings.items()}
+        # Precomputed BM25 term weights: scoring a query is a few dict lookups
+        self.weights: Dict[str, List[Tuple[int, float]]] = {}
+        for term, posting in self.postings.items():
+            self.weights[term] = [
+                (entry, self.idf[term] * tf * (k1 + 1)
+                 / (tf + k1 * (1 - b + b * lengths[entry] / average)))
+                for entry, tf in posting
+            ]
+        # Best weight each term can contribute, to turn scores into confidences
+        self.max_weight = {term: max(weight for _, weight in weights)
+                           for term, weights in self.weights.items()}
+
+    def search(self, query: str, limit: int = 3) -> List[FaqHit]:
+        """Top `limit` entries by BM25 score (empty if no query term is indexed)"""
+        terms = set(analyze(query))
+        if not terms:
+            return []
+        scores: Dict[int, float] = {}
+        for term in terms:
+            for entry, weight in self.weights.get(term, ()):
+                scores[entry] = scores.get(entry, 0.0) + weight
+        if not scores:
+            return []
+        # Query terms unknown to the index still count as unmatched weight
+        # ("quanto costa il parcheggio" is not the visit price); the filler
+        # words of spoken questions are stop words, so they never count
+        unknown = max(self.idf.values(), default=1.0)
+        possible = sum(self.max_weight.get(term, unknown) for term in terms)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [FaqHit(*self.entries[entry], score=score, confidence=min(1.0, score / possible))
+                for entry, score in ranked]
+
+
+class FaqSearch:
+    """FaqIndex for the current knowledge snapshot, rebuilt on reload"""
+
+    def __init__(self, knowledge_base: KnowledgeBase = knowledge):
+        self.knowledge_base = knowledge_base
+        self._index = None
+        knowledge_base.on_reload(lambda snapshot: self.invalidate())
+
+    @property
+    def index(self) -> FaqIndex:
+        if self._index is None:
+            self._index = FaqIndex(self.knowledge_base.snapshot.faq)
+        return self._index
+
+    def invalidate(self):
+        self._index = None
+
+    def search(self, query: str, limit: int = 3, min_confidence: float = MIN_CONFIDENCE) -> List[FaqHit]:
+        """Confident hits only; an empty list is a miss"""
+        return [hit for hit in self.index.search(query, limit) if hit.confidence >= min_confidence]
+
+    def topics(self, limit: int = 8) -> List[str]:
+        """Short list of FAQ questions to offer on a miss"""
+        return [question for _, question, _ in self.index.entries[:limit]]
+
+
+# Shared instance used by answer_faq
+faq_search = FaqSearch()
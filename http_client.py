@@ -0,0 +1,93 @@
+# Shared async HTTP client for the function tools
+# One aiohttp session per worker keeps connections alive between calls;
+# every request has a bounded timeout and transient failures are retried
+# with exponential backoff and full jitter.
+
+import asyncio
+import logging
+import random
+from typing import Dict, Optional
+
+import aiohttp
+
+# Statuses worth retrying: rate limiting and server-side errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpError(Exception):
+    """Request failed after all retries"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncHttpClient:
+    def __init__(self, total_timeout: float = 5.0, connect_timeout: float = 2.0,
+                 retries: int = 2, backoff: float = 0.2, max_connections: int = 20,
+                 headers: Optional[Dict[str, str]] = None):
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_connections = max_connections
+        self.headers = headers or {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Session bound to the running loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._retire()
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, headers=self.headers
+            )
+            self._loop = loop
+            # Pending until the loop shuts down: asyncio.run cancels it and the session closes there
+            self._closer = loop.create_task(self._close_on_cancel(self._session))
+        return self._session
+
+    @staticmethod
+    async def _close_on_cancel(session: aiohttp.ClientSession):
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await session.close()
+
+    def _retire(self):
+        """Close the previous session on the loop that owns it"""
+        if self._closer is not None and not self._closer.done() and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._closer.cancel)
+        self._closer = None
+
+    def _delay(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, backoff * 2^attempt]"""
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    async def get_text(self, url: str, params: Optional[Dict[str, str]] = None) -> str:
+        """GET a URL and return the body; raises HttpError once retries are exhausted"""
+        last_error: Optional[HttpError] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self._delay(attempt - 1))
+            try:
+                async with self._get_session().get(url, params=params) as response:
+                    if response.status == 200:
+                        return await response.text()
+                    last_error = HttpError(f"HTTP {response.status} for {url}", response.status)
+                    if response.status not in RETRY_STATUSES:
+                        raise last_error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = HttpError(f"{type(e).__name__} for {url}: {e}")
+            logging.warning(f"Attempt {attempt + 1} failed: {last_error}")
+        raise last_error
+
+    async def close(self):
+        session, closer = self._session, self._closer
+        self._session = self._closer = None
+        if closer is not None:
+            closer.cancel()
+        if session is not None and not session.closed:
+            await session.close()
@@ -0,0 +1,116 @@
+# Time-ordered, collision-free appointment IDs
+# Snowflake layout in 64 bits: 42-bit milliseconds since EPOCH_MS, 10-bit
+# worker id, 12-bit per-millisecond sequence. Encoded as fixed-width Crockford
+# base32, so string order equals creation order and IDs work as range-scan keys.
+
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Optional, Tuple
+
+# 2024-01-01T00:00:00Z
+EPOCH_MS = 1704067200000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ENCODED_LENGTH = 13
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+PREFIX = "APP_"
+
+
+def encode(value: int) -> str:
+    """64-bit integer -> fixed-width Crockford base32"""
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def decode(text: str) -> int:
+    """Fixed-width Crockford base32 -> integer"""
+    value = 0
+    for char in text:
+        value = (value << 5) | ALPHABET.index(char)
+    return value
+
+
+def default_worker_id() -> int:
+    """
+    DENTAL_WORKER_ID if set, otherwise derived from host name and pid. The
+    derived id is a 10-bit hash, so processes can share one: set a distinct
+    DENTAL_WORKER_ID per worker when several write to the same database.
+    """
+    configured = os.getenv("DENTAL_WORKER_ID")
+    if configured:
+        return int(configured) & MAX_WORKER
+    seed = f"{socket.gethostname()}:{os.getpid()}".encode()
+    return zlib.crc32(seed) & MAX_WORKER
+
+
+class IdGenerator:
+    """
+    Monotonic Snowflake-style generator.
+
+    CPython offers no compare-and-swap, so the (millisecond, sequence) state is
+    guarded by a lock; the critical section is a few integer operations and is
+    uncontended for asyncio sessions sharing one thread. If the clock steps back
+    or a millisecond's sequence is exhausted, the logical clock moves forward
+    instead of sleeping, keeping IDs strictly increasing per worker.
+    """
+
+    def __init__(self, worker_id: Optional[int] = None, prefix: str = PREFIX):
+        if worker_id is None:
+            worker_id = default_worker_id()
+        if not 0 <= worker_id <= MAX_WORKER:
+            raise ValueError(f"worker_id deve essere tra 0 e {MAX_WORKER}")
+        self.worker_id = worker_id
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_int(self) -> int:
+        with self._lock:
+            now_ms = int(time.time() * 1000) - EPOCH_MS
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms += 1
+                self._sequence = 0
+            ms, sequence = self._last_ms, self._sequence
+        return (ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | sequence
+
+    def next_id(self) -> str:
+        return self.prefix + encode(self.next_int())
+
+
+def parse_id(appointment_id: str, prefix: str = PREFIX) -> Tuple[datetime, int, int]:
+    """Split an ID into (creation time, worker id, sequence)"""
+    value = decode(appointment_id[len(prefix):])
+    sequence = value & MAX_SEQUENCE
+    worker_id = (value >> SEQUENCE_BITS) & MAX_WORKER
+    ms = (value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    return datetime.fromtimestamp(ms / 1000), worker_id, sequence
+
+
+def id_lower_bound(moment: datetime, prefix: str = PREFIX) -> str:
+    """Smallest ID that can be generated at or after `moment` (for range scans)"""
+    ms = max(0, int(moment.timestamp() * 1000) - EPOCH_MS)
+    return prefix + encode(ms << (WORKER_BITS + SEQUENCE_BITS))
+
+
+# Process-wide generator used by every booking path
+_generator = IdGenerator()
+
+
+def new_appointment_id() -> str:
+    """Next appointment ID for this worker"""
+    return _generator.next_id()
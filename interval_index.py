@@ -0,0 +1,144 @@
+# Sorted interval lists of confirmed bookings
+# Each (date, resource) keeps its bookings as half-open [start, end) minute
+# intervals sorted by start. No booking in a list is longer than the longest
+# one added to it, so every interval overlapping [start, end) starts inside
+# (start - longest, end): two bisections bound the scan, and an overlap query
+# costs O(log n + k). Each list also maintains its resource's occupancy
+# bitmap, which SlotOccupancy uses to compute free slots.
+
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from slot_bitmap import (
+    DEFAULT_RESOURCE, QUANTUM_MINUTES, appointment_duration, resource_keys, span_mask, to_minutes
+)
+
+Interval = Tuple[int, int, str]
+
+
+def booking_interval(appointment: Dict) -> Optional[Tuple[int, int]]:
+    """[start, end) minutes of a confirmed appointment; None if it takes no time"""
+    if appointment.get('status') != 'confermato' or not appointment.get('time'):
+        return None
+    start = to_minutes(appointment['time'])
+    return start, start + appointment_duration(appointment)
+
+
+class IntervalList:
+    """Intervals (start, end, key) sorted by start, with their occupancy bitmap"""
+
+    def __init__(self, quantum: int = QUANTUM_MINUTES):
+        self.quantum = quantum
+        self._items: List[Interval] = []
+        # Only grows: an upper bound is enough to keep queries exact
+        self._longest = 0
+        self.mask = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, start: int, end: int, key: str):
+        bisect.insort(self._items, (start, end, key))
+        self._longest = max(self._longest, end - start)
+        self.mask |= span_mask(start, end - start, self.quantum)
+
+    def remove(self, start: int, end: int, key: str) -> bool:
+        position = bisect.bisect_left(self._items, (start, end, key))
+        if position == len(self._items) or self._items[position] != (start, end, key):
+            return False
+        del self._items[position]
+        # Clear the quanta of the interval, then restore those others still cover
+        first = start // self.quantum * self.quantum
+        last = -(-end // self.quantum) * self.quantum
+        self.mask &= ~span_mask(start, end - start, self.quantum)
+        for other_start, other_end, _ in self.overlapping(first, last):
+            self.mask |= span_mask(other_start, other_end - other_start, self.quantum)
+        return True
+
+    def overlapping(self, start: int, end: int) -> List[Interval]:
+        """Intervals sharing at least one minute with [start, end), by start"""
+        low = bisect.bisect_left(self._items, (start - self._longest + 1,))
+        high = bisect.bisect_left(self._items, (end,), low)
+        return [item for item in self._items[low:high] if item[1] > start]
+
+
+class IntervalIndex:
+    """Interval lists of confirmed appointments, per date and resource"""
+
+    def __init__(self, quantum: int = QUANTUM_MINUTES):
+        self.quantum = quantum
+        # date -> resource -> intervals
+        self._days: Dict[str, Dict[str, IntervalList]] = {}
+
+    @classmethod
+    def from_appointments(cls, appointments: Iterable[Dict], quantum: int = QUANTUM_MINUTES) -> "IntervalIndex":
+        index = cls(quantum)
+        for appointment in appointments:
+            index.add(appointment)
+        return index
+
+    def add(self, appointment: Dict) -> bool:
+        """Index a confirmed appointment on each resource it takes"""
+        interval = booking_interval(appointment)
+        if interval is None:
+            return False
+        resources = self._days.setdefault(appointment.get('date', ''), {})
+        for resource in resource_keys(appointment):
+            intervals = resources.get(resource)
+            if intervals is None:
+                intervals = resources[resource] = IntervalList(self.quantum)
+            intervals.add(*interval, appointment.get('id', ''))
+        return True
+
+    def remove(self, appointment: Dict) -> bool:
+        """Drop an appointment indexed with the same date, time, duration and resources"""
+        interval = booking_interval(appointment)
+        resources = self._days.get(appointment.get('date', ''))
+        if interval is None or resources is None:
+            return False
+        removed = False
+        for resource in resource_keys(appointment):
+            intervals = resources.get(resource)
+            if intervals is not None and intervals.remove(*interval, appointment.get('id', '')):
+                removed = True
+                if not intervals:
+                    del resources[resource]
+        if not resources:
+            del self._days[appointment.get('date', '')]
+        return removed
+
+    def overlapping(self, date: str, start: int, end: int,
+                    resources: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Keys of the bookings overlapping [start, end) on the resources (default:
+        all of them), including whole-clinic bookings
+        """
+        by_resource = self._days.get(date, {})
+        wanted = None if resources is None else set(resources)
+        if wanted is None or DEFAULT_RESOURCE in wanted:
+            wanted = set(by_resource)
+        else:
+            wanted.add(DEFAULT_RESOURCE)
+        found: Dict[str, int] = {}
+        for resource in wanted:
+            intervals = by_resource.get(resource)
+            if intervals is not None:
+                for item_start, _, key in intervals.overlapping(start, end):
+                    found.setdefault(key, item_start)
+        return sorted(found, key=lambda key: (found[key], key))
+
+    def masks(self, date: str, exclude: str = "") -> Dict[str, int]:
+        """Occupancy bitmap per resource for a date, without booking `exclude` if given"""
+        by_resource = self._days.get(date, {})
+        if not exclude:
+            return {resource: intervals.mask for resource, intervals in by_resource.items()}
+        masks: Dict[str, int] = {}
+        for resource, intervals in by_resource.items():
+            masks[resource] = 0
+            for start, end, key in intervals:
+                if key != exclude:
+                    masks[resource] |= span_mask(start, end - start, self.quantum)
+        return masks
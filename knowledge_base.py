@@ -0,0 +1,197 @@
+# Hot-reloadable clinic knowledge base
+# The data lives in a versioned JSON file (clinic_knowledge.json). Each load is
+# validated and frozen into an immutable snapshot; reload() swaps the snapshot
+# reference in one assignment, so sessions in progress keep reading a
+# consistent version without locks or copies. Reloads are triggered by polling
+# the file's mtime or by SIGHUP.
+
+import asyncio
+import json
+import logging
+import os
+import signal
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from opening_hours import parse_closures, parse_hours
+
+KNOWLEDGE_FILE = os.getenv(
+    "DENTAL_KNOWLEDGE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "clinic_knowledge.json"),
+)
+
+# Required fields: sections that are one object, and sections keyed by id
+SECTION_FIELDS = {
+    "clinic_info": {"name": str, "address": str, "phone": str, "email": str, "website": str,
+                    "hours": dict, "emergency_hours": str, "parking": str, "accessibility": str},
+    "insurance_info": {"accepted_insurances": list, "coverage_info": str, "direct_billing": str},
+    "payment_options": {"methods": list, "installments": str, "receipts": str},
+}
+ENTRY_FIELDS = {
+    "services": {"name": str, "description": str, "duration": str, "price_range": str},
+    "staff": {"name": str, "title": str},
+    "faq": {"question": str, "answer": str},
+    "appointment_types": {"name": str, "duration": int, "description": str},
+}
+# Sections that may be absent (an empty mapping then)
+OPTIONAL_ENTRY_FIELDS = {
+    "resources": {"name": str, "kind": str},
+}
+
+
+class KnowledgeError(ValueError):
+    """The knowledge file is missing, malformed or does not match the schema"""
+
+
+def _check_fields(where: str, value: Any, fields: Dict[str, type]):
+    if not isinstance(value, dict):
+        raise KnowledgeError(f"{where}: deve essere un oggetto")
+    for name, expected in fields.items():
+        if name not in value:
+            raise KnowledgeError(f"{where}: campo '{name}' mancante")
+        if not isinstance(value[name], expected) or isinstance(value[name], bool):
+            raise KnowledgeError(f"{where}.{name}: tipo {expected.__name__} richiesto")
+
+
+def validate(data: Any) -> Dict:
+    """Check a decoded knowledge file against the schema; returns it unchanged"""
+    if not isinstance(data, dict):
+        raise KnowledgeError("il file deve contenere un oggetto JSON")
+    if not isinstance(data.get("version"), int) or isinstance(data.get("version"), bool):
+        raise KnowledgeError("campo 'version' intero richiesto")
+    for section, fields in SECTION_FIELDS.items():
+        _check_fields(section, data.get(section), fields)
+    for section, fields in ENTRY_FIELDS.items():
+        entries = data.get(section)
+        if not isinstance(entries, dict) or not entries:
+            raise KnowledgeError(f"{section}: deve essere un oggetto non vuoto")
+        for key, entry in entries.items():
+            _check_fields(f"{section}.{key}", entry, fields)
+    for section, fields in OPTIONAL_ENTRY_FIELDS.items():
+        entries = data.get(section, {})
+        if not isinstance(entries, dict):
+            raise KnowledgeError(f"{section}: deve essere un oggetto")
+        for key, entry in entries.items():
+            _check_fields(f"{section}.{key}", entry, fields)
+    try:
+        parse_hours(data["clinic_info"]["hours"])
+        parse_closures(data["clinic_info"].get("closures", []))
+    except (AttributeError, TypeError, ValueError) as e:
+        raise KnowledgeError(f"clinic_info: orari o chiusure non validi: {e}") from e
+    # Practitioners (staff) and chairs/equipment (resources) an appointment can need
+    bookable = set(data["staff"]) | set(data.get("resources", {}))
+    for key, entry in data["appointment_types"].items():
+        if entry["duration"] <= 0:
+            raise KnowledgeError(f"appointment_types.{key}.duration: deve essere positiva")
+        requires = entry.get("requires", [])
+        if not isinstance(requires, list) or not all(isinstance(group, list) and group for group in requires):
+            raise KnowledgeError(f"appointment_types.{key}.requires: lista di gruppi non vuoti richiesta")
+        for group in requires:
+            for resource in group:
+                if resource not in bookable:
+                    raise KnowledgeError(f"appointment_types.{key}.requires: risorsa '{resource}' sconosciuta")
+    return data
+
+
+def freeze(value: Any) -> Any:
+    """Read-only view of decoded JSON: dicts become mapping proxies, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class KnowledgeSnapshot:
+    version: int
+    clinic_info: Mapping
+    services: Mapping
+    staff: Mapping
+    faq: Mapping
+    appointment_types: Mapping
+    insurance_info: Mapping
+    payment_options: Mapping
+    resources: Mapping
+
+    @classmethod
+    def from_data(cls, data: Dict) -> "KnowledgeSnapshot":
+        validate(data)
+        return cls(version=data["version"],
+                   **{section: freeze(data[section]) for section in (*SECTION_FIELDS, *ENTRY_FIELDS)},
+                   **{section: freeze(data.get(section, {})) for section in OPTIONAL_ENTRY_FIELDS})
+
+
+def read_snapshot(path: str) -> KnowledgeSnapshot:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise KnowledgeError(f"impossibile leggere {path}: {e}") from e
+    return KnowledgeSnapshot.from_data(data)
+
+
+class KnowledgeBase:
+    def __init__(self, path: str = KNOWLEDGE_FILE):
+        self.path = path
+        self._mtime = self._stat()
+        # Startup fails loudly on a bad file; later reloads keep the old snapshot
+        self.snapshot: KnowledgeSnapshot = read_snapshot(path)
+        self._listeners: List[Callable[[KnowledgeSnapshot], None]] = []
+        self._watcher: Optional[asyncio.Task] = None
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def on_reload(self, callback: Callable[[KnowledgeSnapshot], None]):
+        """Call `callback(snapshot)` after every successful reload"""
+        self._listeners.append(callback)
+
+    def reload(self) -> bool:
+        """Load the file again and swap it in; False (old snapshot kept) if invalid"""
+        self._mtime = self._stat()
+        try:
+            snapshot = read_snapshot(self.path)
+        except KnowledgeError as e:
+            logging.error(f"Knowledge base non ricaricata: {e}")
+            return False
+        previous, self.snapshot = self.snapshot, snapshot
+        logging.info(f"Knowledge base ricaricata: versione {previous.version} -> {snapshot.version}")
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logging.error(f"Errore dopo il ricaricamento della knowledge base: {e}")
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Reload only if the file's mtime changed since the last load"""
+        if self._stat() == self._mtime:
+            return False
+        return self.reload()
+
+    async def watch(self, interval: float = 2.0):
+        """Poll the file and reload when it changes"""
+        while True:
+            await asyncio.sleep(interval)
+            self.reload_if_changed()
+
+    def start_watching(self, interval: float = 2.0):
+        """Start the file watcher and the SIGHUP handler on the running loop (idempotent)"""
+        if self._watcher is not None and not self._watcher.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._watcher = loop.create_task(self.watch(interval))
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload)
+        except (NotImplementedError, AttributeError, RuntimeError, ValueError):
+            # No SIGHUP (Windows) or not the main thread: polling still works
+            pass
+
+
+# Process-wide knowledge base
+knowledge = KnowledgeBase()
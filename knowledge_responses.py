@@ -0,0 +1,162 @@
+# Precomputed answers for the static knowledge tools
+# get_clinic_info, get_services_info, get_insurance_info and get_payment_info
+# only depend on the knowledge base, so every variant is rendered once on first
+# use and later calls are dict lookups. invalidate() drops the tables when the
+# knowledge base is reloaded; the next call renders them again.
+
+from typing import Dict, Mapping, Optional
+
+from knowledge_base import KnowledgeBase, knowledge
+from opening_hours import describe_hours
+
+UNKNOWN_INFO_TYPE = "Tipo di informazione non riconosciuto. Posso fornire informazioni generali, orari, contatti o posizione."
+UNKNOWN_SERVICE = "Servizio non trovato. I nostri servizi principali sono: odontoiatria generale, igiene dentale, ortodonzia, implantologia, estetica dentale, endodonzia, chirurgia orale e protesi."
+
+
+def render_clinic_info(info_type: str, clinic_info: Mapping) -> str:
+    if info_type == "general":
+        return f"""
+Studio Dentistico Dottoressa Emanuela
+Indirizzo: {clinic_info['address']}
+Telefono: {clinic_info['phone']}
+Email: {clinic_info['email']}
+Orari: {describe_hours(clinic_info['hours'])}
+{clinic_info['emergency_hours']}
+{clinic_info['parking']}
+"""
+    elif info_type == "hours":
+        hours_text = "Orari di apertura:\n"
+        for day, hours in clinic_info['hours'].items():
+            hours_text += f"{day.capitalize()}: {hours}\n"
+        hours_text += f"\n{clinic_info['emergency_hours']}"
+        return hours_text
+    elif info_type == "contact":
+        return f"""
+Contatti Studio Dentistico Dottoressa Emanuela:
+Telefono: {clinic_info['phone']}
+Email: {clinic_info['email']}
+Sito web: {clinic_info['website']}
+"""
+    elif info_type == "location":
+        return f"""
+Indirizzo: {clinic_info['address']}
+{clinic_info['parking']}
+{clinic_info['accessibility']}
+"""
+    return UNKNOWN_INFO_TYPE
+
+
+def render_service_info(service_type: str, services: Mapping) -> str:
+    if service_type == "all":
+        services_text = "Servizi offerti dal nostro studio:\n\n"
+        for service in services.values():
+            services_text += f"• {service['name']}: {service['description']}\n"
+            services_text += f"  Durata: {service['duration']}, Costo: {service['price_range']}\n\n"
+        return services_text
+    elif service_type in services:
+        service = services[service_type]
+        return f"""
+{service['name']}
+Descrizione: {service['description']}
+Durata della seduta: {service['duration']}
+Costo indicativo: {service['price_range']}
+"""
+    return UNKNOWN_SERVICE
+
+
+def render_insurance_info(insurance_name: str, insurance_info: Mapping) -> str:
+    accepted = ', '.join(insurance_info["accepted_insurances"])
+    if insurance_name:
+        if insurance_name in insurance_info["accepted_insurances"]:
+            return f"""
+Sì, accettiamo {insurance_name}.
+
+{insurance_info["coverage_info"]}
+{insurance_info["direct_billing"]}
+
+Le consiglio di contattare la sua assicurazione per verificare la copertura specifica del trattamento di cui necessita.
+"""
+        return f"""
+{insurance_name} non è nell'elenco delle nostre assicurazioni convenzionate.
+
+Assicurazioni accettate:
+{accepted}
+
+Tuttavia, può sempre verificare con la sua assicurazione se offre rimborsi per le nostre prestazioni.
+"""
+    return f"""
+Assicurazioni sanitarie accettate:
+{accepted}
+
+{insurance_info["coverage_info"]}
+{insurance_info["direct_billing"]}
+"""
+
+
+def render_payment_info(payment_options: Mapping) -> str:
+    return f"""
+Metodi di pagamento accettati:
+{', '.join(payment_options["methods"])}
+
+{payment_options["installments"]}
+
+{payment_options["receipts"]}
+
+Per trattamenti costosi, possiamo discutere piani di pagamento personalizzati durante la visita.
+"""
+
+
+class KnowledgeResponses:
+    """Rendered tool answers, keyed by the tool argument"""
+
+    def __init__(self, knowledge_base: KnowledgeBase = knowledge):
+        self.knowledge_base = knowledge_base
+        self._tables: Optional[Dict[str, Dict[str, str]]] = None
+        knowledge_base.on_reload(lambda snapshot: self.invalidate())
+
+    def _build(self) -> Dict[str, Dict[str, str]]:
+        k = self.knowledge_base.snapshot
+        insurance = {name: render_insurance_info(name, k.insurance_info)
+                     for name in k.insurance_info["accepted_insurances"]}
+        insurance[""] = render_insurance_info("", k.insurance_info)
+        # Unknown insurers echo the name, so only the text around it is cached
+        rejected = render_insurance_info("\0", k.insurance_info)
+        return {
+            "clinic": {info_type: render_clinic_info(info_type, k.clinic_info)
+                       for info_type in ("general", "hours", "contact", "location")},
+            "services": dict({"all": render_service_info("all", k.services)},
+                             **{key: render_service_info(key, k.services) for key in k.services}),
+            "insurance": insurance,
+            "insurance_rejected": {"head": rejected.split("\0")[0], "tail": rejected.split("\0")[1]},
+            "payment": {"": render_payment_info(k.payment_options)},
+        }
+
+    def _table(self, name: str) -> Dict[str, str]:
+        tables = self._tables
+        if tables is None:
+            tables = self._tables = self._build()
+        return tables[name]
+
+    def invalidate(self):
+        """Drop every rendered answer (runs on every knowledge base reload)"""
+        self._tables = None
+
+    def clinic_info(self, info_type: str = "general") -> str:
+        return self._table("clinic").get(info_type, UNKNOWN_INFO_TYPE)
+
+    def service_info(self, service_type: str = "all") -> str:
+        return self._table("services").get(service_type, UNKNOWN_SERVICE)
+
+    def insurance_info(self, insurance_name: str = "") -> str:
+        answer = self._table("insurance").get(insurance_name)
+        if answer is not None:
+            return answer
+        rejected = self._table("insurance_rejected")
+        return rejected["head"] + insurance_name + rejected["tail"]
+
+    def payment_info(self) -> str:
+        return self._table("payment")[""]
+
+
+# Shared instance used by the function tools
+responses = KnowledgeResponses()
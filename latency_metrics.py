@@ -0,0 +1,336 @@
+# Per-turn latency instrumentation for the agent
+# A TurnTracer follows one AgentSession through its events and records, per
+# turn, the user's end of speech, the model's first token, every tool call and
+# the first audio frame out. Finished turns feed process-wide histograms that
+# are served as OpenMetrics text and are appended to a JSONL trace file.
+# Disabled (the default), a tool call costs one context-variable lookup.
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_persistence import GroupCommitWriter
+
+# Upper bounds in seconds, shared by every histogram
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Span names, as offsets in seconds from the start of the turn
+END_OF_SPEECH = "end_of_speech"
+MODEL_START = "model_start"
+FIRST_TOKEN = "first_token"
+FIRST_AUDIO = "first_audio"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, safe across threads"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0.0])
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            series = self._series.get(label_values)
+            return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# TYPE {self.name} histogram", f"# UNIT {self.name} seconds",
+                 f"# HELP {self.name} {self.help_text}"]
+        with self._lock:
+            series = sorted((values, list(counts), total) for values, (counts, total) in self._series.items())
+        for values, counts, total in series:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+            lines.append(f"{self.name}_sum{suffix} {total}")
+        return lines
+
+
+class LatencyMetrics:
+    """The histograms exported by the metrics endpoint"""
+
+    def __init__(self):
+        self.end_of_utterance = Histogram(
+            "dental_end_of_utterance_seconds", "Delay of the end-of-utterance decision after the user stops talking")
+        self.first_token = Histogram(
+            "dental_turn_first_token_seconds", "User end of speech to the model's first token")
+        self.first_audio = Histogram(
+            "dental_turn_first_audio_seconds", "User end of speech to the first audio frame out")
+        self.tool = Histogram(
+            "dental_tool_duration_seconds", "Duration of each function tool call", labels=("tool",))
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.end_of_utterance, self.first_token, self.first_audio, self.tool):
+            lines += histogram.render()
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class TraceWriter:
+    """Appends one JSON line per finished turn from a background thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer = GroupCommitWriter(self._write_batch, name="latency-trace-writer")
+
+    def _write_batch(self, records: List[Dict]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+    def write(self, record: Dict):
+        self._writer.submit(record)
+
+    def close(self):
+        self._writer.close()
+
+
+@dataclass
+class Turn:
+    number: int
+    started_at: float
+    origin: float
+    marks: Dict[str, float] = field(default_factory=dict)
+    tools: List[Dict[str, Any]] = field(default_factory=list)
+    end_of_utterance_delay: Optional[float] = None
+
+
+class TurnTracer:
+    """Spans of one session's turns; a turn lasts until the user speaks again"""
+
+    def __init__(self, session_id: str, metrics: LatencyMetrics,
+                 trace: Optional[TraceWriter] = None, clock=time.perf_counter):
+        self.session_id = session_id
+        self.metrics = metrics
+        self.trace = trace
+        self.clock = clock
+        self.turn: Optional[Turn] = None
+        self._turns = 0
+
+    def _open(self) -> Turn:
+        self.finish_turn()
+        self._turns += 1
+        self.turn = Turn(self._turns, time.time(), self.clock())
+        return self.turn
+
+    def _current(self) -> Turn:
+        return self.turn if self.turn is not None else self._open()
+
+    def _mark(self, name: str, at: Optional[float] = None):
+        turn = self._current()
+        turn.marks.setdefault(name, round((at if at is not None else self.clock()) - turn.origin, 6))
+
+    def end_of_speech(self):
+        self._open()
+        self._mark(END_OF_SPEECH)
+
+    def end_of_utterance(self, delay: float):
+        self.metrics.end_of_utterance.observe(delay)
+        self._current().end_of_utterance_delay = delay
+
+    def model_started(self):
+        self._mark(MODEL_START)
+
+    def first_token(self, ttft: Optional[float] = None):
+        """Mark the first token; `ttft` is measured by the model from its start"""
+        turn = self._current()
+        if ttft is not None and MODEL_START in turn.marks:
+            self._mark(FIRST_TOKEN, turn.origin + turn.marks[MODEL_START] + ttft)
+        else:
+            self._mark(FIRST_TOKEN)
+
+    def first_audio(self):
+        self._mark(FIRST_AUDIO)
+
+    def tool_started(self, name: str) -> Tuple[Turn, float, Dict[str, Any]]:
+        turn = self._current()
+        begin = self.clock()
+        span = {"name": name, "start": round(begin - turn.origin, 6)}
+        turn.tools.append(span)
+        return turn, begin, span
+
+    def tool_finished(self, started: Tuple[Turn, float, Dict[str, Any]], ok: bool):
+        # Offsets stay relative to the turn the call started in
+        turn, begin, span = started
+        end = self.clock()
+        span["end"] = round(end - turn.origin, 6)
+        span["ok"] = ok
+        self.metrics.tool.observe(end - begin, span["name"])
+
+    def finish_turn(self):
+        """Feed the histograms and the trace with the open turn, if any"""
+        turn, self.turn = self.turn, None
+        if turn is None:
+            return
+        marks = turn.marks
+        if END_OF_SPEECH in marks:
+            if FIRST_TOKEN in marks:
+                self.metrics.first_token.observe(marks[FIRST_TOKEN] - marks[END_OF_SPEECH])
+            if FIRST_AUDIO in marks:
+                self.metrics.first_audio.observe(marks[FIRST_AUDIO] - marks[END_OF_SPEECH])
+        if self.trace is not None:
+            self.trace.write({
+                "session": self.session_id,
+                "turn": turn.number,
+                "started_at": turn.started_at,
+                "spans": marks,
+                "end_of_utterance_delay": turn.end_of_utterance_delay,
+                "tools": turn.tools,
+            })
+
+    def attach(self, session):
+        """Follow an AgentSession's state and metrics events"""
+        def on_user_state(event):
+            if event.old_state == "speaking" and event.new_state != "speaking":
+                self.end_of_speech()
+
+        def on_agent_state(event):
+            if event.new_state == "thinking":
+                self.model_started()
+            elif event.new_state == "speaking":
+                self.first_audio()
+
+        def on_metrics(event):
+            delay = getattr(event.metrics, "end_of_utterance_delay", None)
+            if delay is not None and delay >= 0:
+                self.end_of_utterance(delay)
+            ttft = getattr(event.metrics, "ttft", None)
+            if ttft is not None and ttft >= 0:
+                self.first_token(ttft)
+
+        session.on("user_state_changed", on_user_state)
+        session.on("agent_state_changed", on_agent_state)
+        session.on("metrics_collected", on_metrics)
+        session.on("close", lambda event: self.finish_turn())
+
+
+# Tracer of the session running in the current task (None when disabled)
+current_tracer: contextvars.ContextVar = contextvars.ContextVar("current_tracer", default=None)
+
+
+def timed_tool(fn):
+    """Record a span per call of an async function tool (apply under @function_tool)"""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        tracer = current_tracer.get()
+        if tracer is None:
+            return await fn(*args, **kwargs)
+        started = tracer.tool_started(name)
+        ok = False
+        try:
+            result = await fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            tracer.tool_finished(started, ok)
+    return wrapper
+
+
+def start_metrics_server(metrics: LatencyMetrics, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve `metrics` as OpenMetrics text on /metrics from a daemon thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+class Instrumentation:
+    """
+    Process-wide switch. DENTAL_METRICS_PORT serves the histograms on
+    /metrics and DENTAL_LATENCY_TRACE appends turns to a JSONL file; with
+    neither set, sessions are not traced.
+    """
+
+    def __init__(self):
+        self.metrics = LatencyMetrics()
+        self.trace: Optional[TraceWriter] = None
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.enabled = False
+
+    def configure(self, port: Optional[int] = None, trace_path: Optional[str] = None):
+        if port is not None and self.server is None:
+            self.server = start_metrics_server(self.metrics, port)
+            logging.info(f"Metriche di latenza su :{self.server.server_address[1]}/metrics")
+        if trace_path and self.trace is None:
+            self.trace = TraceWriter(trace_path)
+        self.enabled = self.server is not None or self.trace is not None
+
+    def configure_from_env(self):
+        port = os.getenv("DENTAL_METRICS_PORT")
+        self.configure(int(port) if port else None, os.getenv("DENTAL_LATENCY_TRACE"))
+
+    def trace_session(self, session, session_id: str) -> Optional[TurnTracer]:
+        """Attach a tracer to the session and expose it to the tools of this task"""
+        if not self.enabled:
+            return None
+        tracer = TurnTracer(session_id, self.metrics, self.trace)
+        tracer.attach(session)
+        current_tracer.set(tracer)
+        return tracer
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        self.enabled = False
+
+
+# Shared instance used by the agent entrypoint
+instrumentation = Instrumentation()
@@ -0,0 +1,159 @@
+# Patient name search
+# Names are folded (lowercase, accents removed, apostrophes dropped: "Niccolò
+# D'Angelo" -> "niccolo dangelo") and split into words. The trigrams of the
+# distinct words (padded with spaces) are indexed, and each word maps to the
+# records using it. A query word matches the words sharing most of its
+# trigrams, so prefixes ("Giul"), other spellings ("Nicolo", "D Angelo") and
+# typos still find the patient. The trigram postings grow with the vocabulary
+# of names, not with the number of patients, and a query reads the records of
+# its most selective word only, so latency does not grow with the database.
+
+import heapq
+import math
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+GRAM = 3
+# Share of a query word's trigrams a name word must contain to match it
+MIN_SIMILARITY = 0.5
+SEARCH_LIMIT = 10
+
+APOSTROPHE_RE = re.compile(r"['’`´]")
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def fold_name(text: str) -> str:
+    """"Niccolò D'Angelo" -> 'niccolo dangelo'"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return NON_ALNUM_RE.sub(" ", APOSTROPHE_RE.sub("", folded)).strip()
+
+
+def word_grams(word: str, prefix: bool = False) -> FrozenSet[str]:
+    """
+    Trigrams of a folded word padded with two spaces before and one after;
+    a `prefix` is left open at the end so any word starting with it matches
+    """
+    padded = "  " + word + ("" if prefix else " ")
+    return frozenset(padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1))
+
+
+class NameIndex:
+    """Incremental trigram index from names to record keys, ranked fuzzy search"""
+
+    def __init__(self):
+        # record key -> folded words of its name
+        self._names: Dict[str, Tuple[str, ...]] = {}
+        # folded word -> record keys using it (insertion ordered)
+        self._words: Dict[str, Dict[str, None]] = {}
+        # folded word -> its trigrams, and trigram -> words containing it
+        self._word_grams: Dict[str, FrozenSet[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, key: str):
+        """Index (or re-index) the name of a record"""
+        self.remove(key)
+        words = tuple(fold_name(name).split())
+        if not words:
+            return
+        self._names[key] = words
+        for word in words:
+            keys = self._words.get(word)
+            if keys is None:
+                keys = self._words[word] = {}
+                grams = self._word_grams[word] = word_grams(word)
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(word)
+            keys[key] = None
+
+    def remove(self, key: str):
+        for word in self._names.pop(key, ()):
+            keys = self._words.get(word)
+            if keys is None:
+                continue
+            keys.pop(key, None)
+            if not keys:
+                del self._words[word]
+                for gram in self._word_grams.pop(word):
+                    words = self._postings[gram]
+                    words.discard(word)
+                    if not words:
+                        del self._postings[gram]
+
+    # Lookups used by the search; a persistent index (sqlite_database.py)
+    # overrides them to read its tables instead of these dicts
+
+    def _gram_words(self, gram: str) -> Set[str]:
+        """Indexed words containing a trigram"""
+        return self._postings.get(gram, set())
+
+    def _gram_count(self, gram: str) -> int:
+        return len(self._postings.get(gram, ()))
+
+    def _grams_of(self, word: str) -> FrozenSet[str]:
+        return self._word_grams[word]
+
+    def _word_keys(self, word: str) -> Iterable[str]:
+        """Record keys using a word, in indexing order"""
+        return self._words[word]
+
+    def _key_count(self, word: str) -> int:
+        return len(self._words[word])
+
+    def _name_words(self, key: str) -> Tuple[str, ...]:
+        return self._names[key]
+
+    def similar_words(self, word: str, prefix: bool = False,
+                      min_similarity: float = MIN_SIMILARITY) -> List[Tuple[str, float]]:
+        """Indexed words matching a folded query word, best first (closest length on ties)"""
+        wanted = word_grams(word, prefix)
+        needed = max(1, math.ceil(min_similarity * len(wanted)))
+        # A word sharing `needed` of the trigrams has one of the
+        # len - needed + 1 rarest: only those posting lists are read
+        rarest = sorted(wanted, key=self._gram_count)[:len(wanted) - needed + 1]
+        candidates = set().union(*(self._gram_words(gram) for gram in rarest))
+        matches = []
+        for candidate in candidates:
+            shared = len(wanted & self._grams_of(candidate))
+            if shared >= needed:
+                matches.append((-shared, abs(len(candidate) - len(word)), candidate))
+        matches.sort()
+        return [(candidate, -negative / len(wanted)) for negative, _, candidate in matches]
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT,
+               min_similarity: float = MIN_SIMILARITY) -> List[Tuple[str, float]]:
+        """
+        Top `limit` (key, similarity) pairs, best first. Every query word must
+        match a word of the name (the last one as a prefix); similarity is the
+        average over the query words. Ties go to names whose words are closer in
+        length to the query's, then to the record indexed first.
+        """
+        words = fold_name(query).split()
+        if not words:
+            return []
+        matches = [self.similar_words(word, index == len(words) - 1, min_similarity)
+                   for index, word in enumerate(words)]
+        if not all(matches):
+            return []
+        # Records are read from the query word matching the fewest of them
+        driver = min(matches, key=lambda found: sum(self._key_count(word) for word, _ in found))
+        similarity = [dict(found) for found in matches]
+        ranked: List[Tuple[float, int, str]] = []
+        seen: Set[str] = set()
+        for word, _ in driver:
+            for key in self._word_keys(word):
+                if key in seen:
+                    continue
+                seen.add(key)
+                name = self._name_words(key)
+                scores = [max(found.get(name_word, 0.0) for name_word in name) for found in similarity]
+                if min(scores) >= min_similarity:
+                    ranked.append((-sum(scores) / len(scores), len(ranked), key))
+            # Words come best first: with a single query word nothing later can rank higher
+            if len(words) == 1 and len(ranked) >= limit:
+                break
+        return [(key, -negative) for negative, _, key in heapq.nsmallest(limit, ranked)]
@@ -0,0 +1,207 @@
+# Opening hours and closures of the clinic
+# The hours table in clinic_info ("9:00-12:00 e 14:00-18:00", "Chiuso") is the
+# only source of opening times. It is parsed once per knowledge version into
+# windows per weekday; a date is closed on Italian public holidays and on the
+# clinic's own `closures`, expanded once per year into a table of closed days.
+# slot_bitmap turns the windows into slot grids, memoized per distinct set of
+# windows, so every availability path shares them.
+
+import re
+from datetime import date as _date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Tuple
+
+# Minutes after midnight, [start, end)
+Window = Tuple[int, int]
+
+# Keys of the hours table, Monday first
+WEEKDAY_KEYS = ("lunedi", "martedi", "mercoledi", "giovedi", "venerdi", "sabato", "domenica")
+DAY_NAMES = {
+    "lunedi": "Lunedì", "martedi": "Martedì", "mercoledi": "Mercoledì", "giovedi": "Giovedì",
+    "venerdi": "Venerdì", "sabato": "Sabato", "domenica": "Domenica",
+}
+CLOSED = "chiuso"
+
+RANGE_RE = re.compile(r"^(\d{1,2})[:.](\d{2})\s*-\s*(\d{1,2})[:.](\d{2})$")
+# "9:00-12:00 e 14:00-18:00", also with "," or ";"
+SEPARATOR_RE = re.compile(r"\s*(?:[,;]|\be\b)\s*")
+MONTH_DAY_RE = re.compile(r"^\d{2}-\d{2}$")
+
+# (month, day) -> national holiday; San Francesco is a holiday from 2026
+NATIONAL_HOLIDAYS = {
+    (1, 1): "Capodanno",
+    (1, 6): "Epifania",
+    (4, 25): "Festa della Liberazione",
+    (5, 1): "Festa dei Lavoratori",
+    (6, 2): "Festa della Repubblica",
+    (8, 15): "Ferragosto",
+    (10, 4): "San Francesco d'Assisi",
+    (11, 1): "Ognissanti",
+    (12, 8): "Immacolata Concezione",
+    (12, 25): "Natale",
+    (12, 26): "Santo Stefano",
+}
+HOLIDAYS_SINCE = {(10, 4): 2026}
+
+CLOSURE_REASON = "chiusura dello studio"
+# Years whose closed days, and dates whose windows, are kept per knowledge version
+CLOSED_YEARS_MEMO = 8
+DATES_MEMO = 4096
+
+
+def parse_windows(value: str) -> Tuple[Window, ...]:
+    """'9:00-12:00 e 14:00-18:00' -> ((540, 720), (840, 1080)); 'Chiuso' -> ()"""
+    value = value.strip()
+    if value.lower() in (CLOSED, ""):
+        return ()
+    windows: List[Window] = []
+    for part in SEPARATOR_RE.split(value):
+        match = RANGE_RE.match(part)
+        if not match:
+            raise ValueError(f"orario '{part}' non valido (atteso HH:MM-HH:MM)")
+        start_h, start_m, end_h, end_m = (int(group) for group in match.groups())
+        start, end = start_h * 60 + start_m, end_h * 60 + end_m
+        if start_m >= 60 or end_m >= 60 or not 0 <= start < end <= 24 * 60:
+            raise ValueError(f"orario '{part}' non valido")
+        if windows and start < windows[-1][1]:
+            raise ValueError(f"fasce orarie '{value}' non in ordine o sovrapposte")
+        windows.append((start, end))
+    return tuple(windows)
+
+
+def parse_hours(hours: Mapping[str, str]) -> Tuple[Tuple[Window, ...], ...]:
+    """Hours table -> opening windows per weekday (0 = Monday); missing days are closed"""
+    unknown = set(hours) - set(WEEKDAY_KEYS)
+    if unknown:
+        raise ValueError(f"giorni sconosciuti: {', '.join(sorted(unknown))}")
+    return tuple(parse_windows(hours.get(day, CLOSED)) for day in WEEKDAY_KEYS)
+
+
+class Closure(NamedTuple):
+    first: str
+    last: str
+    # 'MM-DD' bounds repeat every year, 'YYYY-MM-DD' bounds do not
+    yearly: bool
+
+    def covers(self, day: _date) -> bool:
+        if not self.yearly:
+            return self.first <= day.isoformat() <= self.last
+        month_day = day.isoformat()[5:]
+        if self.first <= self.last:
+            return self.first <= month_day <= self.last
+        # Across new year, e.g. 12-24/01-06
+        return month_day >= self.first or month_day <= self.last
+
+
+def parse_closures(entries: Iterable[str]) -> Tuple[Closure, ...]:
+    """'12-07', '2030-08-12' or ranges 'first/last' of either form"""
+    closures = []
+    for entry in entries:
+        first, _, last = entry.strip().partition("/")
+        first, last = first.strip(), (last or first).strip()
+        yearly = bool(MONTH_DAY_RE.match(first))
+        try:
+            if yearly:
+                if not MONTH_DAY_RE.match(last):
+                    raise ValueError
+                for bound in (first, last):
+                    _date(2000, int(bound[:2]), int(bound[3:]))
+            elif _date.fromisoformat(first) > _date.fromisoformat(last):
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"chiusura '{entry}' non valida (MM-DD, YYYY-MM-DD o inizio/fine)") from None
+        closures.append(Closure(first, last, yearly))
+    return tuple(closures)
+
+
+def easter(year: int) -> _date:
+    """Easter Sunday (Gregorian calendar, anonymous algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return _date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+@lru_cache(maxsize=64)
+def italian_holidays(year: int) -> Dict[_date, str]:
+    """National public holidays of a year, Easter Monday included"""
+    holidays = {_date(year, month, day): name for (month, day), name in NATIONAL_HOLIDAYS.items()
+                if year >= HOLIDAYS_SINCE.get((month, day), 0)}
+    sunday = easter(year)
+    holidays[sunday] = "Pasqua"
+    holidays[sunday + timedelta(days=1)] = "Lunedì dell'Angelo"
+    return holidays
+
+
+def describe_hours(hours: Mapping[str, str]) -> str:
+    """{'lunedi': '9:00-18:00', ...} -> 'Lunedì-Venerdì 9:00-18:00, ...'"""
+    groups: List[List] = []
+    for day, value in hours.items():
+        if groups and groups[-1][2] == value:
+            groups[-1][1] = day
+        else:
+            groups.append([day, day, value])
+    parts = []
+    for first, last, value in groups:
+        days = DAY_NAMES.get(first, first.capitalize())
+        if last != first:
+            days += "-" + DAY_NAMES.get(last, last.capitalize())
+        parts.append(f"{days} {value.lower() if value.lower() == CLOSED else value}")
+    return ", ".join(parts)
+
+
+class OpeningHours:
+    """Opening windows per date from the knowledge base, rebuilt when it reloads"""
+
+    def __init__(self, kb):
+        self._load(kb.snapshot)
+        kb.on_reload(self._load)
+
+    def _load(self, snapshot):
+        info = snapshot.clinic_info
+        weekly = parse_hours(info["hours"])
+        closures = parse_closures(info.get("closures", ()))
+        closed_days = lru_cache(maxsize=CLOSED_YEARS_MEMO)(lambda year: self._closed_days(closures, year))
+        windows = lru_cache(maxsize=DATES_MEMO)(lambda day: self._windows((weekly, closed_days), day))
+        # One assignment: readers see either the old tables or the new ones
+        self._tables = (weekly, closed_days, windows)
+
+    @staticmethod
+    def _closed_days(closures: Tuple[Closure, ...], year: int) -> Dict[_date, str]:
+        """Holidays and clinic closures of a year -> reason"""
+        days = dict(italian_holidays(year))
+        if closures:
+            day = _date(year, 1, 1)
+            while day.year == year:
+                if any(closure.covers(day) for closure in closures):
+                    days.setdefault(day, CLOSURE_REASON)
+                day += timedelta(days=1)
+        return days
+
+    @staticmethod
+    def _closed_reason(tables, day: _date) -> str:
+        weekly, closed_days = tables[:2]
+        reason = closed_days(day.year).get(day)
+        if reason:
+            return reason
+        if not weekly[day.weekday()]:
+            return DAY_NAMES[WEEKDAY_KEYS[day.weekday()]].lower()
+        return ""
+
+    def closed_reason(self, day: str) -> str:
+        """Why the clinic is closed on an ISO date ('' when it is open)"""
+        return self._closed_reason(self._tables, _date.fromisoformat(day))
+
+    @classmethod
+    def _windows(cls, tables, day: str) -> Tuple[Window, ...]:
+        parsed = _date.fromisoformat(day)
+        return () if cls._closed_reason(tables, parsed) else tables[0][parsed.weekday()]
+
+    def windows(self, day: str) -> Tuple[Window, ...]:
+        """Opening windows of an ISO date, () when closed (memoized, bounded)"""
+        return self._tables[2](day)
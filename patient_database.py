@@ -1,35 +1,57 @@
 # Simple Patient Database for Dental Clinic
 # In production, this should be replaced with a proper database system
 
-import json
+import bisect
 import os
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
+
+from appointment_storage import AppendLogStorage, create_appointment_storage
+from id_generator import new_appointment_id
+from interval_index import IntervalIndex
+from name_index import SEARCH_LIMIT, NameIndex
+from phone_numbers import PhoneIndex, looks_like_phone, phone_key
+from slot_bitmap import (
+    DEFAULT_DURATION, DEFAULT_REQUIREMENT, Requirement, SlotOccupancy, appointment_duration,
+    booking_requirement, date_range, moving_requirement, to_minutes
+)
 
 class PatientDatabase:
-    def __init__(self, db_file: str = "patients.json"):
+    def __init__(self, db_file: str = "patients.json", storage=None):
         self.db_file = db_file
+        # Same engine as the appointments: one appended line per changed patient
+        self.storage = storage or AppendLogStorage(db_file, error_label="pazienti")
         self.patients = self._load_database()
+        # E.164 number -> key in self.patients (records saved before
+        # normalization keep the raw phone they were stored under)
+        self._phones = PhoneIndex()
+        # Folded name trigrams -> keys, for ranked fuzzy name search
+        self._names = NameIndex()
+        for patient_id, patient_data in self.patients.items():
+            self._phones.add(patient_data.get('phone') or patient_id, patient_id)
+            self._names.add(patient_data.get('name', ''), patient_id)
     
     def _load_database(self) -> Dict:
-        """Load patient database from JSON file"""
-        if os.path.exists(self.db_file):
-            try:
-                with open(self.db_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return {}
-        return {}
-    
-    def _save_database(self) -> bool:
-        """Save patient database to JSON file"""
-        try:
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                json.dump(self.patients, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            print(f"Errore nel salvataggio database: {e}")
-            return False
+        """Load patients (snapshot plus any pending log) from storage"""
+        return self.storage.load()
+    
+    def _save_database(self, patient_id: str) -> bool:
+        """Persist a single patient through the storage backend"""
+        return self.storage.put(patient_id, self.patients[patient_id])
+
+    def durable(self) -> Future:
+        """Acknowledgement for the last queued save"""
+        return self.storage.durable()
+
+    def close(self):
+        """Wait for pending saves"""
+        self.storage.close()
+    
+    def _patient_id(self, phone: str) -> Optional[str]:
+        """Key of the patient with this number, in any notation"""
+        return phone if phone in self.patients else self._phones.get(phone)
     
     def add_patient(self, patient_data: Dict) -> str:
         """Add a new patient to the database"""
@@ -37,54 +59,61 @@ class PatientDatabase:
         if not phone:
             return "Numero di telefono richiesto"
         
-        # Use phone as unique identifier
-        patient_id = phone
+        # The normalized phone is the unique identifier
+        patient_id = self._patient_id(phone) or phone_key(phone)
         
         # Add timestamp
         patient_data['created_at'] = datetime.now().isoformat()
         patient_data['updated_at'] = datetime.now().isoformat()
         
         self.patients[patient_id] = patient_data
+        self._phones.add(phone, patient_id)
+        self._names.add(patient_data.get('name', ''), patient_id)
         
-        if self._save_database():
+        if self._save_database(patient_id):
             return f"Paziente {patient_data.get('name', '')} aggiunto con successo"
         else:
             return "Errore nel salvataggio dei dati"
     
     def get_patient(self, phone: str) -> Optional[Dict]:
-        """Get patient information by phone number"""
-        return self.patients.get(phone)
+        """Get patient information by phone number (any notation, e.g. a caller ID)"""
+        patient_id = self._patient_id(phone)
+        return self.patients.get(patient_id) if patient_id is not None else None
     
     def update_patient(self, phone: str, updated_data: Dict) -> str:
         """Update existing patient information"""
-        if phone not in self.patients:
+        patient_id = self._patient_id(phone)
+        if patient_id is None:
             return "Paziente non trovato"
         
         # Update fields
+        old_phone = self.patients[patient_id].get('phone') or patient_id
         for key, value in updated_data.items():
             if value:  # Only update non-empty values
-                self.patients[phone][key] = value
+                self.patients[patient_id][key] = value
+        new_phone = self.patients[patient_id].get('phone') or patient_id
+        if phone_key(new_phone) != phone_key(old_phone):
+            self._phones.remove(old_phone, patient_id)
+            self._phones.add(new_phone, patient_id)
+        if updated_data.get('name'):
+            self._names.add(updated_data['name'], patient_id)
         
-        self.patients[phone]['updated_at'] = datetime.now().isoformat()
+        self.patients[patient_id]['updated_at'] = datetime.now().isoformat()
         
-        if self._save_database():
+        if self._save_database(patient_id):
             return "Informazioni paziente aggiornate"
         else:
             return "Errore nell'aggiornamento"
     
-    def search_patients(self, search_term: str) -> List[Dict]:
-        """Search patients by name or phone"""
-        results = []
-        search_term = search_term.lower()
-        
-        for patient_id, patient_data in self.patients.items():
-            name = patient_data.get('name', '').lower()
-            phone = patient_data.get('phone', '').lower()
-            
-            if search_term in name or search_term in phone:
-                results.append(patient_data)
+    def search_patients(self, search_term: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """
+        Search patients by phone (partial numbers use the phone index) or by
+        name: best `limit` fuzzy matches, accents and apostrophes ignored
+        """
+        if looks_like_phone(search_term):
+            return [self.patients[patient_id] for patient_id in self._phones.search(search_term)[:limit]]
         
-        return results
+        return [self.patients[patient_id] for patient_id, _ in self._names.search(search_term, limit)]
     
     def get_patient_appointments(self, phone: str) -> List[Dict]:
         """Get appointment history for a patient"""
@@ -93,113 +122,224 @@ class PatientDatabase:
         return []
 
 class AppointmentDatabase:
-    def __init__(self, db_file: str = "appointments.json"):
+    def __init__(self, db_file: str = "appointments.json", storage=None):
         self.db_file = db_file
+        self.storage = storage or create_appointment_storage(db_file)
         self.appointments = self._load_database()
+        self._build_indexes()
+        self._write_lock = threading.Lock()
     
     def _load_database(self) -> Dict:
-        """Load appointments database from JSON file"""
-        if os.path.exists(self.db_file):
-            try:
-                with open(self.db_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return {}
-        return {}
-    
-    def _save_database(self) -> bool:
-        """Save appointments database to JSON file"""
-        try:
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                json.dump(self.appointments, f, ensure_ascii=False, indent=2)
-            return True
-        except Exception as e:
-            print(f"Errore nel salvataggio appuntamenti: {e}")
-            return False
+        """Load appointments (snapshot plus any pending log) from storage"""
+        return self.storage.load()
+    
+    def _save_appointment(self, appointment_id: str) -> bool:
+        """Persist a single appointment through the storage backend"""
+        return self.storage.put(appointment_id, self.appointments[appointment_id])
+
+    def durable(self) -> Future:
+        """Acknowledgement for every appointment write queued so far"""
+        return self.storage.durable()
+
+    def close(self):
+        """Wait for pending writes"""
+        self.storage.close()
+    
+    def _build_indexes(self):
+        """Build the secondary indexes from the loaded appointments"""
+        # date -> sorted list of (time, appointment_id)
+        self._by_date: Dict[str, List[Tuple[str, str]]] = {}
+        # E.164 phone -> appointment ids (insertion ordered)
+        self._by_phone: Dict[str, Dict[str, None]] = {}
+        # status -> appointment ids
+        self._by_status: Dict[str, Set[str]] = {}
+        # date -> resource -> sorted intervals of confirmed appointments
+        self._intervals = IntervalIndex()
+        # date -> resource -> occupancy bitmap, kept in step with the intervals
+        self._occupancy = SlotOccupancy()
+        for appointment_id in self.appointments:
+            self._index(appointment_id, refresh=False)
+        for date in self._by_date:
+            self._refresh_occupancy(date)
+    
+    def _refresh_occupancy(self, date: str):
+        """Copy a date's interval bitmaps into the occupancy used by slot searches"""
+        self._occupancy.set_day(date, self._intervals.masks(date))
+    
+    def _day_occupancy(self, date: str, exclude: str = "") -> SlotOccupancy:
+        """Occupancy of a date, without appointment `exclude` (one being moved) if given"""
+        if not exclude:
+            return self._occupancy
+        occupancy = SlotOccupancy()
+        occupancy.set_day(date, self._intervals.masks(date, exclude))
+        return occupancy
+    
+    def _index(self, appointment_id: str, refresh: bool = True):
+        """Add an appointment to every secondary index"""
+        app_data = self.appointments[appointment_id]
+        bisect.insort(self._by_date.setdefault(app_data.get('date', ''), []),
+                      (app_data.get('time', ''), appointment_id))
+        self._by_phone.setdefault(phone_key(app_data.get('phone', '')), {})[appointment_id] = None
+        self._by_status.setdefault(app_data.get('status', ''), set()).add(appointment_id)
+        if self._intervals.add(app_data) and refresh:
+            self._refresh_occupancy(app_data.get('date', ''))
+    
+    def _unindex(self, appointment_id: str):
+        """Remove an appointment from every secondary index"""
+        app_data = self.appointments[appointment_id]
+        date = app_data.get('date', '')
+        day = self._by_date.get(date, [])
+        entry = (app_data.get('time', ''), appointment_id)
+        pos = bisect.bisect_left(day, entry)
+        if pos < len(day) and day[pos] == entry:
+            del day[pos]
+            if not day:
+                del self._by_date[date]
+        phone = phone_key(app_data.get('phone', ''))
+        self._by_phone.get(phone, {}).pop(appointment_id, None)
+        if phone in self._by_phone and not self._by_phone[phone]:
+            del self._by_phone[phone]
+        self._by_status.get(app_data.get('status', ''), set()).discard(appointment_id)
+        if self._intervals.remove(app_data):
+            self._refresh_occupancy(date)
     
     def add_appointment(self, appointment_data: Dict) -> str:
         """Add a new appointment"""
-        appointment_id = f"APP_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        appointment_id = new_appointment_id()
         appointment_data['id'] = appointment_id
         appointment_data['created_at'] = datetime.now().isoformat()
         appointment_data['status'] = 'confermato'
         
         self.appointments[appointment_id] = appointment_data
+        self._index(appointment_id)
         
-        if self._save_database():
+        if self._save_appointment(appointment_id):
             return appointment_id
         else:
             return ""
     
+    def add_appointment_if_free(self, appointment_data: Dict) -> str:
+        """
+        Add an appointment only if its whole duration is still free (atomic
+        check-and-set). The resources it takes are stored on the record.
+        """
+        with self._write_lock:
+            resources = self.assign_resources(appointment_data.get('date', ''), appointment_data.get('time', ''),
+                                              appointment_duration(appointment_data),
+                                              booking_requirement(appointment_data))
+            if resources is None:
+                return ""
+            appointment_data['resources'] = list(resources)
+            return self.add_appointment(appointment_data)
+    
     def get_appointment(self, appointment_id: str) -> Optional[Dict]:
         """Get appointment by ID"""
         return self.appointments.get(appointment_id)
     
     def get_appointments_by_date(self, date: str) -> List[Dict]:
         """Get all appointments for a specific date"""
-        appointments = []
-        for app_id, app_data in self.appointments.items():
-            if app_data.get('date') == date:
-                appointments.append(app_data)
-        return sorted(appointments, key=lambda x: x.get('time', ''))
+        return [self.appointments[app_id] for _, app_id in self._by_date.get(date, [])]
     
     def get_appointments_by_patient(self, phone: str) -> List[Dict]:
         """Get all appointments for a specific patient"""
-        appointments = []
-        for app_id, app_data in self.appointments.items():
-            if app_data.get('phone') == phone:
-                appointments.append(app_data)
+        appointments = [self.appointments[app_id] for app_id in self._by_phone.get(phone_key(phone), {})]
         return sorted(appointments, key=lambda x: x.get('date', ''))
     
+    def get_appointments_by_status(self, status: str) -> List[Dict]:
+        """Get all appointments with a given status"""
+        return [self.appointments[app_id] for app_id in self._by_status.get(status, set())]
+    
     def cancel_appointment(self, appointment_id: str) -> bool:
         """Cancel an appointment"""
         if appointment_id in self.appointments:
+            self._unindex(appointment_id)
             self.appointments[appointment_id]['status'] = 'cancellato'
             self.appointments[appointment_id]['cancelled_at'] = datetime.now().isoformat()
-            return self._save_database()
+            self._index(appointment_id)
+            return self._save_appointment(appointment_id)
         return False
     
     def update_appointment(self, appointment_id: str, updated_data: Dict) -> bool:
         """Update appointment information"""
         if appointment_id in self.appointments:
+            self._unindex(appointment_id)
             for key, value in updated_data.items():
                 if value:
                     self.appointments[appointment_id][key] = value
             self.appointments[appointment_id]['updated_at'] = datetime.now().isoformat()
-            return self._save_database()
+            self._index(appointment_id)
+            return self._save_appointment(appointment_id)
         return False
     
-    def check_availability(self, date: str, time: str) -> bool:
-        """Check if a time slot is available"""
-        for app_id, app_data in self.appointments.items():
-            if (app_data.get('date') == date and 
-                app_data.get('time') == time and 
-                app_data.get('status') == 'confermato'):
+    def update_appointment_if_free(self, appointment_id: str, updated_data: Dict) -> bool:
+        """
+        Move an appointment only if its new span is free, not counting the
+        appointment itself (atomic check-and-set). `resources` in the changes
+        are the ones to take; otherwise free ones are assigned for its type.
+        """
+        with self._write_lock:
+            appointment = self.appointments.get(appointment_id)
+            if appointment is None:
                 return False
-        return True
+            moved = dict(appointment, **{key: value for key, value in updated_data.items() if value})
+            resources = self.assign_resources(moved.get('date', ''), moved.get('time', ''),
+                                              appointment_duration(moved), moving_requirement(moved, updated_data),
+                                              exclude=appointment_id)
+            if resources is None:
+                return False
+            return self.update_appointment(appointment_id, dict(updated_data, resources=list(resources)))
     
-    def get_available_slots(self, date: str) -> List[str]:
-        """Get available time slots for a date"""
-        # Define working hours
-        if date.endswith('6'):  # Saturday (assuming date format includes day of week)
-            all_slots = ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30", "12:00", "12:30"]
-        else:
-            all_slots = ["09:00", "09:30", "10:00", "10:30", "11:00", "11:30", 
-                        "14:00", "14:30", "15:00", "15:30", "16:00", "16:30", "17:00", "17:30"]
-        
-        # Remove booked slots
-        booked_slots = []
-        for app_id, app_data in self.appointments.items():
-            if (app_data.get('date') == date and 
-                app_data.get('status') == 'confermato'):
-                booked_slots.append(app_data.get('time'))
-        
-        available_slots = [slot for slot in all_slots if slot not in booked_slots]
-        return available_slots
+    def check_availability(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                           requirement: Requirement = DEFAULT_REQUIREMENT, exclude: str = "") -> bool:
+        """Check that no confirmed appointment (other than `exclude`) overlaps [time, time + duration)"""
+        return self._day_occupancy(date, exclude).is_free(date, time, duration, requirement)
+    
+    def assign_resources(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                         requirement: Requirement = DEFAULT_REQUIREMENT,
+                         unavailable: Tuple[str, ...] = (), exclude: str = "") -> Optional[Tuple[str, ...]]:
+        """Free resources meeting the requirement over [time, time + duration), or None"""
+        return self._day_occupancy(date, exclude).assign(date, time, duration, requirement, unavailable)
+    
+    def get_available_slots(self, date: str, duration: int = DEFAULT_DURATION,
+                            requirement: Requirement = DEFAULT_REQUIREMENT) -> List[str]:
+        """Get start times on a date where `duration` minutes are free during opening hours"""
+        return self._occupancy.free_slots(date, duration, requirement)
+    
+    def find_overlapping(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                         resources: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+        """Confirmed appointments overlapping [time, time + duration) on the resources (default: any)"""
+        start = to_minutes(time)
+        return [self.appointments[app_id]
+                for app_id in self._intervals.overlapping(date, start, start + duration, resources)]
+    
+    def find_next_slots(self, start_date: str, days: int = 90, duration: int = DEFAULT_DURATION,
+                        limit: int = 3, requirement: Requirement = DEFAULT_REQUIREMENT,
+                        time_of_day: str = "", not_before: Optional[Tuple[str, str]] = None
+                        ) -> List[Tuple[str, str]]:
+        """First `limit` free (date, time) starts from start_date over `days` days"""
+        return self._occupancy.next_free(date_range(start_date, days), duration, limit,
+                                         requirement, time_of_day, not_before)
+
+def create_databases(backend: Optional[str] = None):
+    """
+    Build the patient and appointment databases.
+    backend is 'json' (default) or 'sqlite'; when omitted it is read from DENTAL_DB_BACKEND.
+    The SQLite backend imports existing JSON data the first time it is opened.
+    """
+    backend = (backend or os.getenv("DENTAL_DB_BACKEND", "json")).lower()
+    if backend == "sqlite":
+        from sqlite_database import (
+            SQLiteAppointmentDatabase, SQLitePatientDatabase, connect, migrate_from_json
+        )
+        db_path = os.getenv("DENTAL_SQLITE_PATH", "clinic.db")
+        conn = connect(db_path)
+        migrate_from_json(conn)
+        conn.close()
+        return SQLitePatientDatabase(db_path), SQLiteAppointmentDatabase(db_path)
+    return PatientDatabase(), AppointmentDatabase()
 
 # Global instances (in production, use proper dependency injection)
-patient_db = PatientDatabase()
-appointment_db = AppointmentDatabase()
+patient_db, appointment_db = create_databases()
 
 # Helper functions for the tools
 def save_patient_info(patient_data: Dict) -> str:
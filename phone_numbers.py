@@ -0,0 +1,116 @@
+# Phone number normalization and lookup indexes
+# Patients are identified by their phone number, which callers, staff and the
+# telephony caller ID write in many ways ("+39 02 1234567", "021234567",
+# "0039 02-1234567"). normalize_phone() turns them all into E.164
+# (+39021234567), so one number is one hash key; PhoneIndex adds a digit
+# trigram index for partial numbers such as "1234567" or "02 123".
+
+import re
+from typing import Dict, List, Optional, Set
+
+COUNTRY_CODE = "39"
+# Italian national numbers (0x landlines, 3xx mobiles) have at most 10 digits
+NATIONAL_MAX_DIGITS = 10
+# E.164 numbers have at most 15 digits after the "+"
+MIN_DIGITS, MAX_DIGITS = 6, 15
+GRAM = 3
+
+NON_DIGITS_RE = re.compile(r"\D")
+PHONE_LIKE_RE = re.compile(r"^\+?[\d\s().\-/]*\d[\d\s().\-/]*$")
+
+
+def normalize_phone(raw: str, country_code: str = COUNTRY_CODE) -> str:
+    """
+    E.164 form of a number, national numbers being Italian by default:
+    '+39 02 1234567', '0039 02 1234567' and '02-1234567' -> '+39021234567'.
+    Returns '' when the text is not a plausible phone number.
+    """
+    text = raw.strip()
+    if not PHONE_LIKE_RE.match(text):
+        return ""
+    digits = NON_DIGITS_RE.sub("", text)
+    if text.startswith("+"):
+        international = digits
+    elif digits.startswith("00"):
+        international = digits[2:]
+    elif digits.startswith(country_code) and len(digits) > NATIONAL_MAX_DIGITS:
+        # Country code typed without the "+"
+        international = digits
+    else:
+        international = country_code + digits
+    if not MIN_DIGITS <= len(international) <= MAX_DIGITS:
+        return ""
+    return "+" + international
+
+
+def phone_key(raw: str) -> str:
+    """Lookup key of a number: E.164 when it parses, else the trimmed text"""
+    return normalize_phone(raw) or raw.strip()
+
+
+def looks_like_phone(text: str) -> bool:
+    """True for search terms made of digits and phone punctuation only"""
+    return bool(PHONE_LIKE_RE.match(text.strip()))
+
+
+def digit_grams(digits: str) -> Set[str]:
+    """Trigrams of a digit string (also indexed by the SQLite backend)"""
+    return {digits[i:i + GRAM] for i in range(len(digits) - GRAM + 1)}
+
+
+def search_digits(partial: str) -> str:
+    """Digits a partial number is matched with ('0039 02' -> '3902')"""
+    text = partial.strip()
+    digits = NON_DIGITS_RE.sub("", text)
+    return digits[2:] if text.startswith("00") else digits
+
+
+class PhoneIndex:
+    """Canonical number -> record key in a dict, plus digit trigrams for partial numbers"""
+
+    def __init__(self):
+        self._keys: Dict[str, str] = {}
+        # trigram of a number's digits -> canonical numbers containing it
+        self._grams: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, phone: str, key: str):
+        number = phone_key(phone)
+        if not number:
+            return
+        if number not in self._keys:
+            for gram in digit_grams(NON_DIGITS_RE.sub("", number)):
+                self._grams.setdefault(gram, set()).add(number)
+        self._keys[number] = key
+
+    def remove(self, phone: str, key: Optional[str] = None):
+        """Forget a number (only if it still points to `key`, when given)"""
+        number = phone_key(phone)
+        if number not in self._keys or (key is not None and self._keys[number] != key):
+            return
+        del self._keys[number]
+        for gram in digit_grams(NON_DIGITS_RE.sub("", number)):
+            numbers = self._grams.get(gram)
+            if numbers is not None:
+                numbers.discard(number)
+                if not numbers:
+                    del self._grams[gram]
+
+    def get(self, phone: str) -> Optional[str]:
+        """Record key of a number in any notation (e.g. a caller ID), in O(1)"""
+        return self._keys.get(phone_key(phone))
+
+    def search(self, partial: str) -> List[str]:
+        """Record keys whose number contains the digits of `partial`, by number"""
+        digits = search_digits(partial)
+        if not digits:
+            return []
+        if len(digits) < GRAM:
+            candidates = set(self._keys)
+        else:
+            postings = sorted((self._grams.get(gram, set()) for gram in digit_grams(digits)), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        return [self._keys[number] for number in sorted(candidates)
+                if digits in NON_DIGITS_RE.sub("", number)]
@@ -0,0 +1,217 @@
+# Token-budgeted system prompts
+# The wording lives in prompts.py; this module splits AGENT_INSTRUCTION and
+# SESSION_INSTRUCTION into their "# " sections, replaces the hard-coded clinic
+# facts with ones rendered from the knowledge base, drops lines that repeat an
+# earlier fact and keeps sections in priority order until the budget is spent.
+
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from faq_index import analyze
+from knowledge_base import KnowledgeBase, KnowledgeSnapshot, knowledge
+from opening_hours import describe_hours
+from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
+
+AGENT = "agent"
+SESSION = "session"
+
+CLINIC_SECTION = "Informazioni sulla clinica"
+
+# title -> (priority, required); lower priorities are kept first
+SECTION_PRIORITIES = {
+    "Persona": (0, True),
+    "Compito": (0, True),
+    "Specifiche": (1, False),
+    CLINIC_SECTION: (2, False),
+    "Comportamento": (3, False),
+    "Esempi di conversazione": (4, False),
+    "Terminologia dentistica italiana importante": (5, False),
+}
+DEFAULT_PRIORITY = (6, False)
+
+# A line whose terms are mostly covered by one earlier line repeats that fact
+DUPLICATE_OVERLAP = 0.8
+
+# Budget of the compact variant: persona, task, rules, clinic facts and conduct;
+# examples and terminology are left to the tools (see alias_resolver)
+COMPACT_BUDGET = 600
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# "9:00" -> "9" in the prompt's hours line; half hours keep their minutes
+WHOLE_HOUR_RE = re.compile(r"\b(\d{1,2}):00\b")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate LLM token count: ~4 characters per word piece, 1 per symbol"""
+    return sum(math.ceil(len(piece) / 4) for piece in TOKEN_RE.findall(text))
+
+
+@dataclass(frozen=True)
+class Section:
+    title: str
+    target: str
+    lines: Tuple[str, ...]
+    priority: int
+    required: bool
+
+    @property
+    def text(self) -> str:
+        return "\n".join((f"# {self.title}",) + self.lines)
+
+
+def split_sections(text: str, target: str) -> List[Section]:
+    """'# Title' blocks of a prompt string, with their non-empty lines"""
+    sections: List[Section] = []
+    title, lines = None, []
+
+    def close():
+        if title is not None:
+            priority, required = SECTION_PRIORITIES.get(title, DEFAULT_PRIORITY)
+            sections.append(Section(title, target, tuple(lines), priority, required))
+
+    for raw in text.strip().splitlines():
+        line = raw.strip() if raw.lstrip().startswith("#") else raw.rstrip()
+        if line.startswith("# "):
+            close()
+            title, lines = line[2:].strip(), []
+        elif line.strip():
+            # Session lines are indented in prompts.py; keep only list nesting
+            lines.append(line[4:] if target == SESSION and line.startswith("    ") else line)
+    close()
+    return sections
+
+
+def clinic_lines(snapshot: KnowledgeSnapshot) -> Tuple[str, ...]:
+    """Clinic facts for the session prompt, from the current knowledge snapshot"""
+    info = snapshot.clinic_info
+    services = ", ".join(service["name"] for service in snapshot.services.values())
+    hours = WHOLE_HOUR_RE.sub(r"\1", describe_hours(info["hours"]))
+    return (
+        f"- Nome: {info['name']}",
+        f"- Orari: {hours}",
+        f"- Servizi: {services}",
+        f"- {info['emergency_hours']}",
+    )
+
+
+@dataclass(frozen=True)
+class BuiltPrompt:
+    agent_instruction: str
+    session_instruction: str
+    # title -> tokens actually sent
+    section_tokens: Dict[str, int]
+    dropped: Tuple[str, ...]
+    trimmed: Tuple[str, ...]
+    budget: Optional[int]
+
+    @property
+    def tokens(self) -> int:
+        return sum(self.section_tokens.values())
+
+    def report(self) -> str:
+        lines = [f"Prompt: {self.tokens} token (budget {self.budget or 'illimitato'})"]
+        lines += [f"  {title}: {tokens}" for title, tokens in self.section_tokens.items()]
+        if self.trimmed:
+            lines.append(f"  Ridotte: {', '.join(self.trimmed)}")
+        if self.dropped:
+            lines.append(f"  Escluse: {', '.join(self.dropped)}")
+        return "\n".join(lines)
+
+
+class PromptBuilder:
+    """Builds agent and session instructions from prompts.py and the knowledge base"""
+
+    def __init__(self, knowledge_base: KnowledgeBase = knowledge,
+                 tokenizer: Callable[[str], int] = count_tokens):
+        self.knowledge_base = knowledge_base
+        self.tokenizer = tokenizer
+        self._cache: Dict[Optional[int], BuiltPrompt] = {}
+        knowledge_base.on_reload(lambda snapshot: self._cache.clear())
+
+    def sections(self) -> List[Section]:
+        """Every section in prompt order, clinic facts taken from the knowledge base"""
+        sections = split_sections(AGENT_INSTRUCTION, AGENT) + split_sections(SESSION_INSTRUCTION, SESSION)
+        facts = clinic_lines(self.knowledge_base.snapshot)
+        return [Section(s.title, s.target, facts, s.priority, s.required) if s.title == CLINIC_SECTION else s
+                for s in sections]
+
+    @staticmethod
+    def _dedupe(sections: List[Section]) -> Dict[str, Tuple[str, ...]]:
+        """Lines of each section without facts already stated by a higher-priority line"""
+        seen: List[set] = []
+        kept: Dict[str, Tuple[str, ...]] = {}
+        for section in sorted(sections, key=lambda s: s.priority):
+            lines = []
+            for line in section.lines:
+                terms = set(analyze(line))
+                if terms and any(len(terms & earlier) >= DUPLICATE_OVERLAP * len(terms) for earlier in seen):
+                    continue
+                if terms:
+                    seen.append(terms)
+                lines.append(line)
+            kept[section.title] = tuple(lines)
+        return kept
+
+    def build(self, budget: Optional[int] = None) -> BuiltPrompt:
+        """Instructions within `budget` tokens (required sections are always kept)"""
+        if budget in self._cache:
+            return self._cache[budget]
+
+        sections = self.sections()
+        lines = self._dedupe(sections)
+        chosen: Dict[str, Tuple[str, ...]] = {}
+        trimmed, dropped = [], []
+        remaining = budget if budget is not None else math.inf
+        for section in sorted(sections, key=lambda s: s.priority):
+            header = self.tokenizer(f"# {section.title}")
+            body = lines[section.title]
+            cost = header + sum(self.tokenizer(line) for line in body)
+            if section.required or cost <= remaining:
+                chosen[section.title] = body
+                remaining -= cost
+                continue
+            # Keep the leading lines that fit (rules and lists are in order of importance)
+            partial, spent = [], header
+            for line in body:
+                if spent + self.tokenizer(line) > remaining:
+                    break
+                partial.append(line)
+                spent += self.tokenizer(line)
+            if partial:
+                chosen[section.title] = tuple(partial)
+                trimmed.append(section.title)
+                remaining -= spent
+            else:
+                dropped.append(section.title)
+
+        texts = {AGENT: [], SESSION: []}
+        section_tokens = {}
+        for section in sections:
+            if section.title in chosen:
+                text = Section(section.title, section.target, chosen[section.title],
+                               section.priority, section.required).text
+                texts[section.target].append(text)
+                section_tokens[section.title] = self.tokenizer(text)
+        built = BuiltPrompt(
+            agent_instruction="\n\n".join(texts[AGENT]),
+            session_instruction="\n\n".join(texts[SESSION]),
+            section_tokens=section_tokens,
+            dropped=tuple(dropped),
+            trimmed=tuple(trimmed),
+            budget=budget,
+        )
+        self._cache[budget] = built
+        return built
+
+
+def configured_budget() -> Optional[int]:
+    """DENTAL_PROMPT_BUDGET: a token count, or 'full' for the unbudgeted prompt"""
+    value = os.getenv("DENTAL_PROMPT_BUDGET", str(COMPACT_BUDGET)).strip().lower()
+    return None if value == "full" else int(value)
+
+
+# Shared instance used by the agent entrypoint
+prompt_builder = PromptBuilder()
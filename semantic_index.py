@@ -0,0 +1,216 @@
+# Semantic search over the clinic knowledge base
+# Every FAQ, service, appointment type and clinic detail becomes a snippet.
+# Snippets are embedded on CPU with a hashed-feature vectorizer (stemmed
+# words, word pairs and character trigrams hashed into DIM signed buckets),
+# weighted by IDF and L2-normalized. The matrix is saved next to the knowledge
+# file, in one file with the version it was built for, and memory-mapped; a
+# query is one matrix-vector product.
+
+import json
+import math
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from faq_index import analyze
+from knowledge_base import KNOWLEDGE_FILE, KnowledgeBase, KnowledgeSnapshot, knowledge
+
+DIM = 4096
+WORD_WEIGHT = 1.0
+PAIR_WEIGHT = 0.7
+TRIGRAM_WEIGHT = 0.3
+# Cosine below which a snippet is not worth returning
+MIN_SCORE = 0.12
+
+# The matrix starts at a multiple of this offset in the index file
+HEADER_ALIGN = 64
+
+INDEX_PATH = os.getenv("DENTAL_KNOWLEDGE_INDEX", os.path.splitext(KNOWLEDGE_FILE)[0] + ".index")
+
+
+def features(text: str) -> Dict[str, float]:
+    """Weighted sparse features of a text"""
+    terms = analyze(text)
+    weights: Dict[str, float] = {}
+
+    def add(feature: str, weight: float):
+        weights[feature] = weights.get(feature, 0.0) + weight
+
+    for term in terms:
+        add("w:" + term, WORD_WEIGHT)
+        padded = f"#{term}#"
+        for i in range(len(padded) - 2):
+            add("c:" + padded[i:i + 3], TRIGRAM_WEIGHT)
+    for first, second in zip(terms, terms[1:]):
+        add(f"p:{first}_{second}", PAIR_WEIGHT)
+    return weights
+
+
+def embed(text: str, dim: int = DIM) -> np.ndarray:
+    """Hashed, signed, sublinear-tf vector (not normalized)"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in features(text).items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        scaled = 1.0 + math.log(weight) if weight > 1 else weight
+        vector[h % dim] += sign * scaled
+    return vector
+
+
+def knowledge_snippets(snapshot: KnowledgeSnapshot) -> List[Dict[str, str]]:
+    """One snippet per answerable piece of the knowledge base"""
+    snippets = []
+
+    def add(snippet_id: str, title: str, text: str, extra: str = ""):
+        snippets.append({"id": snippet_id, "title": title, "text": text,
+                         "indexed": f"{title}. {text} {extra}"})
+
+    for key, item in snapshot.faq.items():
+        add(f"faq:{key}", item["question"], item["answer"], key)
+    for key, service in snapshot.services.items():
+        add(f"servizio:{key}", service["name"],
+            f"{service['description']}. Durata: {service['duration']}. Costo: {service['price_range']}",
+            f"{key} prezzo quanto costa")
+    for key, appointment in snapshot.appointment_types.items():
+        add(f"appuntamento:{key}", appointment["name"],
+            f"{appointment['description']}. Durata: {appointment['duration']} minuti.", key)
+    for key, member in snapshot.staff.items():
+        specializations = ", ".join(member.get("specializations", ()))
+        add(f"staff:{key}", member["name"], f"{member['title']}. {specializations}".strip(" ."))
+
+    info = snapshot.clinic_info
+    hours = ", ".join(f"{day.capitalize()} {value}" for day, value in info["hours"].items())
+    add("clinica:orari", "Orari di apertura", f"{hours}. {info['emergency_hours']}", "ora orari aprite aperto chiudete chiuso")
+    add("clinica:contatti", "Contatti", f"Telefono {info['phone']}, email {info['email']}, sito {info['website']}",
+        "telefono numero chiamare scrivere")
+    add("clinica:posizione", "Dove siamo", f"{info['address']}. {info['parking']}. {info['accessibility']}",
+        "indirizzo dove arrivare parcheggio")
+
+    insurance = snapshot.insurance_info
+    add("assicurazioni", "Assicurazioni accettate",
+        f"{', '.join(insurance['accepted_insurances'])}. {insurance['coverage_info']} {insurance['direct_billing']}",
+        "assicurazione convenzione rimborso")
+    payment = snapshot.payment_options
+    add("pagamenti", "Metodi di pagamento",
+        f"{', '.join(payment['methods'])}. {payment['installments']}. {payment['receipts']}",
+        "pagare rate fattura")
+    return snippets
+
+
+def build_matrix(snippets: List[Dict[str, str]], dim: int = DIM) -> np.ndarray:
+    """IDF-weighted, L2-normalized snippet vectors (one row per snippet)"""
+    matrix = np.stack([embed(snippet["indexed"], dim) for snippet in snippets])
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    idf = np.log((len(snippets) + 1) / (document_frequency + 1)) + 1.0
+    matrix *= idf.astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def write_index(path: str, meta: Dict, matrix: np.ndarray):
+    """
+    Write the metadata (one JSON line, padded) and the float32 matrix to one
+    file, atomically: workers build into their own temporary file, so a reader
+    never maps a half-written matrix or pairs it with another version's snippets
+    """
+    header = json.dumps(dict(meta, rows=matrix.shape[0], dim=matrix.shape[1]), ensure_ascii=False).encode("utf-8")
+    header += b" " * (-(len(header) + 1) % HEADER_ALIGN) + b"\n"
+    fd, tmp_file = tempfile.mkstemp(prefix=os.path.basename(path) + ".",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(np.ascontiguousarray(matrix, dtype="<f4").tobytes())
+        os.replace(tmp_file, path)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+
+def read_index(path: str) -> Tuple[Dict, np.ndarray]:
+    """Metadata and memory-mapped matrix of an index file"""
+    with open(path, "rb") as f:
+        header = f.readline()
+    meta = json.loads(header)
+    matrix = np.memmap(path, dtype="<f4", mode="r", offset=len(header), shape=(meta["rows"], meta["dim"]))
+    return meta, matrix
+
+
+@dataclass(frozen=True)
+class KnowledgeHit:
+    id: str
+    title: str
+    text: str
+    score: float
+
+
+class SemanticIndex:
+    """
+    Snippet vectors for the current knowledge version, memory-mapped from disk.
+    The files are rebuilt only when the knowledge version changes, so workers
+    share the page cache instead of each holding a copy.
+    """
+
+    def __init__(self, knowledge_base: KnowledgeBase = knowledge, path: str = INDEX_PATH,
+                 dim: int = DIM):
+        self.knowledge_base = knowledge_base
+        self.path = path
+        self.dim = dim
+        self._matrix: Optional[np.ndarray] = None
+        self._snippets: List[Dict[str, str]] = []
+        knowledge_base.on_reload(lambda snapshot: self.invalidate())
+
+    def invalidate(self):
+        self._matrix = None
+
+    def _map(self, index_file: str, version) -> bool:
+        """Map the index file if it was built for this knowledge version"""
+        try:
+            meta, matrix = read_index(index_file)
+            if meta["version"] != version or meta["dim"] != self.dim:
+                return False
+            self._matrix, self._snippets = matrix, meta["snippets"]
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _load(self):
+        snapshot = self.knowledge_base.snapshot
+        index_file = f"{self.path}.bin"
+        if self._map(index_file, snapshot.version):
+            return
+
+        snippets = knowledge_snippets(snapshot)
+        matrix = build_matrix(snippets, self.dim)
+        write_index(index_file, {
+            "version": snapshot.version,
+            "snippets": [{key: s[key] for key in ("id", "title", "text")} for s in snippets],
+        }, matrix)
+        # Another worker may already have replaced the file with another version
+        if not self._map(index_file, snapshot.version):
+            self._matrix, self._snippets = matrix, snippets
+
+    def search(self, query: str, limit: int = 3, min_score: float = MIN_SCORE) -> List[KnowledgeHit]:
+        """Best-matching snippets by cosine similarity"""
+        if self._matrix is None:
+            self._load()
+        vector = embed(query, self.dim)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            return []
+        scores = self._matrix @ (vector / norm)
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [KnowledgeHit(self._snippets[i]["id"], self._snippets[i]["title"],
+                             self._snippets[i]["text"], float(scores[i]))
+                for i in top if scores[i] >= min_score]
+
+
+# Shared instance used by search_knowledge
+semantic_index = SemanticIndex()
@@ -176,11 +176,14 @@ def test_patient_database():
         
         # Clean up test files
         import os
-        try:
-            os.remove("test_patients.json")
-            os.remove("test_appointments.json")
-        except:
-            pass
+        import glob
+        patient_db.close()
+        appointment_db.close()
+        for path in glob.glob("test_patients.json*") + glob.glob("test_appointments.json*"):
+            try:
+                os.remove(path)
+            except:
+                pass
         
         print("✅ Patient database test passed!\n")
         return True
@@ -0,0 +1,300 @@
+# Bitmap slot occupancy for availability search
+# Each day is a Python int used as a bitset: bit i is the i-th quantum
+# (default 5 minutes) after midnight. Finding a free window of N quanta is a
+# handful of shifts and ANDs instead of comparing lists of time strings.
+# Practitioners, chairs and equipment each have their own bitmap; an
+# appointment type needs one resource from each of its groups, so availability
+# is the AND over groups of the OR over interchangeable resources.
+# Opening windows come from opening_hours.py; the open and start-grid masks of
+# each distinct set of windows (in practice one per weekday) are computed once.
+
+from datetime import date as _date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from knowledge_base import knowledge
+from opening_hours import OpeningHours, Window
+
+QUANTUM_MINUTES = 5
+# Distance between proposed start times (the historical half-hour grid)
+GRID_MINUTES = 30
+DEFAULT_DURATION = 30
+# Whole clinic: the only resource before appointment types declared theirs
+DEFAULT_RESOURCE = "studio"
+
+# Groups of interchangeable resources, in order of preference
+Requirement = Tuple[Tuple[str, ...], ...]
+DEFAULT_REQUIREMENT: Requirement = ((DEFAULT_RESOURCE,),)
+
+# Opening windows per date, from the hours table of the knowledge base
+clinic_hours = OpeningHours(knowledge)
+
+
+def to_minutes(time: str) -> int:
+    """'HH:MM' -> minutes after midnight"""
+    hours, minutes = time.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def to_time(minutes: int) -> str:
+    """Minutes after midnight -> 'HH:MM'"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def quanta(minutes: int, quantum: int = QUANTUM_MINUTES) -> int:
+    """Number of quanta needed to cover `minutes` (rounded up)"""
+    return -(-minutes // quantum)
+
+
+def span_mask(start_minutes: int, duration: int, quantum: int = QUANTUM_MINUTES) -> int:
+    """Bits covering [start, start + duration)"""
+    first = start_minutes // quantum
+    last = quanta(start_minutes + duration, quantum)
+    return ((1 << (last - first)) - 1) << first
+
+
+def window_starts(free: int, length: int) -> int:
+    """
+    Bits i such that bits i .. i+length-1 are all set in `free`.
+    Uses doubling, so it costs O(log length) big-int operations.
+    """
+    result = free
+    covered = 1
+    while covered < length:
+        step = min(covered, length - covered)
+        result &= result >> step
+        covered += step
+    return result
+
+
+def lowest_bit(mask: int) -> int:
+    """Index of the lowest set bit (mask must be non-zero)"""
+    return (mask & -mask).bit_length() - 1
+
+
+def iter_bits(mask: int) -> Iterable[int]:
+    """Indexes of the set bits, ascending"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def date_range(start: str, days: int) -> List[str]:
+    """ISO dates from `start` for `days` consecutive days"""
+    first = _date.fromisoformat(start)
+    return [(first + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+
+@lru_cache(maxsize=None)
+def windows_mask(windows: Tuple[Window, ...], quantum: int = QUANTUM_MINUTES) -> int:
+    """Quanta inside opening windows"""
+    mask = 0
+    for start, end in windows:
+        mask |= span_mask(start, end - start, quantum)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def windows_grid(windows: Tuple[Window, ...], quantum: int = QUANTUM_MINUTES) -> int:
+    """Quanta where a proposed appointment may start inside opening windows"""
+    mask = 0
+    for start, end in windows:
+        for minutes in range(start, end, GRID_MINUTES):
+            mask |= 1 << (minutes // quantum)
+    return mask
+
+
+def appointment_duration(appointment: Dict) -> int:
+    """Booked duration in minutes, from the record or its appointment type"""
+    if appointment.get('duration'):
+        return int(appointment['duration'])
+    appointment_types = knowledge.snapshot.appointment_types
+    return appointment_types.get(appointment.get('type', ''), {}).get('duration', DEFAULT_DURATION)
+
+
+# Start-time windows for a time-of-day preference
+TIME_OF_DAY = {
+    "mattina": (0, 13 * 60),
+    "pomeriggio": (13 * 60, 24 * 60),
+}
+
+
+def all_of(resources: Iterable[str]) -> Requirement:
+    """Requirement for exactly these resources"""
+    return tuple((resource,) for resource in resources)
+
+
+def requirement_for(appointment_type: str, practitioner: str = "") -> Requirement:
+    """
+    Resources an appointment type needs (the whole clinic if it declares none).
+    A requested practitioner replaces the group it belongs to, or is added.
+    """
+    appointment_types = knowledge.snapshot.appointment_types
+    requires = appointment_types.get(appointment_type, {}).get('requires')
+    requirement = tuple(tuple(group) for group in requires) if requires else DEFAULT_REQUIREMENT
+    if practitioner:
+        if any(practitioner in group for group in requirement):
+            return tuple((practitioner,) if practitioner in group else group for group in requirement)
+        return requirement + ((practitioner,),)
+    return requirement
+
+
+def booking_requirement(appointment: Dict) -> Requirement:
+    """Requirement of a record: its assigned resources, else its type's"""
+    if appointment.get('resources'):
+        return all_of(appointment['resources'])
+    return requirement_for(appointment.get('type', ''), appointment.get('practitioner', ''))
+
+
+def moving_requirement(moved: Dict, changes: Dict) -> Requirement:
+    """Requirement of a record moved by `changes`: the resources they hold, else its type's"""
+    if changes.get('resources'):
+        return all_of(changes['resources'])
+    return requirement_for(moved.get('type', ''), moved.get('practitioner', ''))
+
+
+def resource_keys(appointment: Dict) -> List[str]:
+    """Resources whose calendars an appointment occupies"""
+    if appointment.get('resources'):
+        return list(appointment['resources'])
+    # Booked before resources were assigned: the whole clinic
+    keys = [DEFAULT_RESOURCE]
+    if appointment.get('practitioner'):
+        keys.append(appointment['practitioner'])
+    return keys
+
+
+def free_starts(date: str, occupied: int, duration: int = DEFAULT_DURATION,
+                quantum: int = QUANTUM_MINUTES) -> int:
+    """Grid start quanta where `duration` minutes fit inside opening hours"""
+    windows = clinic_hours.windows(date)
+    free = windows_mask(windows, quantum) & ~occupied
+    return window_starts(free, quanta(duration, quantum)) & windows_grid(windows, quantum)
+
+
+def bookable(date: str, time: str, duration: int = DEFAULT_DURATION,
+             quantum: int = QUANTUM_MINUTES) -> bool:
+    """True if `time` is a start on the grid and [time, time + duration) is inside opening hours"""
+    start = to_minutes(time)
+    windows = clinic_hours.windows(date)
+    if start % quantum or not windows_grid(windows, quantum) >> (start // quantum) & 1:
+        return False
+    return not span_mask(start, duration, quantum) & ~windows_mask(windows, quantum)
+
+
+class SlotOccupancy:
+    """Occupancy bitmaps per date and resource"""
+
+    def __init__(self, quantum: int = QUANTUM_MINUTES):
+        self.quantum = quantum
+        # date -> resource -> bitmap
+        self._days: Dict[str, Dict[str, int]] = {}
+
+    def set_day(self, date: str, masks: Dict[str, int]):
+        """Replace every resource bitmap of a day"""
+        masks = {resource: mask for resource, mask in masks.items() if mask}
+        if masks:
+            self._days[date] = masks
+        else:
+            self._days.pop(date, None)
+
+    def busy(self, date: str, resource: str) -> int:
+        """Quanta where a resource is taken; whole-clinic bookings take every resource"""
+        masks = self._days.get(date)
+        if not masks:
+            return 0
+        if resource == DEFAULT_RESOURCE:
+            occupied = 0
+            for mask in masks.values():
+                occupied |= mask
+            return occupied
+        return masks.get(resource, 0) | masks.get(DEFAULT_RESOURCE, 0)
+
+    def day(self, date: str, resources: Tuple[str, ...] = (DEFAULT_RESOURCE,)) -> int:
+        """Quanta where any of the resources is busy"""
+        occupied = 0
+        for resource in resources:
+            occupied |= self.busy(date, resource)
+        return occupied
+
+    def starts(self, date: str, duration: int = DEFAULT_DURATION,
+               requirement: Requirement = DEFAULT_REQUIREMENT) -> int:
+        """Grid start quanta where every group has a resource free for `duration` minutes"""
+        result = None
+        for group in requirement:
+            group_starts = 0
+            for resource in group:
+                group_starts |= free_starts(date, self.busy(date, resource), duration, self.quantum)
+            result = group_starts if result is None else result & group_starts
+            if not result:
+                return 0
+        return free_starts(date, 0, duration, self.quantum) if result is None else result
+
+    def assign(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+               requirement: Requirement = DEFAULT_REQUIREMENT,
+               unavailable: Iterable[str] = ()) -> Optional[Tuple[str, ...]]:
+        """
+        One free resource per group for [time, time + duration), first choice
+        first, skipping `unavailable` ones (e.g. held by someone else).
+        None if some group has none left, or the clinic is closed then.
+        """
+        unavailable = set(unavailable)
+        if DEFAULT_RESOURCE in unavailable or not bookable(date, time, duration, self.quantum):
+            return None
+        span = span_mask(to_minutes(time), duration, self.quantum)
+        chosen: List[str] = []
+        for group in requirement:
+            for resource in group:
+                if resource in chosen or resource in unavailable:
+                    continue
+                if resource == DEFAULT_RESOURCE and unavailable:
+                    continue
+                if not self.busy(date, resource) & span:
+                    chosen.append(resource)
+                    break
+            else:
+                return None
+        return tuple(chosen)
+
+    def is_free(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                requirement: Requirement = DEFAULT_REQUIREMENT) -> bool:
+        """True if the requirement can be met over [time, time + duration) during opening hours"""
+        return self.assign(date, time, duration, requirement) is not None
+
+    def free_slots(self, date: str, duration: int = DEFAULT_DURATION,
+                   requirement: Requirement = DEFAULT_REQUIREMENT) -> List[str]:
+        """Proposed start times on a date where `duration` minutes are free"""
+        return [to_time(bit * self.quantum) for bit in iter_bits(self.starts(date, duration, requirement))]
+
+    def next_free(self, dates: Iterable[str], duration: int = DEFAULT_DURATION, limit: int = 1,
+                  requirement: Requirement = DEFAULT_REQUIREMENT,
+                  time_of_day: str = "", not_before: Optional[Tuple[str, str]] = None
+                  ) -> List[Tuple[str, str]]:
+        """
+        First `limit` (date, time) starts across `dates` where `duration` minutes are free.
+        time_of_day restricts starts to a TIME_OF_DAY window; not_before skips
+        starts earlier than (date, time), e.g. the current time today.
+        """
+        window = ~0
+        if time_of_day in TIME_OF_DAY:
+            start, end = TIME_OF_DAY[time_of_day]
+            window = span_mask(start, end - start, self.quantum)
+        found: List[Tuple[str, str]] = []
+        for date in dates:
+            starts = self.starts(date, duration, requirement) & window
+            if not_before is not None and date <= not_before[0]:
+                if date < not_before[0]:
+                    continue
+                starts &= ~((1 << quanta(to_minutes(not_before[1]), self.quantum)) - 1)
+            for bit in iter_bits(starts):
+                found.append((date, to_time(bit * self.quantum)))
+                if len(found) >= limit:
+                    return found
+        return found
+
+    def first_free(self, dates: Iterable[str], duration: int = DEFAULT_DURATION,
+                   requirement: Requirement = DEFAULT_REQUIREMENT) -> Optional[Tuple[str, str]]:
+        """First (date, time) across `dates` where `duration` minutes are free"""
+        found = self.next_free(dates, duration, 1, requirement)
+        return found[0] if found else None
@@ -0,0 +1,152 @@
+# Slot reservations for concurrent booking sessions
+# A session places a short-lived hold on a slot while the patient confirms;
+# the booking is then committed with a compare-and-set on the day's version.
+# A hold takes concrete resources (practitioner, chair, ...), so sessions
+# holding different ones can book the same time.
+# Holds live on the event loop; database checks and writes go through the
+# calendar's run_db, so no thread is blocked while waiting.
+
+import asyncio
+import secrets
+import time as _time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Set, Tuple, TypeVar
+
+from slot_bitmap import (
+    DEFAULT_DURATION, DEFAULT_REQUIREMENT, DEFAULT_RESOURCE, Requirement, all_of, span_mask, to_minutes
+)
+
+T = TypeVar("T")
+
+DEFAULT_HOLD_SECONDS = 120.0
+# Version key bumped by every commit of a day (whole-clinic holds depend on it)
+ANY_RESOURCE = "*"
+
+
+def version_keys(resources: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Day versions a hold depends on: its resources and whole-clinic bookings"""
+    if DEFAULT_RESOURCE in resources:
+        return (ANY_RESOURCE,)
+    return (*resources, DEFAULT_RESOURCE)
+
+
+@dataclass
+class SlotHold:
+    token: str
+    date: str
+    time: str
+    duration: int
+    resources: Tuple[str, ...]
+    expires_at: float
+    # What the hold was taken for, so a booking can check it matches
+    requirement: Requirement = DEFAULT_REQUIREMENT
+    # Id of the appointment being moved here, whose own span does not count
+    exclude: str = ""
+    # Day versions seen when the hold was taken, per resource
+    versions: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def mask(self) -> int:
+        return span_mask(to_minutes(self.time), self.duration)
+
+    def expired(self, now: float) -> bool:
+        return now >= self.expires_at
+
+
+class ReservationManager:
+    def __init__(self, calendar, hold_seconds: float = DEFAULT_HOLD_SECONDS):
+        self.calendar = calendar
+        self.hold_seconds = hold_seconds
+        self._holds: Dict[str, SlotHold] = {}
+        # (resource, date) -> number of commits that touched that day
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = asyncio.Lock()
+
+    def _purge_expired(self, now: float):
+        for token in [token for token, hold in self._holds.items() if hold.expired(now)]:
+            del self._holds[token]
+
+    def _held_resources(self, date: str, mask: int) -> Set[str]:
+        """Resources of other holds overlapping `mask` on a date"""
+        held: Set[str] = set()
+        for hold in self._holds.values():
+            if hold.date == date and hold.mask & mask:
+                held.update(hold.resources)
+        return held
+
+    async def hold(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                   requirement: Requirement = DEFAULT_REQUIREMENT, exclude: str = "") -> Optional[SlotHold]:
+        """
+        Hold a free slot for hold_seconds, with resources meeting the requirement;
+        None if they are all booked or held by someone else. `exclude` is the
+        id of an appointment being rescheduled, which may overlap its new slot.
+        """
+        async with self._lock:
+            now = _time.monotonic()
+            self._purge_expired(now)
+            mask = span_mask(to_minutes(time), duration)
+            unavailable = tuple(self._held_resources(date, mask))
+            resources = await self.calendar.run_db(
+                lambda: self.calendar.assign(date, time, duration, requirement, unavailable, exclude))
+            if resources is None:
+                return None
+            hold = SlotHold(
+                token=secrets.token_hex(3).upper(),
+                date=date,
+                time=time,
+                duration=duration,
+                resources=resources,
+                expires_at=now + self.hold_seconds,
+                requirement=requirement,
+                exclude=exclude,
+                versions={key: self._versions.get((key, date), 0) for key in version_keys(resources)},
+            )
+            self._holds[hold.token] = hold
+            return hold
+
+    def get(self, token: str) -> Optional[SlotHold]:
+        """Active hold for a token, if it has not expired"""
+        hold = self._holds.get(token.upper())
+        if hold is None or hold.expired(_time.monotonic()):
+            return None
+        return hold
+
+    async def release(self, token: str) -> bool:
+        async with self._lock:
+            return self._holds.pop(token.upper(), None) is not None
+
+    async def commit(self, hold: SlotHold, action: Callable[[], T]) -> Optional[T]:
+        """
+        Run `action` (the actual write, through calendar.run_db) if the hold is still valid.
+        If another commit touched the same day since the hold was taken, the
+        slot is re-validated against the calendar before writing. Returns the
+        action's result, or None when the hold expired or the slot was lost.
+        """
+        async with self._lock:
+            now = _time.monotonic()
+            current = self._holds.get(hold.token)
+            if current is not hold or hold.expired(now):
+                self._holds.pop(hold.token, None)
+                return None
+            changed = any(self._versions.get((r, hold.date), 0) != v for r, v in hold.versions.items())
+
+            def checked_action():
+                if changed and not self.calendar.is_available(hold.date, hold.time, hold.duration,
+                                                              all_of(hold.resources), hold.exclude):
+                    return None
+                return action()
+
+            result = await self.calendar.run_db(checked_action)
+            del self._holds[hold.token]
+            if result:
+                for resource in (*hold.resources, ANY_RESOURCE):
+                    key = (resource, hold.date)
+                    self._versions[key] = self._versions.get(key, 0) + 1
+            return result
+
+    async def expire_loop(self, interval: float = 10.0):
+        """Background task that drops stale holds (optional: holds also expire lazily)"""
+        while True:
+            await asyncio.sleep(interval)
+            async with self._lock:
+                self._purge_expired(_time.monotonic())
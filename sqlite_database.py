@@ -0,0 +1,555 @@
+# SQLite-backed Patient and Appointment databases
+# Same public methods as the JSON classes in patient_database.py, but rows are
+# read and written individually instead of loading/rewriting a whole file.
+
+import json
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from async_persistence import completed_future
+from id_generator import id_lower_bound, new_appointment_id
+from interval_index import IntervalIndex
+from name_index import SEARCH_LIMIT, NameIndex, fold_name, word_grams
+from phone_numbers import NON_DIGITS_RE, digit_grams, looks_like_phone, phone_key, search_digits
+from slot_bitmap import (
+    DEFAULT_DURATION, DEFAULT_REQUIREMENT, Requirement, SlotOccupancy, appointment_duration,
+    booking_requirement, date_range, moving_requirement, to_minutes
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    phone TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patients_name ON patients(name);
+
+-- Search indexes, written in the same transaction as the patient row:
+-- folded name words per patient and the trigrams of every distinct word
+-- (see name_index.py), and the digit trigrams of each number
+CREATE TABLE IF NOT EXISTS patient_name_words (
+    seq INTEGER PRIMARY KEY,
+    word TEXT NOT NULL,
+    patient TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_name_words_word ON patient_name_words(word, seq);
+CREATE INDEX IF NOT EXISTS idx_name_words_patient ON patient_name_words(patient);
+CREATE TABLE IF NOT EXISTS name_word_grams (
+    gram TEXT NOT NULL,
+    word TEXT NOT NULL,
+    PRIMARY KEY (gram, word)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS patient_phone_grams (
+    gram TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    PRIMARY KEY (gram, phone)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL DEFAULT '',
+    time TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_appointments_date_time ON appointments(date, time);
+CREATE INDEX IF NOT EXISTS idx_appointments_phone ON appointments(phone, date);
+CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments(status, date, time);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+"""
+
+# Statements are parameterized and reused verbatim so sqlite3's statement
+# cache keeps them prepared across calls.
+UPSERT_PATIENT = "INSERT OR REPLACE INTO patients (phone, name, data) VALUES (?, ?, ?)"
+# Keys are E.164 numbers; rows written before normalization keep their raw phone
+SELECT_PATIENT = "SELECT phone, data FROM patients WHERE phone IN (?, ?) ORDER BY phone = ? DESC LIMIT 1"
+SELECT_PATIENT_BY_KEY = "SELECT data FROM patients WHERE phone = ?"
+SELECT_PATIENT_NAMES = "SELECT phone, name FROM patients"
+# Partial numbers shorter than a trigram cannot use the index
+SEARCH_PHONES_BY_DIGITS = "SELECT phone FROM patients WHERE replace(phone, ' ', '') LIKE ? ORDER BY phone LIMIT ?"
+INSERT_PHONE_GRAM = "INSERT OR IGNORE INTO patient_phone_grams (gram, phone) VALUES (?, ?)"
+SELECT_PHONE_GRAM = "SELECT phone FROM patient_phone_grams WHERE gram = ? ORDER BY phone"
+COUNT_PHONE_GRAM = "SELECT COUNT(*) FROM patient_phone_grams WHERE gram = ?"
+INSERT_NAME_WORD = "INSERT INTO patient_name_words (word, patient) VALUES (?, ?)"
+SELECT_NAME_WORDS = "SELECT word FROM patient_name_words WHERE patient = ? ORDER BY seq"
+DELETE_NAME_WORDS = "DELETE FROM patient_name_words WHERE patient = ?"
+SELECT_WORD_PATIENTS = "SELECT patient FROM patient_name_words WHERE word = ? ORDER BY seq"
+COUNT_WORD_PATIENTS = "SELECT COUNT(*) FROM patient_name_words WHERE word = ?"
+INSERT_NAME_GRAM = "INSERT OR IGNORE INTO name_word_grams (gram, word) VALUES (?, ?)"
+DELETE_NAME_GRAM = "DELETE FROM name_word_grams WHERE gram = ? AND word = ?"
+SELECT_GRAM_WORDS = "SELECT word FROM name_word_grams WHERE gram = ?"
+COUNT_GRAM_WORDS = "SELECT COUNT(*) FROM name_word_grams WHERE gram = ?"
+SEARCH_INDEX_MIGRATION = "patient_search_index"
+PHONE_INDEX_MIGRATION = "patient_phone_index"
+UPSERT_APPOINTMENT = (
+    "INSERT OR REPLACE INTO appointments (id, date, time, phone, status, data) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+# New bookings never replace a row: an id taken by another worker is an error
+INSERT_APPOINTMENT = (
+    "INSERT INTO appointments (id, date, time, phone, status, data) VALUES (?, ?, ?, ?, ?, ?)"
+)
+# Fresh ids tried before giving up when they collide with existing rows
+ID_ATTEMPTS = 5
+SELECT_APPOINTMENT = "SELECT data FROM appointments WHERE id = ?"
+SELECT_BY_DATE = "SELECT data FROM appointments WHERE date = ? ORDER BY time"
+SELECT_BY_PATIENT = "SELECT data FROM appointments WHERE phone IN (?, ?) ORDER BY date"
+# Legacy APP_<timestamp> ids have a different length and are excluded
+SELECT_CREATED_SINCE = "SELECT data FROM appointments WHERE id >= ? AND length(id) = ? ORDER BY id"
+SELECT_BY_STATUS = "SELECT data FROM appointments WHERE status = ?"
+SELECT_BOOKED = "SELECT data FROM appointments WHERE date = ? AND status = 'confermato'"
+SELECT_BOOKED_RANGE = (
+    "SELECT data FROM appointments WHERE status = 'confermato' AND date BETWEEN ? AND ?"
+)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection in WAL mode and make sure the schema exists"""
+    conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=128)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Trigrams of the vocabulary words met by searches (names repeat a lot)
+_cached_word_grams = lru_cache(maxsize=65536)(word_grams)
+
+
+class SQLiteNameIndex(NameIndex):
+    """
+    NameIndex kept in the database tables instead of memory: add/remove join
+    the caller's transaction, so the index is always in step with the rows
+    and opening the database does not rebuild it
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(DISTINCT patient) FROM patient_name_words").fetchone()[0]
+
+    def add(self, name: str, key: str):
+        self.remove(key)
+        for word in dict.fromkeys(fold_name(name).split()):
+            self.conn.executemany(INSERT_NAME_GRAM, [(gram, word) for gram in word_grams(word)])
+            self.conn.execute(INSERT_NAME_WORD, (word, key))
+
+    def remove(self, key: str):
+        words = self._name_words(key)
+        self.conn.execute(DELETE_NAME_WORDS, (key,))
+        for word in words:
+            if not self._key_count(word):
+                self.conn.executemany(DELETE_NAME_GRAM, [(gram, word) for gram in word_grams(word)])
+
+    def _gram_words(self, gram: str) -> Set[str]:
+        return {row[0] for row in self.conn.execute(SELECT_GRAM_WORDS, (gram,))}
+
+    def _gram_count(self, gram: str) -> int:
+        return self.conn.execute(COUNT_GRAM_WORDS, (gram,)).fetchone()[0]
+
+    def _grams_of(self, word: str) -> FrozenSet[str]:
+        return _cached_word_grams(word)
+
+    def _word_keys(self, word: str) -> List[str]:
+        return [row[0] for row in self.conn.execute(SELECT_WORD_PATIENTS, (word,))]
+
+    def _key_count(self, word: str) -> int:
+        return self.conn.execute(COUNT_WORD_PATIENTS, (word,)).fetchone()[0]
+
+    def _name_words(self, key: str) -> Tuple[str, ...]:
+        return tuple(row[0] for row in self.conn.execute(SELECT_NAME_WORDS, (key,)))
+
+
+class SQLitePatientDatabase:
+    # Queries and commits hit the disk synchronously: CalendarService.run_db runs them off the event loop
+    blocking_writes = True
+
+    def __init__(self, db_path: str = "clinic.db", conn: Optional[sqlite3.Connection] = None):
+        self.db_path = db_path
+        self.conn = conn or connect(db_path)
+        self._lock = threading.Lock()
+        self._names = SQLiteNameIndex(self.conn)
+        self._index_existing(SEARCH_INDEX_MIGRATION, lambda patient_id, name: self._names.add(name, patient_id))
+        self._index_existing(PHONE_INDEX_MIGRATION, lambda patient_id, name: self._index_phone(patient_id))
+
+    def _index_existing(self, migration: str, index_row: Callable[[str, str], None]):
+        """One-shot indexing of rows written before a search table existed"""
+        if self.conn.execute("SELECT 1 FROM migrations WHERE name = ?", (migration,)).fetchone():
+            return
+        with self._lock, self.conn:
+            for patient_id, name in self.conn.execute(SELECT_PATIENT_NAMES).fetchall():
+                index_row(patient_id, name)
+            # Another worker may have indexed concurrently: the writes above are idempotent
+            self.conn.execute("INSERT OR IGNORE INTO migrations (name, applied_at) VALUES (?, ?)",
+                              (migration, datetime.now().isoformat()))
+
+    def _index_phone(self, patient_id: str):
+        self.conn.executemany(INSERT_PHONE_GRAM, [
+            (gram, patient_id) for gram in digit_grams(NON_DIGITS_RE.sub("", patient_id))])
+
+    def _index(self, patient_id: str, name: str):
+        """Update the search tables for a row, inside the caller's transaction"""
+        self._index_phone(patient_id)
+        self._names.add(name, patient_id)
+
+    def _save(self, patient_id: str, patient: Dict) -> bool:
+        """Write a patient row and its search entries in one transaction"""
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(UPSERT_PATIENT, (patient_id, patient.get('name', ''),
+                                                   json.dumps(patient, ensure_ascii=False)))
+                self._index(patient_id, patient.get('name', ''))
+            return True
+        except sqlite3.Error as e:
+            print(f"Errore nel salvataggio database: {e}")
+            return False
+
+    def durable(self) -> Future:
+        """Writes are committed before returning (WAL, synchronous=NORMAL)"""
+        return completed_future()
+
+    def close(self):
+        self.conn.close()
+
+    def import_patients(self, patients: Dict) -> int:
+        """Bulk insert patients keyed by phone (used by the JSON migration)"""
+        rows = [(phone_key(data.get('phone') or phone), data.get('name', ''), json.dumps(data, ensure_ascii=False))
+                for phone, data in patients.items()]
+        with self._lock, self.conn:
+            self.conn.executemany(UPSERT_PATIENT, rows)
+            for patient_id, name, _ in rows:
+                self._index(patient_id, name)
+        return len(rows)
+
+    def add_patient(self, patient_data: Dict) -> str:
+        """Add a new patient to the database"""
+        phone = patient_data.get('phone', '')
+        if not phone:
+            return "Numero di telefono richiesto"
+
+        patient_data['created_at'] = datetime.now().isoformat()
+        patient_data['updated_at'] = datetime.now().isoformat()
+
+        existing = self._find(phone)
+        patient_id = existing[0] if existing else phone_key(phone)
+        if self._save(patient_id, patient_data):
+            return f"Paziente {patient_data.get('name', '')} aggiunto con successo"
+        else:
+            return "Errore nel salvataggio dei dati"
+
+    def _find(self, phone: str) -> Optional[Tuple[str, Dict]]:
+        """(row key, patient) for a number in any notation"""
+        number = phone_key(phone)
+        row = self.conn.execute(SELECT_PATIENT, (number, phone, number)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def get_patient(self, phone: str) -> Optional[Dict]:
+        """Get patient information by phone number (any notation, e.g. a caller ID)"""
+        found = self._find(phone)
+        return found[1] if found else None
+
+    def update_patient(self, phone: str, updated_data: Dict) -> str:
+        """Update existing patient information"""
+        found = self._find(phone)
+        if found is None:
+            return "Paziente non trovato"
+        patient_id, patient = found
+
+        for key, value in updated_data.items():
+            if value:  # Only update non-empty values
+                patient[key] = value
+
+        patient['updated_at'] = datetime.now().isoformat()
+
+        if self._save(patient_id, patient):
+            return "Informazioni paziente aggiornate"
+        else:
+            return "Errore nell'aggiornamento"
+
+    def _search_phone(self, partial: str, limit: int) -> List[str]:
+        """Row keys containing the digits of a partial number, via the trigram table"""
+        digits = search_digits(partial)
+        if not digits:
+            return []
+        grams = digit_grams(digits)
+        if not grams:
+            return [row[0] for row in self.conn.execute(SEARCH_PHONES_BY_DIGITS, (f"%{digits}%", limit))]
+        # Numbers containing the digits contain every trigram: read the rarest
+        # one's rows and keep those with the whole digit string
+        rarest = min(grams, key=lambda gram: self.conn.execute(COUNT_PHONE_GRAM, (gram,)).fetchone()[0])
+        candidates = [row[0] for row in self.conn.execute(SELECT_PHONE_GRAM, (rarest,))]
+        return [key for key in candidates if digits in NON_DIGITS_RE.sub("", key)][:limit]
+
+    def search_patients(self, search_term: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """
+        Search patients by phone (partial numbers use the digit trigram table) or
+        by name: best `limit` fuzzy matches, accents and apostrophes ignored
+        """
+        if looks_like_phone(search_term):
+            keys = self._search_phone(search_term, limit)
+        else:
+            keys = [patient_id for patient_id, _ in self._names.search(search_term, limit)]
+        rows = [self.conn.execute(SELECT_PATIENT_BY_KEY, (patient_id,)).fetchone() for patient_id in keys]
+        return [json.loads(row[0]) for row in rows if row]
+
+    def get_patient_appointments(self, phone: str) -> List[Dict]:
+        """Get appointment history for a patient"""
+        # This would integrate with the appointment system
+        # For now, return empty list
+        return []
+
+
+class SQLiteAppointmentDatabase:
+    # Queries and commits hit the disk synchronously: CalendarService.run_db runs them off the event loop
+    blocking_writes = True
+
+    def __init__(self, db_path: str = "clinic.db", conn: Optional[sqlite3.Connection] = None):
+        self.db_path = db_path
+        self.conn = conn or connect(db_path)
+        self._lock = threading.Lock()
+
+    def _save(self, appointment: Dict) -> bool:
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(UPSERT_APPOINTMENT, self._row(appointment))
+            return True
+        except sqlite3.Error as e:
+            print(f"Errore nel salvataggio appuntamenti: {e}")
+            return False
+
+    def durable(self) -> Future:
+        """Writes are committed before returning (WAL, synchronous=NORMAL)"""
+        return completed_future()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _row(appointment: Dict):
+        return (
+            appointment['id'],
+            appointment.get('date', ''),
+            appointment.get('time', ''),
+            phone_key(appointment.get('phone', '')),
+            appointment.get('status', ''),
+            json.dumps(appointment, ensure_ascii=False),
+        )
+
+    def _insert_new(self, appointment: Dict) -> str:
+        """
+        Insert a new appointment inside the caller's transaction. Workers sharing
+        a DENTAL_WORKER_ID can generate the same id; the row is then retried
+        under a fresh id instead of overwriting the other booking.
+        """
+        for _ in range(ID_ATTEMPTS):
+            appointment['id'] = new_appointment_id()
+            try:
+                self.conn.execute(INSERT_APPOINTMENT, self._row(appointment))
+                return appointment['id']
+            except sqlite3.IntegrityError:
+                continue
+        raise sqlite3.IntegrityError(f"nessun id libero dopo {ID_ATTEMPTS} tentativi")
+
+    def _query(self, sql: str, params) -> List[Dict]:
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def import_appointments(self, appointments: Dict) -> int:
+        """Bulk insert appointments keyed by id (used by the JSON migration)"""
+        rows = [self._row(dict(data, id=app_id)) for app_id, data in appointments.items()]
+        with self._lock, self.conn:
+            self.conn.executemany(UPSERT_APPOINTMENT, rows)
+        return len(rows)
+
+    def add_appointment(self, appointment_data: Dict) -> str:
+        """Add a new appointment"""
+        appointment_data['created_at'] = datetime.now().isoformat()
+        appointment_data['status'] = 'confermato'
+
+        try:
+            with self._lock, self.conn:
+                return self._insert_new(appointment_data)
+        except sqlite3.Error as e:
+            print(f"Errore nel salvataggio appuntamenti: {e}")
+            return ""
+
+    def add_appointment_if_free(self, appointment_data: Dict) -> str:
+        """
+        Add an appointment only if its whole duration is still free.
+        The check and the insert share one IMMEDIATE transaction, so concurrent
+        workers on the same database file cannot both take the slot.
+        """
+        date = appointment_data.get('date', '')
+        with self._lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                resources = self._day_occupancy(date).assign(
+                    date, appointment_data.get('time', ''), appointment_duration(appointment_data),
+                    booking_requirement(appointment_data))
+                if resources is None:
+                    self.conn.rollback()
+                    return ""
+                appointment_data['resources'] = list(resources)
+                appointment_data['created_at'] = datetime.now().isoformat()
+                appointment_data['status'] = 'confermato'
+                appointment_id = self._insert_new(appointment_data)
+                self.conn.commit()
+                return appointment_id
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                print(f"Errore nel salvataggio appuntamenti: {e}")
+                return ""
+
+    def get_appointment(self, appointment_id: str) -> Optional[Dict]:
+        """Get appointment by ID"""
+        rows = self._query(SELECT_APPOINTMENT, (appointment_id,))
+        return rows[0] if rows else None
+
+    def get_appointments_by_date(self, date: str) -> List[Dict]:
+        """Get all appointments for a specific date"""
+        return self._query(SELECT_BY_DATE, (date,))
+
+    def get_appointments_by_patient(self, phone: str) -> List[Dict]:
+        """Get all appointments for a specific patient"""
+        return self._query(SELECT_BY_PATIENT, (phone_key(phone), phone))
+
+    def get_appointments_by_status(self, status: str) -> List[Dict]:
+        """Get all appointments with a given status"""
+        return self._query(SELECT_BY_STATUS, (status,))
+
+    def get_appointments_created_since(self, moment: datetime) -> List[Dict]:
+        """Appointments booked at or after `moment`, via a primary-key range scan"""
+        lower_bound = id_lower_bound(moment)
+        return self._query(SELECT_CREATED_SINCE, (lower_bound, len(lower_bound)))
+
+    def cancel_appointment(self, appointment_id: str) -> bool:
+        """Cancel an appointment"""
+        appointment = self.get_appointment(appointment_id)
+        if appointment is not None:
+            appointment['status'] = 'cancellato'
+            appointment['cancelled_at'] = datetime.now().isoformat()
+            return self._save(appointment)
+        return False
+
+    def update_appointment(self, appointment_id: str, updated_data: Dict) -> bool:
+        """Update appointment information"""
+        appointment = self.get_appointment(appointment_id)
+        if appointment is not None:
+            for key, value in updated_data.items():
+                if value:
+                    appointment[key] = value
+            appointment['updated_at'] = datetime.now().isoformat()
+            return self._save(appointment)
+        return False
+
+    def update_appointment_if_free(self, appointment_id: str, updated_data: Dict) -> bool:
+        """
+        Move an appointment only if its new span is free, not counting the
+        appointment itself. Read, check and write share one IMMEDIATE
+        transaction, like add_appointment_if_free.
+        """
+        with self._lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                row = self.conn.execute(SELECT_APPOINTMENT, (appointment_id,)).fetchone()
+                if row is None:
+                    self.conn.rollback()
+                    return False
+                appointment = json.loads(row[0])
+                for key, value in updated_data.items():
+                    if value:
+                        appointment[key] = value
+                date = appointment.get('date', '')
+                resources = self._day_occupancy(date, appointment_id).assign(
+                    date, appointment.get('time', ''), appointment_duration(appointment),
+                    moving_requirement(appointment, updated_data))
+                if resources is None:
+                    self.conn.rollback()
+                    return False
+                appointment['resources'] = list(resources)
+                appointment['updated_at'] = datetime.now().isoformat()
+                self.conn.execute(UPSERT_APPOINTMENT, self._row(appointment))
+                self.conn.commit()
+                return True
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                print(f"Errore nel salvataggio appuntamenti: {e}")
+                return False
+
+    def _day_occupancy(self, date: str, exclude: str = "") -> SlotOccupancy:
+        intervals = IntervalIndex.from_appointments(self._query(SELECT_BOOKED, (date,)))
+        occupancy = SlotOccupancy()
+        occupancy.set_day(date, intervals.masks(date, exclude))
+        return occupancy
+
+    def check_availability(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                           requirement: Requirement = DEFAULT_REQUIREMENT, exclude: str = "") -> bool:
+        """Check that no confirmed appointment (other than `exclude`) overlaps [time, time + duration)"""
+        return self._day_occupancy(date, exclude).is_free(date, time, duration, requirement)
+
+    def assign_resources(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                         requirement: Requirement = DEFAULT_REQUIREMENT,
+                         unavailable: Tuple[str, ...] = (), exclude: str = "") -> Optional[Tuple[str, ...]]:
+        """Free resources meeting the requirement over [time, time + duration), or None"""
+        return self._day_occupancy(date, exclude).assign(date, time, duration, requirement, unavailable)
+
+    def get_available_slots(self, date: str, duration: int = DEFAULT_DURATION,
+                            requirement: Requirement = DEFAULT_REQUIREMENT) -> List[str]:
+        """Get start times on a date where `duration` minutes are free during opening hours"""
+        return self._day_occupancy(date).free_slots(date, duration, requirement)
+
+    def find_overlapping(self, date: str, time: str, duration: int = DEFAULT_DURATION,
+                         resources: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+        """Confirmed appointments overlapping [time, time + duration) on the resources (default: any)"""
+        appointments = {app['id']: app for app in self._query(SELECT_BOOKED, (date,))}
+        start = to_minutes(time)
+        return [appointments[app_id] for app_id in IntervalIndex.from_appointments(
+            appointments.values()).overlapping(date, start, start + duration, resources)]
+
+    def find_next_slots(self, start_date: str, days: int = 90, duration: int = DEFAULT_DURATION,
+                        limit: int = 3, requirement: Requirement = DEFAULT_REQUIREMENT,
+                        time_of_day: str = "", not_before: Optional[Tuple[str, str]] = None
+                        ) -> List[Tuple[str, str]]:
+        """First `limit` free (date, time) starts from start_date over `days` days"""
+        dates = date_range(start_date, days)
+        intervals = IntervalIndex.from_appointments(self._query(SELECT_BOOKED_RANGE, (dates[0], dates[-1])))
+        occupancy = SlotOccupancy()
+        for date in dates:
+            occupancy.set_day(date, intervals.masks(date))
+        return occupancy.next_free(dates, duration, limit, requirement, time_of_day, not_before)
+
+
+def migrate_from_json(conn: sqlite3.Connection,
+                      patients_file: str = "patients.json",
+                      appointments_file: str = "appointments.json") -> bool:
+    """
+    One-shot import of the JSON databases into SQLite.
+    Returns False if the migration was already applied.
+    """
+    if conn.execute("SELECT 1 FROM migrations WHERE name = 'json_import'").fetchone():
+        return False
+
+    # Both files may still have pending log segments from AppendLogStorage
+    from appointment_storage import AppendLogStorage
+    appointment_storage = AppendLogStorage(appointments_file)
+    appointments = appointment_storage.load()
+    appointment_storage.close()
+    patient_storage = AppendLogStorage(patients_file, error_label="pazienti")
+    patients = patient_storage.load()
+    patient_storage.close()
+
+    SQLitePatientDatabase(conn=conn).import_patients(patients)
+    SQLiteAppointmentDatabase(conn=conn).import_appointments(appointments)
+    with conn:
+        conn.execute("INSERT INTO migrations (name, applied_at) VALUES ('json_import', ?)",
+                     (datetime.now().isoformat(),))
+    return True
@@ -14,13 +14,24 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from dental_tools import (
-        get_clinic_info, get_services_info, answer_faq,
-        check_availability, schedule_appointment, collect_patient_info,
+        get_clinic_info, get_services_info, answer_faq, search_knowledge,
+        check_availability, find_next_available, reserve_slot, schedule_appointment, collect_patient_info,
         cancel_appointment, reschedule_appointment,
         get_insurance_info, get_payment_info
     )
     from clinic_knowledge import CLINIC_INFO, SERVICES, FAQ
     from italian_training_data import CONVERSATION_EXAMPLES
+    from appointment_storage import MemoryStorage
+    from calendar_service import calendar
+    from patient_database import AppointmentDatabase, PatientDatabase
+    from semantic_index import semantic_index
+    from slot_bitmap import clinic_hours
+    import tempfile
+
+    # Keep test bookings out of the real calendar files
+    calendar.appointment_db = AppointmentDatabase(storage=MemoryStorage())
+    calendar.patient_db = PatientDatabase(os.path.join(tempfile.mkdtemp(), "patients.json"))
+    semantic_index.path = os.path.join(tempfile.mkdtemp(), "knowledge.index")
 except ImportError as e:
     print(f"Import error: {e}")
     print("Some modules may not be available. Running basic tests only.")
@@ -29,6 +40,13 @@ class MockRunContext:
     """Mock RunContext for testing"""
     pass
 
+def open_weekday(days_ahead: int) -> str:
+    """First weekday from `days_ahead` days on when the clinic is open all day"""
+    day = datetime.now() + timedelta(days=days_ahead)
+    while day.weekday() >= 5 or clinic_hours.closed_reason(day.strftime("%Y-%m-%d")):
+        day += timedelta(days=1)
+    return day.strftime("%Y-%m-%d")
+
 async def test_clinic_info():
     """Test clinic information retrieval"""
     print("🏥 Testing Clinic Information...")
@@ -67,6 +85,11 @@ async def test_services_info():
     assert "Igiene Dentale" in result
     assert "€" in result
     
+    # Test free service name
+    result = await get_services_info(context, "pulizia")
+    print(f"Alias: {result[:100]}...")
+    assert "Igiene Dentale" in result
+    
     print("✅ Services info tests passed!\n")
 
 async def test_faq():
@@ -84,13 +107,27 @@ async def test_faq():
     
     print("✅ FAQ tests passed!\n")
 
+async def test_search_knowledge():
+    """Test semantic knowledge search"""
+    print("🔍 Testing knowledge search...")
+    context = MockRunContext()
+    
+    result = await search_knowledge(context, "quanto pago per l'apparecchio?")
+    print(f"Knowledge search: {result[:100]}...")
+    assert "Ortodonzia" in result
+    
+    result = await search_knowledge(context, "la pizza margherita")
+    assert "Non ho trovato" in result
+    
+    print("✅ Knowledge search tests passed!\n")
+
 async def test_availability():
     """Test availability checking"""
     print("📅 Testing Availability...")
     context = MockRunContext()
     
     # Test future date
-    future_date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
+    future_date = open_weekday(7)
     result = await check_availability(context, future_date, "visita_controllo")
     print(f"Future availability: {result[:100]}...")
     assert "Disponibilità" in result or "disponibilità" in result
@@ -103,12 +140,26 @@ async def test_availability():
     
     print("✅ Availability tests passed!\n")
 
+async def test_find_next_available():
+    """Test next available slot search"""
+    print("🔎 Testing Next Available Slot...")
+    context = MockRunContext()
+    
+    result = await find_next_available(context, "ortodonzia", time_of_day="mattina")
+    print(f"Next available: {result[:100]}...")
+    assert "Primi orari liberi" in result
+    
+    result = await find_next_available(context, "sconosciuto")
+    assert "non riconosciuto" in result
+    
+    print("✅ Next available slot tests passed!\n")
+
 async def test_appointment_booking():
     """Test appointment booking"""
     print("📝 Testing Appointment Booking...")
     context = MockRunContext()
     
-    future_date = (datetime.now() + timedelta(days=5)).strftime("%Y-%m-%d")
+    future_date = open_weekday(5)
     result = await schedule_appointment(
         context,
         patient_name="Mario Rossi",
@@ -122,6 +173,33 @@ async def test_appointment_booking():
     assert "confermato" in result
     assert "Mario Rossi" in result
     
+    # A hold only books the appointment type it was taken for
+    held = await reserve_slot(context, date=future_date, time="11:00", appointment_type="visita_controllo")
+    hold_code = held.rsplit(" ", 1)[-1]
+    result = await schedule_appointment(
+        context, patient_name="Mario Rossi", phone="+39 333 1234567", date=future_date,
+        time="11:00", appointment_type="ortodonzia", hold_code=hold_code
+    )
+    assert "non corrisponde" in result
+    result = await schedule_appointment(
+        context, patient_name="Mario Rossi", phone="+39 333 1234567", date=future_date,
+        time="11:00", appointment_type="visita_controllo", hold_code=hold_code
+    )
+    assert "confermato" in result
+    
+    # Closed days and times outside opening hours are refused
+    sunday = datetime.now() + timedelta(days=7 + (6 - datetime.now().weekday()))
+    result = await schedule_appointment(
+        context, patient_name="Mario Rossi", phone="+39 333 1234567",
+        date=sunday.strftime("%Y-%m-%d"), time="23:00", appointment_type="visita_controllo"
+    )
+    assert "chiusa" in result
+    result = await schedule_appointment(
+        context, patient_name="Mario Rossi", phone="+39 333 1234567",
+        date=future_date, time="03:17", appointment_type="visita_controllo"
+    )
+    assert "orari di apertura" in result
+    
     print("✅ Appointment booking tests passed!\n")
 
 async def test_patient_info_collection():
@@ -152,7 +230,7 @@ async def test_cancellation():
     context = MockRunContext()
     
     # First book an appointment to cancel
-    future_date = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+    future_date = open_weekday(3)
     await schedule_appointment(
         context,
         patient_name="Test Patient",
@@ -173,6 +251,32 @@ async def test_cancellation():
     print(f"Cancellation: {result[:100]}...")
     assert "cancellato" in result
     
+    # A failed cancellation is reported as an error, not as a missing appointment
+    await schedule_appointment(
+        context, patient_name="Test Patient", phone="+39 333 9999999",
+        date=future_date, time="15:00", appointment_type="visita_controllo"
+    )
+    cancel = calendar.cancel
+    calendar.cancel = lambda appointment: False
+    try:
+        result = await cancel_appointment(
+            context, patient_name="Test Patient", phone="+39 333 9999999", date=future_date, time="15:00"
+        )
+    finally:
+        calendar.cancel = cancel
+    assert "errore" in result and "Non ho trovato" not in result
+    
+    # A 60-minute visit moved by half an hour overlaps only itself
+    await schedule_appointment(
+        context, patient_name="Test Patient", phone="+39 333 9999999",
+        date=future_date, time="09:00", appointment_type="ortodonzia"
+    )
+    result = await reschedule_appointment(
+        context, patient_name="Test Patient", phone="+39 333 9999999",
+        old_date=future_date, old_time="09:00", new_date=future_date, new_time="09:30"
+    )
+    assert "riprogrammato" in result
+    
     print("✅ Cancellation tests passed!\n")
 
 async def test_insurance_info():
@@ -241,6 +345,22 @@ def test_conversation_examples():
     
     print("✅ Conversation examples tests passed!\n")
 
+async def test_load_harness():
+    """Test concurrent scripted sessions against the tools"""
+    print("🏋️ Testing Load Harness...")
+    from bench_load import overlapping_bookings, run_load
+    
+    summary = await run_load(60, think_ms=1, ramp_seconds=0.05)
+    print(f"Load: {summary['booked']} booked, {summary['conflicts']} conflicts")
+    scripts = [sum(1 for turn in example["conversation"] if turn["speaker"] == "paziente")
+               for example in CONVERSATION_EXAMPLES]
+    assert summary["turns"] == sum(scripts[n % len(scripts)] for n in range(60))
+    assert summary["booked"] > 0 and not summary["errors"]
+    assert summary["booked"] + summary["gave_up"] + summary["no_slot"] == summary["booking_sessions"]
+    assert summary["overlapping_bookings"] == 0 == overlapping_bookings()
+    
+    print("✅ Load harness tests passed!\n")
+
 async def run_all_tests():
     """Run all tests"""
     print("🚀 Starting Italian Dental Clinic Agent Tests...\n")
@@ -249,12 +369,15 @@ async def run_all_tests():
         await test_clinic_info()
         await test_services_info()
         await test_faq()
+        await test_search_knowledge()
         await test_availability()
+        await test_find_next_available()
         await test_appointment_booking()
         await test_patient_info_collection()
         await test_cancellation()
         await test_insurance_info()
         await test_payment_info()
+        await test_load_harness()
         test_italian_language_quality()
         test_conversation_examples()
         
@@ -263,7 +386,9 @@ async def run_all_tests():
         print("✅ Clinic information retrieval")
         print("✅ Services information")
         print("✅ FAQ responses")
+        print("✅ Knowledge search")
         print("✅ Availability checking")
+        print("✅ Next available slot search")
         print("✅ Appointment booking")
         print("✅ Patient information collection")
         print("✅ Appointment cancellation")
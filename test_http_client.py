@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared HTTP client and the weather lookup, against a local stub server.
+Runs without LiveKit dependencies (needs aiohttp).
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from http_client import AsyncHttpClient, HttpError
+from weather import WeatherService
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    requests = []
+    flaky_failures = 0
+
+    def setup(self):
+        super().setup()
+        StubHandler.connections += 1
+
+    def _reply(self, status: int, body: str):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        StubHandler.requests.append(self.path)
+        if self.path.startswith("/Flaky"):
+            if StubHandler.flaky_failures < 2:
+                StubHandler.flaky_failures += 1
+                return self._reply(503, "busy")
+        elif self.path.startswith("/Slow"):
+            time.sleep(1.0)
+        elif self.path.startswith("/Missing"):
+            return self._reply(404, "not found")
+        city = self.path[1:].split("?")[0]
+        self._reply(200, f"{city}: ☀️ +20°C\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server():
+    StubHandler.connections = 0
+    StubHandler.requests = []
+    StubHandler.flaky_failures = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_keep_alive_and_cache():
+    """Repeated lookups reuse one connection and hit the cache per city"""
+    print("🌤️ Testing weather cache and keep-alive...")
+    server, base_url = _start_server()
+
+    async def run():
+        service = WeatherService(AsyncHttpClient(), base_url)
+        assert await service.current("Roma") == "Roma: ☀️ +20°C"
+        assert await service.current(" roma ") == "Roma: ☀️ +20°C"
+        for city in ["Milano", "Napoli", "Torino"]:
+            await service.current(city)
+        await service.client.close()
+
+    try:
+        asyncio.run(run())
+        assert len(StubHandler.requests) == 4
+        assert StubHandler.requests[0] == "/Roma?format=3"
+        assert StubHandler.connections == 1
+    finally:
+        server.shutdown()
+    print("✅ Weather cache and keep-alive test passed!\n")
+
+
+def test_retries_and_timeouts():
+    """Transient errors are retried, slow or missing pages fail fast"""
+    print("🔁 Testing retries and timeouts...")
+    server, base_url = _start_server()
+
+    async def run():
+        client = AsyncHttpClient(total_timeout=0.3, retries=2, backoff=0.01)
+        assert (await client.get_text(f"{base_url}/Flaky")).startswith("Flaky")
+        assert StubHandler.flaky_failures == 2
+
+        started = time.monotonic()
+        try:
+            await client.get_text(f"{base_url}/Slow")
+            assert False, "timeout expected"
+        except HttpError:
+            pass
+        assert time.monotonic() - started < 1.5
+
+        try:
+            await client.get_text(f"{base_url}/Missing")
+            assert False, "404 expected"
+        except HttpError as e:
+            assert e.status == 404
+        await client.close()
+
+    try:
+        asyncio.run(run())
+        # 404 is not retried
+        assert sum(1 for path in StubHandler.requests if path.startswith("/Missing")) == 1
+    finally:
+        server.shutdown()
+    print("✅ Retry and timeout test passed!\n")
+
+
+def test_session_closed_when_loop_changes():
+    """A session left open by a finished loop is closed, not leaked"""
+    print("🔌 Testing session cleanup across event loops...")
+    server, base_url = _start_server()
+    client = AsyncHttpClient()
+    sessions = []
+
+    async def run():
+        assert (await client.get_text(f"{base_url}/Roma")).startswith("Roma")
+        sessions.append(client._session)
+
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            asyncio.run(run())
+            asyncio.run(run())
+            assert sessions[0] is not sessions[1]
+            assert sessions[0].closed and sessions[1].closed
+            sessions.clear()
+            gc.collect()
+        unclosed = [w for w in caught if "Unclosed" in str(w.message) or "unclosed" in str(w.message)]
+        assert not unclosed, unclosed
+    finally:
+        server.shutdown()
+    print("✅ Session cleanup test passed!\n")
+
+
+def run_all_tests():
+    """Run all HTTP client tests"""
+    print("🚀 Starting HTTP Client Tests...\n")
+
+    tests = [
+        test_keep_alive_and_cache,
+        test_retries_and_timeouts,
+        test_session_closed_when_loop_changes,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Tests for the knowledge base tools: rendered answers and lookups.
+Runs without LiveKit dependencies.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import clinic_knowledge
+from alias_resolver import AliasResolver
+from faq_index import FaqSearch, analyze
+from knowledge_base import KNOWLEDGE_FILE, KnowledgeBase, KnowledgeError, read_snapshot
+from knowledge_responses import (
+    KnowledgeResponses, UNKNOWN_INFO_TYPE, UNKNOWN_SERVICE, render_clinic_info,
+    render_insurance_info, render_payment_info, render_service_info
+)
+from prompt_builder import COMPACT_BUDGET, PromptBuilder, count_tokens
+
+
+def test_response_cache_matches_rendering():
+    """Cached answers are identical to rendering on every call"""
+    print("📋 Testing knowledge response cache...")
+    responses = KnowledgeResponses()
+    k = clinic_knowledge
+    assert responses.clinic_info("hours") is responses.clinic_info("hours")
+
+    for info_type in ["general", "hours", "contact", "location", "parking", "boh"]:
+        assert responses.clinic_info(info_type) == render_clinic_info(info_type, k.CLINIC_INFO)
+    for service_type in ["all", "boh"] + list(k.SERVICES):
+        assert responses.service_info(service_type) == render_service_info(service_type, k.SERVICES)
+    for name in ["", "Assicurazione Sconosciuta", *k.INSURANCE_INFO["accepted_insurances"]]:
+        assert responses.insurance_info(name) == render_insurance_info(name, k.INSURANCE_INFO)
+    assert responses.payment_info() == render_payment_info(k.PAYMENT_OPTIONS)
+    assert responses.clinic_info("boh") == UNKNOWN_INFO_TYPE
+    assert responses.service_info("boh") == UNKNOWN_SERVICE
+    assert "Sabato: 9:00-13:00" in responses.clinic_info("hours")
+    print("✅ Knowledge response cache test passed!\n")
+
+
+def _write_knowledge(path, **changes):
+    """Copy of the shipped knowledge file with top-level sections replaced"""
+    with open(KNOWLEDGE_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    data.update(changes)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return data
+
+
+def test_response_cache_invalidation():
+    """A knowledge base reload re-renders the cached answers"""
+    print("♻️ Testing response cache invalidation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge.json")
+        data = _write_knowledge(path)
+        kb = KnowledgeBase(path)
+        responses = KnowledgeResponses(kb)
+        assert data["clinic_info"]["phone"] in responses.clinic_info("contact")
+
+        _write_knowledge(path, version=2, clinic_info=dict(data["clinic_info"], phone="+39 02 0000000"))
+        assert kb.reload()
+        assert "+39 02 0000000" in responses.clinic_info("contact")
+    print("✅ Response cache invalidation test passed!\n")
+
+
+def test_knowledge_reload():
+    """Valid files are swapped in atomically, invalid ones leave the snapshot untouched"""
+    print("🔄 Testing knowledge base reload...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge.json")
+        data = _write_knowledge(path)
+        kb = KnowledgeBase(path)
+        in_progress = kb.snapshot
+
+        # Snapshots are read-only
+        try:
+            in_progress.services["ortodonzia"]["price_range"] = "gratis"
+            assert False, "snapshot should be immutable"
+        except TypeError:
+            pass
+
+        # Invalid files are rejected and the current version stays
+        bad_types = dict(data["appointment_types"])
+        bad_types["visita_controllo"] = dict(bad_types["visita_controllo"], duration="trenta")
+        _write_knowledge(path, version=2, appointment_types=bad_types)
+        assert not kb.reload()
+        assert kb.snapshot is in_progress
+        # So are appointment types needing a chair or practitioner that does not exist
+        bad_types["visita_controllo"] = dict(data["appointment_types"]["visita_controllo"],
+                                             requires=[["poltrona_9"]])
+        _write_knowledge(path, version=2, appointment_types=bad_types)
+        assert not kb.reload()
+        # And opening hours that cannot be parsed
+        bad_hours = dict(data["clinic_info"]["hours"], lunedi="dalle 9 alle 18")
+        _write_knowledge(path, version=2, clinic_info=dict(data["clinic_info"], hours=bad_hours))
+        assert not kb.reload()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{non json")
+        assert not kb.reload()
+        try:
+            read_snapshot(path)
+            assert False, "KnowledgeError expected"
+        except KnowledgeError:
+            pass
+
+        # The watcher picks up a valid new version; earlier readers keep theirs
+        services = dict(data["services"])
+        services["ortodonzia"] = dict(services["ortodonzia"], price_range="€1500-5000")
+        _write_knowledge(path, version=3, services=services)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+
+        async def watch():
+            kb.start_watching(interval=0.01)
+            for _ in range(100):
+                if kb.snapshot.version == 3:
+                    break
+                await asyncio.sleep(0.01)
+            kb._watcher.cancel()
+
+        asyncio.run(watch())
+        assert kb.snapshot.version == 3
+        assert kb.snapshot.services["ortodonzia"]["price_range"] == "€1500-5000"
+        assert in_progress.version == 1
+        assert in_progress.services["ortodonzia"]["price_range"] == data["services"]["ortodonzia"]["price_range"]
+        assert not kb.reload_if_changed()
+    print("✅ Knowledge base reload test passed!\n")
+
+
+def test_faq_index():
+    """Topics and free questions find the right FAQ; unrelated questions miss"""
+    print("❓ Testing FAQ index...")
+    assert analyze("Perché l'anestesia?") == analyze("perche anestesie")
+    assert analyze("pagamenti") == analyze("pagamento")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge.json")
+        data = _write_knowledge(path)
+        kb = KnowledgeBase(path)
+        search = FaqSearch(kb)
+
+        expected = {
+            "costi": "quanto_costa_visita",
+            "assicurazioni": "accettate_assicurazioni",
+            "emergenze": "emergenze",
+            "prima_visita": "prima_visita",
+            "igiene_frequenza": "igiene_frequenza",
+            "Quanto costa una visita di controllo?": "quanto_costa_visita",
+            "mi fa male un dente, è urgente": "emergenze",
+            "posso pagare a rate?": "pagamenti",
+            "fate l'anestesia?": "anestesia",
+        }
+        for query, key in expected.items():
+            hits = search.search(query)
+            assert hits and hits[0].key == key, (query, hits)
+            assert 0 < hits[0].confidence <= 1
+        # Natural phrasings of patients, with verbs and fillers around the topic
+        spoken = {
+            "i bambini possono venire?": "bambini",
+            "avete l'anestesia per le otturazioni?": "anestesia",
+            "si può pagare con il bancomat?": "pagamenti",
+            "cosa devo portare la prima volta?": "prima_visita",
+            "ogni quanto devo fare la pulizia?": "igiene_frequenza",
+            "ho un dolore fortissimo al dente, cosa devo fare?": "emergenze",
+            "prendete l'assicurazione unisalute?": "accettate_assicurazioni",
+        }
+        for query, key in spoken.items():
+            hits = search.search(query)
+            assert hits and hits[0].key == key, (query, hits)
+        assert search.search("mi fa male la pancia") == [] and search.search("avete il wifi?") == []
+        assert search.search("parcheggio") == []
+        assert search.search("il di la") == []
+        assert len(search.search("costi visita prima", limit=2)) <= 2
+
+        begin = time.perf_counter()
+        for _ in range(1000):
+            search.search("quanto costa la pulizia dei denti?")
+        assert (time.perf_counter() - begin) / 1000 < 0.001
+
+        # Reloads rebuild the index
+        faq = dict(data["faq"], parcheggio={"question": "Dove posso parcheggiare?",
+                                            "answer": "Parcheggio gratuito davanti allo studio."})
+        _write_knowledge(path, version=2, faq=faq)
+        assert kb.reload()
+        assert search.search("parcheggio")[0].key == "parcheggio"
+    print("✅ FAQ index test passed!\n")
+
+
+def test_alias_resolver():
+    """Free Italian names resolve to canonical keys; unknown words do not"""
+    print("🔤 Testing alias resolver...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge.json")
+        data = _write_knowledge(path)
+        kb = KnowledgeBase(path)
+        resolver = AliasResolver(kb)
+
+        services = {
+            "pulizia": "igiene_dentale",
+            "vorrei fare lo sbiancamento": "estetica_dentale",
+            "apparecchio per mio figlio": "ortodonzia",
+            "Ortodonzia": "ortodonzia",
+            "igiene_dentale": "igiene_dentale",
+        }
+        for text, key in services.items():
+            assert resolver.service(text) == key, (text, resolver.service(text))
+        appointment_types = {
+            "pulizia dei denti": "igiene_dentale",
+            "sbiancamento": "estetica",
+            "ho un forte mal di denti": "visita_urgente",
+            "controllo": "visita_controllo",
+            "visita_controllo": "visita_controllo",
+        }
+        for text, key in appointment_types.items():
+            assert resolver.appointment_type(text) == key, (text, resolver.appointment_type(text))
+        assert resolver.service("pizza") is None
+        assert resolver.appointment_type("") is None
+
+        begin = time.perf_counter()
+        for _ in range(1000):
+            resolver.appointment_type("vorrei prenotare una pulizia dei denti")
+        assert (time.perf_counter() - begin) / 1000 < 0.001
+
+        # Reloads rebuild the tries
+        services = dict(data["services"], pedodonzia={
+            "name": "Pedodonzia", "description": "Cure dentali per bambini",
+            "duration": "30 minuti", "price_range": "€60-100"})
+        _write_knowledge(path, version=2, services=services)
+        assert kb.reload()
+        assert resolver.service("pedodonzia per bambini") == "pedodonzia"
+    print("✅ Alias resolver test passed!\n")
+
+
+def test_prompt_builder():
+    """Prompts fit the budget, keep required sections and follow the knowledge base"""
+    print("📝 Testing prompt builder...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "knowledge.json")
+        data = _write_knowledge(path)
+        kb = KnowledgeBase(path)
+        builder = PromptBuilder(kb)
+
+        full = builder.build()
+        assert not full.dropped and not full.trimmed
+        assert "# Esempi di conversazione" in full.agent_instruction
+        assert "Lunedì-Venerdì 9-12 e 14-18, Sabato 9-13, Domenica chiuso" in full.session_instruction
+        # Repeated facts are sent once
+        assert "Parla sempre in italiano con un tono professionale" in full.agent_instruction
+        assert "Mantieni sempre un tono professionale" not in full.agent_instruction
+
+        compact = builder.build(COMPACT_BUDGET)
+        assert compact.tokens <= COMPACT_BUDGET < full.tokens
+        assert compact.tokens == (count_tokens(compact.agent_instruction)
+                                  + count_tokens(compact.session_instruction))
+        assert "Esempi di conversazione" in compact.dropped
+        # Conduct keeps its leading rules next to the clinic facts
+        assert "Comportamento" not in compact.dropped and "# Comportamento" in compact.session_instruction
+        assert "Sofia" in compact.agent_instruction and "Buongiorno" in compact.session_instruction
+        assert "Escluse: Esempi di conversazione" in compact.report()
+
+        # Required sections survive any budget
+        tiny = builder.build(10)
+        assert "# Persona" in tiny.agent_instruction and "# Compito" in tiny.session_instruction
+        assert builder.build(COMPACT_BUDGET) is compact
+
+        hours = dict(data["clinic_info"]["hours"], sabato="Chiuso")
+        _write_knowledge(path, version=2, clinic_info=dict(data["clinic_info"], hours=hours))
+        assert kb.reload()
+        assert "Lunedì-Venerdì 9-12 e 14-18, Sabato-Domenica chiuso" in builder.build().session_instruction
+    print("✅ Prompt builder test passed!\n")
+
+
+def run_all_tests():
+    """Run all knowledge tests"""
+    print("🚀 Starting Knowledge Tests...\n")
+
+    tests = [
+        test_response_cache_matches_rendering,
+        test_response_cache_invalidation,
+        test_knowledge_reload,
+        test_faq_index,
+        test_alias_resolver,
+        test_prompt_builder,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
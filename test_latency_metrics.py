@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-turn latency instrumentation.
+Runs without LiveKit dependencies: a fake session replays the events.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from latency_metrics import (
+    CONTENT_TYPE, Instrumentation, LatencyMetrics, TurnTracer, current_tracer, timed_tool
+)
+
+
+class FakeSession:
+    """Minimal AgentSession event emitter"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, callback):
+        self.handlers.setdefault(event, []).append(callback)
+
+    def emit(self, event, **fields):
+        for callback in self.handlers.get(event, []):
+            callback(SimpleNamespace(**fields))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@timed_tool
+async def slow_tool(clock, seconds):
+    clock.now += seconds
+    return "ok"
+
+
+@timed_tool
+async def failing_tool():
+    raise ValueError("boom")
+
+
+def test_turn_spans():
+    """Session events and tool calls become turn spans, histograms and trace lines"""
+    print("⏱️ Testing turn spans...")
+    with tempfile.TemporaryDirectory() as tmp:
+        instrumentation = Instrumentation()
+        instrumentation.configure(trace_path=os.path.join(tmp, "trace.jsonl"))
+        session, clock = FakeSession(), FakeClock()
+        tracer = TurnTracer("room-1", instrumentation.metrics, instrumentation.trace, clock=clock)
+        tracer.attach(session)
+
+        async def conversation():
+            current_tracer.set(tracer)
+            # Greeting: no user speech, so no latency sample
+            session.emit("agent_state_changed", new_state="thinking")
+            clock.now += 0.5
+            session.emit("agent_state_changed", new_state="speaking")
+            # First user turn with a tool call
+            session.emit("user_state_changed", old_state="speaking", new_state="listening")
+            session.emit("metrics_collected", metrics=SimpleNamespace(end_of_utterance_delay=0.2))
+            clock.now += 0.1
+            session.emit("agent_state_changed", new_state="thinking")
+            assert await slow_tool(clock, 0.3) == "ok"
+            try:
+                await failing_tool()
+            except ValueError:
+                pass
+            clock.now += 0.2
+            session.emit("agent_state_changed", new_state="speaking")
+            session.emit("metrics_collected", metrics=SimpleNamespace(ttft=0.15))
+            session.emit("close")
+
+        asyncio.run(conversation())
+        instrumentation.close()
+
+        metrics = instrumentation.metrics
+        assert metrics.first_audio.count() == 1
+        assert metrics.first_token.count() == 1
+        assert metrics.end_of_utterance.count() == 1
+        assert metrics.tool.count("slow_tool") == 1 and metrics.tool.count("failing_tool") == 1
+
+        with open(os.path.join(tmp, "trace.jsonl"), encoding="utf-8") as f:
+            turns = [json.loads(line) for line in f]
+        assert [turn["turn"] for turn in turns] == [1, 2]
+        greeting, turn = turns
+        assert greeting["spans"] == {"model_start": 0.0, "first_audio": 0.5}
+        assert turn["spans"]["end_of_speech"] == 0.0
+        assert abs(turn["spans"]["model_start"] - 0.1) < 1e-6
+        assert abs(turn["spans"]["first_token"] - 0.25) < 1e-6
+        assert abs(turn["spans"]["first_audio"] - 0.6) < 1e-6
+        assert turn["end_of_utterance_delay"] == 0.2
+        assert [(t["name"], t["ok"]) for t in turn["tools"]] == [("slow_tool", True), ("failing_tool", False)]
+        assert abs(turn["tools"][0]["end"] - turn["tools"][0]["start"] - 0.3) < 1e-6
+    print("✅ Turn spans test passed!\n")
+
+
+def test_openmetrics_endpoint():
+    """The histograms are served as OpenMetrics text"""
+    print("📈 Testing OpenMetrics endpoint...")
+    instrumentation = Instrumentation()
+    instrumentation.configure(port=0)
+    try:
+        metrics = instrumentation.metrics
+        for value in (0.3, 0.9, 12.0):
+            metrics.first_audio.observe(value)
+        metrics.tool.observe(0.02, 'check "availability"')
+
+        port = instrumentation.server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            text = response.read().decode("utf-8")
+        assert text.endswith("# EOF\n")
+        assert "# TYPE dental_turn_first_audio_seconds histogram" in text
+        assert 'dental_turn_first_audio_seconds_bucket{le="0.5"} 1' in text
+        assert 'dental_turn_first_audio_seconds_bucket{le="1.0"} 2' in text
+        assert 'dental_turn_first_audio_seconds_bucket{le="+Inf"} 3' in text
+        assert "dental_turn_first_audio_seconds_count 3" in text
+        assert 'dental_tool_duration_seconds_count{tool="check \\"availability\\""} 1' in text
+    finally:
+        instrumentation.close()
+    print("✅ OpenMetrics endpoint test passed!\n")
+
+
+def test_disabled_overhead():
+    """Without configuration sessions are not traced and tools run almost unwrapped"""
+    print("🪶 Testing disabled instrumentation...")
+    instrumentation = Instrumentation()
+    instrumentation.configure()
+    assert instrumentation.trace_session(FakeSession(), "room") is None
+
+    async def plain():
+        return 1
+
+    wrapped = timed_tool(plain)
+
+    async def calls(fn, n):
+        begin = time.perf_counter()
+        for _ in range(n):
+            await fn()
+        return time.perf_counter() - begin
+
+    async def compare():
+        assert current_tracer.get() is None
+        return await calls(plain, 20000), await calls(wrapped, 20000)
+
+    baseline, timed = asyncio.run(compare())
+    assert (timed - baseline) / 20000 < 5e-6
+    # Nothing observed: metadata only
+    empty = LatencyMetrics().render()
+    assert "# TYPE dental_tool_duration_seconds histogram" in empty and "_count" not in empty
+    print("✅ Disabled instrumentation test passed!\n")
+
+
+def run_all_tests():
+    """Run all latency instrumentation tests"""
+    print("🚀 Starting Latency Instrumentation Tests...\n")
+
+    tests = [
+        test_turn_spans,
+        test_openmetrics_endpoint,
+        test_disabled_overhead,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
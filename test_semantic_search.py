@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped semantic index over the knowledge base.
+Runs without LiveKit dependencies (needs numpy).
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from knowledge_base import KNOWLEDGE_FILE, KnowledgeBase
+from semantic_index import SemanticIndex, embed, read_index, write_index
+
+
+def _knowledge_copy(tmp, **changes):
+    with open(KNOWLEDGE_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    data.update(changes)
+    path = os.path.join(tmp, "knowledge.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path, data
+
+
+def test_semantic_queries():
+    """Paraphrased questions find the right snippets; unrelated ones find nothing"""
+    print("🔍 Testing semantic knowledge search...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path, _ = _knowledge_copy(tmp)
+        index = SemanticIndex(KnowledgeBase(path), os.path.join(tmp, "index"))
+
+        expected = {
+            "quanto pago per l'apparecchio?": "servizio:ortodonzia",
+            "avete il parcheggio?": "clinica:posizione",
+            "a che ora aprite il sabato": "clinica:orari",
+            "posso pagare a rate": "pagamenti",
+            "mi serve un impianto": "servizio:implantologia",
+            "devitalizzazione quanto costa": "servizio:endodonzia",
+            "numero di telefono": "clinica:contatti",
+        }
+        for query, snippet_id in expected.items():
+            hits = index.search(query, limit=3)
+            assert snippet_id in [hit.id for hit in hits], (query, hits)
+            assert all(a.score >= b.score for a, b in zip(hits, hits[1:]))
+        assert index.search("la pizza margherita") == []
+        assert index.search("il la di") == []
+
+        begin = time.perf_counter()
+        for _ in range(500):
+            index.search("quanto costa la pulizia dei denti?")
+        assert (time.perf_counter() - begin) / 500 < 0.001
+    print("✅ Semantic knowledge search test passed!\n")
+
+
+def test_index_files_are_reused_and_rebuilt():
+    """The matrix is memory-mapped, shared across instances and rebuilt per version"""
+    print("🗺️ Testing memory-mapped index files...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path, data = _knowledge_copy(tmp)
+        index_path = os.path.join(tmp, "index")
+        kb = KnowledgeBase(path)
+        index = SemanticIndex(kb, index_path)
+        index.search("prezzi")
+        assert isinstance(index._matrix, np.memmap)
+        assert np.allclose(np.linalg.norm(index._matrix, axis=1), 1.0, atol=1e-4)
+        built = os.stat(index_path + ".bin").st_mtime_ns
+
+        # Another worker maps the same file instead of rebuilding
+        other = SemanticIndex(KnowledgeBase(path), index_path)
+        other.search("prezzi")
+        assert os.stat(index_path + ".bin").st_mtime_ns == built
+
+        # A new knowledge version rebuilds the index
+        services = dict(data["services"], pedodonzia={
+            "name": "Pedodonzia", "description": "Cure dentali per bambini e ragazzi",
+            "duration": "30 minuti", "price_range": "€60-100"})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(data, version=2, services=services), f, ensure_ascii=False)
+        assert kb.reload()
+        assert index.search("cure per ragazzi")[0].id == "servizio:pedodonzia"
+        meta, matrix = read_index(index_path + ".bin")
+        assert meta["version"] == 2 and len(meta["snippets"]) == matrix.shape[0]
+
+        # The version lives in the same file as the matrix: a stale or torn
+        # file is rebuilt, and no temporary file is left behind
+        write_index(index_path + ".bin", dict(meta, version=1), np.asarray(matrix))
+        with open(index_path + ".bin", "r+b") as f:
+            f.truncate(os.path.getsize(index_path + ".bin") - 8)
+        fresh = SemanticIndex(kb, index_path)
+        assert fresh.search("cure per ragazzi")[0].id == "servizio:pedodonzia"
+        assert read_index(index_path + ".bin")[0]["version"] == 2
+        assert sorted(os.listdir(tmp)) == ["index.bin", "knowledge.json"]
+
+        # Embeddings are deterministic across processes (crc32, not hash())
+        assert np.array_equal(embed("apparecchio"), embed("apparecchio"))
+    print("✅ Memory-mapped index test passed!\n")
+
+
+def run_all_tests():
+    """Run all semantic search tests"""
+    print("🚀 Starting Semantic Search Tests...\n")
+
+    tests = [
+        test_semantic_queries,
+        test_index_files_are_reused_and_rebuilt,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
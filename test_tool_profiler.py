@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the function tool profiler.
+Runs without LiveKit dependencies.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tool_profiler import ToolCall, ToolProfiler, percentile
+
+
+def _busy(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+def test_call_profile():
+    """Wall and CPU time, sizes and error classes are recorded per tool"""
+    print("🔬 Testing tool call profiling...")
+    profiler = ToolProfiler()
+
+    @profiler.wrap
+    async def busy_tool(context, payload: str) -> str:
+        """Busy then waiting"""
+        _busy(0.03)
+        await asyncio.sleep(0.05)
+        return "è" * 10
+
+    @profiler.wrap
+    async def waiting_tool(context) -> str:
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    @profiler.wrap
+    async def logging_tool(context) -> str:
+        try:
+            {}["missing"]
+        except KeyError as e:
+            logging.error(f"Errore: {e}")
+            return "Mi dispiace"
+
+    @profiler.wrap
+    async def raising_tool(context) -> str:
+        raise ValueError("boom")
+
+    async def scenario():
+        # busy_tool burns CPU while waiting_tool is suspended: not waiting_tool's CPU
+        await asyncio.gather(busy_tool(object(), payload="abc"), waiting_tool(object()))
+        assert await logging_tool(object()) == "Mi dispiace"
+        try:
+            await raising_tool(object())
+        except ValueError:
+            pass
+
+    asyncio.run(scenario())
+
+    stats = profiler.stats()
+    busy, waiting = stats["busy_tool"], stats["waiting_tool"]
+    assert busy["wall_p50"] >= 0.08 and 0.025 <= busy["cpu_p50"] < 0.06
+    assert waiting["wall_p50"] >= 0.1 and waiting["cpu_p50"] < 0.01
+    assert busy["arg_bytes"] == 3 and busy["result_bytes_max"] == 20
+    assert stats["logging_tool"]["errors"] == {"KeyError": 1}
+    assert stats["raising_tool"]["errors"] == {"ValueError": 1}
+    assert not busy["errors"]
+    assert "busy_tool" in profiler.report()
+
+    # The wrapper keeps what function_tool reads
+    assert busy_tool.__name__ == "busy_tool" and busy_tool.__doc__ == "Busy then waiting"
+    assert list(inspect.signature(busy_tool).parameters) == ["context", "payload"]
+    print("✅ Tool call profiling test passed!\n")
+
+
+def test_rolling_percentiles():
+    """Percentiles cover the last WINDOW calls only"""
+    print("📊 Testing rolling percentiles...")
+    assert percentile([], 50) == 0.0
+    assert percentile([float(i) for i in range(1, 101)], 95) == 95.0
+
+    profiler = ToolProfiler(window=100)
+    for ms in range(1, 101):
+        profiler.record(ToolCall("t", ms / 1000, 0.0, 0, ms))
+    stats = profiler.stats()["t"]
+    assert (stats["wall_p50"], stats["wall_p95"], stats["wall_p99"]) == (0.05, 0.095, 0.099)
+
+    # 100 slow calls push the fast ones out of the window
+    for _ in range(100):
+        profiler.record(ToolCall("t", 1.0, 0.0, 0, 0))
+    stats = profiler.stats()["t"]
+    assert stats["calls"] == 200 and stats["wall_p50"] == 1.0
+    print("✅ Rolling percentiles test passed!\n")
+
+
+def test_flamegraph_dump():
+    """Sampled stacks are written as collapsed lines attributed to the running tool"""
+    print("🔥 Testing flamegraph dump...")
+    profiler = ToolProfiler()
+
+    @profiler.wrap
+    async def hot_tool(context):
+        _busy(0.4)
+        return "done"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tools.collapsed")
+        main = threading.get_ident()
+        sampler = threading.Thread(target=profiler.dump_flamegraph, args=(path, 0.25, 0.002, main))
+        sampler.start()
+        asyncio.run(hot_tool(object()))
+        sampler.join()
+
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0 and stack
+        assert any("tool:hot_tool" in line and "_busy" in line for line in lines)
+    print("✅ Flamegraph dump test passed!\n")
+
+
+def run_all_tests():
+    """Run all tool profiler tests"""
+    print("🚀 Starting Tool Profiler Tests...\n")
+
+    tests = [
+        test_call_profile,
+        test_rolling_percentiles,
+        test_flamegraph_dump,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for WebSearchService with a fake search provider.
+Runs without LiveKit or network access.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from web_search import WebSearchService
+
+
+class FakeBackend:
+    def __init__(self, latency: float = 0.05, fail: str = ""):
+        self.latency = latency
+        self.fail = fail
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> str:
+        with self._lock:
+            self.calls.append(query)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.latency)
+        with self._lock:
+            self.running -= 1
+        if query == self.fail:
+            raise RuntimeError("backend non raggiungibile")
+        return f"Risultati per {query}"
+
+
+def test_dedupe_and_cache():
+    """Concurrent identical queries share one search; repeats come from the cache"""
+    print("🔎 Testing search dedupe and cache...")
+    backend = FakeBackend()
+    service = WebSearchService(backend, max_workers=2)
+
+    async def run():
+        results = await asyncio.gather(*(service.search(q) for q in
+                                         ["Bonus dentista", "bonus  DENTISTA", "bonus dentista"]))
+        assert len(set(results)) == 1
+        assert len(backend.calls) == 1
+        assert await service.search("Bonus Dentista") == results[0]
+        assert len(backend.calls) == 1
+
+    asyncio.run(run())
+    service.shutdown()
+    print("✅ Search dedupe and cache test passed!\n")
+
+
+def test_pool_is_bounded_and_loop_stays_free():
+    """Searches run at most max_workers at a time, off the event loop"""
+    print("🧵 Testing bounded search pool...")
+    backend = FakeBackend(latency=0.05, fail="errore")
+    service = WebSearchService(backend, max_workers=3)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await asyncio.gather(*(service.search(f"query {i}") for i in range(12)))
+        task.cancel()
+        assert backend.max_running <= 3
+        # 4 waves of 50 ms: the loop kept running meanwhile
+        assert ticks >= 10
+
+        try:
+            await service.search("errore")
+            assert False, "backend error expected"
+        except RuntimeError:
+            pass
+        # Failures are not cached
+        try:
+            await service.search("errore")
+        except RuntimeError:
+            pass
+        assert backend.calls.count("errore") == 2
+
+    asyncio.run(run())
+    service.shutdown()
+    print("✅ Bounded search pool test passed!\n")
+
+
+def run_all_tests():
+    """Run all web search tests"""
+    print("🚀 Starting Web Search Tests...\n")
+
+    tests = [
+        test_dedupe_and_cache,
+        test_pool_is_bounded_and_loop_stays_free,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print(f"📊 Test Results: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
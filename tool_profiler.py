@@ -0,0 +1,252 @@
+# Profiling for the function tools
+# `profiled_tool` goes under @function_tool. Each call records wall time, the
+# CPU time of the tool's own coroutine steps (not of other tasks running while
+# it awaits), argument and result sizes in bytes and the error class, either
+# raised or caught and logged with logging.error inside the tool. The last
+# WINDOW calls per tool give rolling p50/p95/p99. On demand (SIGUSR1, or
+# `dump_flamegraph`) the event-loop thread is sampled for a few seconds and
+# written in the collapsed-stack format read by flamegraph.pl and speedscope.
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from latency_metrics import timed_tool
+
+WINDOW = 1024
+PERCENTILES = (50, 95, 99)
+
+SAMPLE_INTERVAL = 0.005
+SAMPLE_SECONDS = 10.0
+PROFILE_DIR = os.getenv("DENTAL_PROFILE_DIR", ".")
+
+
+@dataclass
+class ToolCall:
+    name: str
+    wall: float
+    cpu: float
+    arg_bytes: int
+    result_bytes: int
+    error: Optional[str] = None
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def byte_size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, bytes):
+        return len(value)
+    return len(str(value).encode("utf-8"))
+
+
+class _CpuTimed:
+    """Drives a coroutine and adds up the thread CPU time of each of its steps"""
+
+    def __init__(self, coro, profiler: "ToolProfiler", name: str):
+        self.coro = coro
+        self.profiler = profiler
+        self.name = name
+        self.cpu = 0.0
+
+    def __await__(self):
+        value, error = None, None
+        running = self.profiler._running
+        thread = threading.get_ident()
+        while True:
+            previous = running.get(thread)
+            running[thread] = self.name
+            begin = time.thread_time()
+            try:
+                yielded = self.coro.throw(error) if error is not None else self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.cpu += time.thread_time() - begin
+                running[thread] = previous
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+
+class _LoggedErrors(logging.Filter):
+    """Notes the exception being handled when a profiled tool logs an error"""
+
+    def __init__(self, current: contextvars.ContextVar):
+        super().__init__()
+        self.current = current
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        call = self.current.get()
+        if call is not None and call.error is None and record.levelno >= logging.ERROR:
+            error = record.exc_info[1] if record.exc_info else sys.exc_info()[1]
+            call.error = type(error).__name__ if error is not None else "LoggedError"
+        return True
+
+
+class ToolStats:
+    """Rolling window of one tool's calls"""
+
+    def __init__(self, window: int):
+        self.calls: Deque[ToolCall] = deque(maxlen=window)
+        self.total = 0
+        self.errors: Counter = Counter()
+
+    def add(self, call: ToolCall):
+        self.calls.append(call)
+        self.total += 1
+        if call.error:
+            self.errors[call.error] += 1
+
+    def summary(self) -> Dict:
+        calls = list(self.calls)
+        wall = sorted(call.wall for call in calls)
+        cpu = sorted(call.cpu for call in calls)
+        return {
+            "calls": self.total,
+            "errors": dict(self.errors),
+            **{f"wall_p{q}": percentile(wall, q) for q in PERCENTILES},
+            **{f"cpu_p{q}": percentile(cpu, q) for q in PERCENTILES},
+            "arg_bytes": max((call.arg_bytes for call in calls), default=0),
+            "result_bytes_p50": percentile(sorted(call.result_bytes for call in calls), 50),
+            "result_bytes_max": max((call.result_bytes for call in calls), default=0),
+        }
+
+
+class ToolProfiler:
+    """Per-tool call statistics and an on-demand sampling profile"""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._stats: Dict[str, ToolStats] = {}
+        self._lock = threading.Lock()
+        # thread id -> tool whose coroutine step is running on it
+        self._running: Dict[int, Optional[str]] = {}
+        self._current: contextvars.ContextVar = contextvars.ContextVar("profiled_call", default=None)
+        self._loop_thread: Optional[int] = None
+        self._sampling = threading.Lock()
+        logging.getLogger().addFilter(_LoggedErrors(self._current))
+
+    def record(self, call: ToolCall):
+        with self._lock:
+            stats = self._stats.get(call.name)
+            if stats is None:
+                stats = self._stats[call.name] = ToolStats(self.window)
+            stats.add(call)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: stats.summary() for name, stats in sorted(self._stats.items())}
+
+    def report(self) -> str:
+        lines = [f"{'tool':<24} {'calls':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                 f"{'cpu p95':>8} {'out B':>6}"]
+        for name, s in self.stats().items():
+            lines.append(
+                f"{name:<24} {s['calls']:>6} {sum(s['errors'].values()):>4} {s['wall_p50'] * 1000:>8.1f} "
+                f"{s['wall_p95'] * 1000:>8.1f} {s['wall_p99'] * 1000:>8.1f} {s['cpu_p95'] * 1000:>8.2f} "
+                f"{s['result_bytes_p50']:>6}")
+        return "\n".join(lines)
+
+    def wrap(self, fn):
+        """Profile every call of an async tool"""
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            # Plain values only: the RunContext is not an argument of the model
+            arg_bytes = sum(byte_size(v) for v in (*args, *kwargs.values()) if isinstance(v, (str, int, float)))
+            call = ToolCall(name, 0.0, 0.0, arg_bytes, 0)
+            token = self._current.set(call)
+            timed = _CpuTimed(fn(*args, **kwargs), self, name)
+            begin = time.perf_counter()
+            try:
+                result = await timed
+                call.result_bytes = byte_size(result)
+                return result
+            except BaseException as e:
+                call.error = type(e).__name__
+                raise
+            finally:
+                call.wall = time.perf_counter() - begin
+                call.cpu = timed.cpu
+                self._current.reset(token)
+                self.record(call)
+        return wrapper
+
+    def sample(self, seconds: float = SAMPLE_SECONDS, interval: float = SAMPLE_INTERVAL,
+               thread_id: Optional[int] = None) -> Counter:
+        """Collapsed stacks of one thread (default: the event loop's), sampled for `seconds`"""
+        thread_id = thread_id or self._loop_thread or threading.main_thread().ident
+        stacks: Counter = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                tool = self._running.get(thread_id)
+                if tool:
+                    names.append(f"tool:{tool}")
+                stacks[";".join(reversed(names))] += 1
+            time.sleep(interval)
+        return stacks
+
+    def dump_flamegraph(self, path: str, seconds: float = SAMPLE_SECONDS,
+                        interval: float = SAMPLE_INTERVAL, thread_id: Optional[int] = None) -> str:
+        """Sample (blocking) and write `stack count` lines for flamegraph.pl / speedscope"""
+        with self._sampling:
+            stacks = self.sample(seconds, interval, thread_id)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _dump_in_background(self, directory: str, seconds: float):
+        if self._sampling.locked():
+            return
+        path = os.path.join(directory, f"tools-{time.strftime('%Y%m%d-%H%M%S')}.collapsed")
+
+        def run():
+            self.dump_flamegraph(path, seconds)
+            logging.info(f"Profilo strumenti salvato in {path}\n{self.report()}")
+        threading.Thread(target=run, name="tool-profile-dump", daemon=True).start()
+
+    def start_signal_dump(self, directory: str = PROFILE_DIR, seconds: float = SAMPLE_SECONDS):
+        """On SIGUSR1, sample the running loop for `seconds` and write a profile (idempotent)"""
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self._dump_in_background, directory, seconds)
+        except (NotImplementedError, AttributeError, RuntimeError, ValueError):
+            # No SIGUSR1 (Windows) or not the main thread: dump_flamegraph still works
+            pass
+
+
+# Process-wide profiler used by every function tool
+tool_profiler = ToolProfiler()
+
+
+def profiled_tool(fn):
+    """Profile and trace an async function tool (apply under @function_tool)"""
+    return tool_profiler.wrap(timed_tool(fn))
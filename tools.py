@@ -1,12 +1,21 @@
 import logging
 from livekit.agents import function_tool, RunContext
-import requests
-from langchain_community.tools import DuckDuckGoSearchRun
 import os
 
 from typing import Optional
 
+from http_client import HttpError
+from tool_profiler import profiled_tool
+from weather import WeatherService
+from web_search import WebSearchService
+
+# Shared per worker: keeps connections alive and caches reports per city
+weather = WeatherService()
+# Shared per worker: bounded search pool with result cache
+web_search = WebSearchService()
+
 @function_tool()
+@profiled_tool
 async def get_weather(
     context: RunContext,  # type: ignore
     city: str) -> str:
@@ -14,19 +23,18 @@ async def get_weather(
     Get the current weather conditions for a specified city. Use this when the user asks about weather.
     """
     try:
-        response = requests.get(
-            f"https://wttr.in/{city}?format=3")
-        if response.status_code == 200:
-            logging.info(f"Weather for {city}: {response.text.strip()}")
-            return response.text.strip()   
-        else:
-            logging.error(f"Failed to get weather for {city}: {response.status_code}")
-            return f"Could not retrieve weather for {city}."
+        report = await weather.current(city)
+        logging.info(f"Weather for {city}: {report}")
+        return report
+    except HttpError as e:
+        logging.error(f"Failed to get weather for {city}: {e}")
+        return f"Could not retrieve weather for {city}."
     except Exception as e:
         logging.error(f"Error retrieving weather for {city}: {e}")
         return f"An error occurred while retrieving weather for {city}." 
 
 @function_tool()
+@profiled_tool
 async def search_web(
     context: RunContext,  # type: ignore
     query: str) -> str:
@@ -34,7 +42,7 @@ async def search_web(
     Search the web for information using DuckDuckGo. Use this when the user asks for information that requires web search.
     """
     try:
-        results = DuckDuckGoSearchRun().run(tool_input=query)
+        results = await web_search.search(query)
         logging.info(f"Search results for '{query}': {results}")
         return results
     except Exception as e:
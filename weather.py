@@ -0,0 +1,32 @@
+# Weather lookups for the get_weather tool
+# Reports from wttr.in change slowly, so successful answers are cached per
+# city for a few minutes; the HTTP client handles timeouts and retries.
+
+import os
+from typing import Optional
+from urllib.parse import quote
+
+from http_client import AsyncHttpClient
+from ttl_cache import TTLCache
+
+WEATHER_URL = os.getenv("WEATHER_URL", "https://wttr.in")
+
+
+class WeatherService:
+    def __init__(self, client: Optional[AsyncHttpClient] = None, base_url: str = WEATHER_URL,
+                 cache_ttl: float = 600.0, cache_size: int = 256):
+        self.client = client or AsyncHttpClient()
+        self.base_url = base_url.rstrip('/')
+        self.cache = TTLCache(cache_size, cache_ttl)
+
+    async def current(self, city: str) -> str:
+        """One-line weather report for a city; raises HttpError on failure"""
+        key = ' '.join(city.lower().split())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        text = await self.client.get_text(f"{self.base_url}/{quote(city.strip())}",
+                                          params={"format": "3"})
+        report = text.strip()
+        self.cache.set(key, report)
+        return report
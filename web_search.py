@@ -0,0 +1,75 @@
+# Web search for the search_web tool
+# Search backends are blocking libraries, so they run in a bounded thread pool
+# instead of on the event loop. Identical queries issued while a search is in
+# flight share its result, and answers are kept in an LRU TTL cache.
+
+import asyncio
+import concurrent.futures
+import logging
+from typing import Dict, Optional, Protocol
+
+from ttl_cache import TTLCache
+
+
+class SearchBackend(Protocol):
+    def search(self, query: str) -> str:
+        """Blocking search returning a text summary of the results"""
+        ...
+
+
+class DuckDuckGoBackend:
+    """DuckDuckGo via langchain, built once and reused across queries"""
+
+    def __init__(self):
+        self._tool = None
+
+    def search(self, query: str) -> str:
+        if self._tool is None:
+            from langchain_community.tools import DuckDuckGoSearchRun
+            self._tool = DuckDuckGoSearchRun()
+        return self._tool.run(tool_input=query)
+
+
+def normalize_query(query: str) -> str:
+    """Cache key: case and whitespace do not change the search"""
+    return ' '.join(query.lower().split())
+
+
+class WebSearchService:
+    def __init__(self, backend: Optional[SearchBackend] = None, max_workers: int = 4,
+                 cache_ttl: float = 900.0, cache_size: int = 512, timeout: float = 15.0):
+        self.backend = backend or DuckDuckGoBackend()
+        self.timeout = timeout
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="web-search"
+        )
+        # normalized query -> search running in the pool
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def search(self, query: str) -> str:
+        """Search without blocking the event loop; raises on backend errors or timeout"""
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._inflight.get(key)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(self._executor, self.backend.search, query)
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda future: self._finished(key, future))
+        # shield: a caller timing out must not cancel the search shared with others
+        return await asyncio.wait_for(asyncio.shield(pending), self.timeout)
+
+    def _finished(self, key: str, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is None:
+            self.cache.set(key, future.result())
+        elif not future.cancelled():
+            logging.error(f"Search backend failed for '{key}': {future.exception()}")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)